@@ -0,0 +1,147 @@
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+from bar_store import BarStore
+from condition_engine import (PricePanel, rolling_tail_upward, rolling_bottom_twice, rolling_downtrend,
+                              TAIL_WINDOW, TAIL_RATIO, TAIL_MIN_DAYS, BOTTOM_WINDOW, BOTTOM_BAND,
+                              BOTTOM_MIN_COUNT, TREND_SHORT, TREND_LONG, DECLINE_CUTOFF)
+
+# 수익률을 볼 보유 기간 (거래일 수)
+HORIZONS = (1, 5, 20, 60)
+
+# 조건 1~3 기본값 (check_condition_1/2/3과 같은 기준)
+DEFAULT_PARAMS = {
+    "tail_window": TAIL_WINDOW,
+    "tail_ratio": TAIL_RATIO,
+    "tail_min_days": TAIL_MIN_DAYS,
+    "bottom_window": BOTTOM_WINDOW,
+    "bottom_band": BOTTOM_BAND,
+    "bottom_min_count": BOTTOM_MIN_COUNT,
+    "trend_short": TREND_SHORT,
+    "trend_long": TREND_LONG,
+    "decline_cutoff": DECLINE_CUTOFF
+}
+
+
+def rolling_conditions(panel, params=None):
+    """모든 날짜의 조건 1~3 판정 (종목 x 일자 bool 배열 dict)"""
+    params = dict(DEFAULT_PARAMS, **(params or {}))
+    return {
+        "tail_upward": rolling_tail_upward(panel, params["tail_window"], params["tail_ratio"],
+                                           params["tail_min_days"]),
+        "bottom_twice": rolling_bottom_twice(panel, params["bottom_window"], params["bottom_band"],
+                                             params["bottom_min_count"]),
+        "downtrend": rolling_downtrend(panel, params["trend_short"], params["trend_long"],
+                                       params["decline_cutoff"])
+    }
+
+
+def screen_signals(conditions):
+    """꼬리우상향 & 바닥2회 & 하락장 아님"""
+    return conditions["tail_upward"] & conditions["bottom_twice"] & ~conditions["downtrend"]
+
+
+def forward_returns(panel, horizon):
+    """각 날짜 종가 대비 horizon 거래일 뒤 종가 수익률 (뒤 데이터가 없으면 nan)"""
+    closes = panel["close"]
+    valid = panel.valid
+    returns = np.full(closes.shape, np.nan)
+    if 0 < horizon < closes.shape[1]:
+        base = closes[:, :-horizon]
+        ok = valid[:, :-horizon] & valid[:, horizon:] & (base > 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns[:, :-horizon] = np.where(ok, closes[:, horizon:] / base - 1, np.nan)
+    return returns
+
+
+def summarize(returns, mask):
+    """mask 위치 수익률 요약 (표본 수, 평균, 중앙값, 상승 비율)"""
+    values = returns[mask]
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return {"count": 0, "mean": None, "median": None, "win_rate": None}
+    return {
+        "count": int(len(values)),
+        "mean": round(float(values.mean()), 5),
+        "median": round(float(np.median(values)), 5),
+        "win_rate": round(float((values > 0).mean()), 4)
+    }
+
+
+def in_period(panel, start=None, end=None):
+    """평가 구간 (start~end, yyyymmdd) 안의 유효한 칸 (이전 이력은 창 계산에만 사용)"""
+    mask = panel.valid.copy()
+    if start:
+        mask &= panel.dates >= int(start)
+    if end:
+        mask &= panel.dates <= int(end)
+    return mask
+
+
+def evaluate_backtest(panel, start=None, end=None, horizons=HORIZONS, params=None, returns=None):
+    """패널로 백테스트 (신호 수, 보유 기간별 신호/전체 수익률)
+
+    returns: {보유 기간: forward_returns 결과} (여러 번 돌릴 때 재사용)
+    """
+    period = in_period(panel, start, end)
+    conditions = rolling_conditions(panel, params)
+    hits = screen_signals(conditions) & period
+
+    dates, counts = np.unique(panel.dates[hits], return_counts=True)
+    trading_days = len(np.unique(panel.dates[period]))
+    returns = returns or {horizon: forward_returns(panel, horizon) for horizon in horizons}
+
+    return {
+        "evaluated": int(period.sum()),
+        "trading_days": trading_days,
+        "hits": int(hits.sum()),
+        "hit_days": len(dates),
+        "hits_per_day": round(float(hits.sum()) / trading_days, 3) if trading_days else 0.0,
+        "conditions": {name: int((values & period).sum()) for name, values in conditions.items()},
+        "returns": {str(horizon): {"signal": summarize(returns[horizon], hits),
+                                   "all": summarize(returns[horizon], period)}
+                    for horizon in horizons},
+        "hits_by_date": [[str(date), int(count)] for date, count in zip(dates, counts)]
+    }
+
+
+def run_backtest(store=None, codes=None, start=None, end=None, horizons=HORIZONS, params=None):
+    """저장된 일봉 전체로 매 거래일 조건 판정 후 이후 수익률 집계 (종목별 반복 없이 배열 연산)"""
+    started = time.perf_counter()
+    store = store or BarStore()
+    codes = store.codes("daily") if codes is None else codes
+    panel = PricePanel.from_store(store, codes, "daily")
+    loaded = time.perf_counter()
+
+    result = evaluate_backtest(panel, start, end, horizons, params)
+    finished = time.perf_counter()
+
+    result.update({
+        "success": True,
+        "universe": len(codes),
+        "bars": int(panel.valid.sum()),
+        "start": start,
+        "end": end,
+        "params": dict(DEFAULT_PARAMS, **(params or {})),
+        "load_ms": round((loaded - started) * 1000, 1),
+        "evaluate_ms": round((finished - loaded) * 1000, 1)
+    })
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="저장된 일봉으로 조건 1~3 백테스트")
+    parser.add_argument("--start", default=None, help="평가 시작일 (YYYYMMDD)")
+    parser.add_argument("--end", default=None, help="평가 종료일 (YYYYMMDD)")
+    parser.add_argument("--horizons", default=",".join(str(horizon) for horizon in HORIZONS),
+                        help="보유 기간 (거래일, 쉼표 구분)")
+    args = parser.parse_args()
+
+    result = run_backtest(start=args.start, end=args.end,
+                          horizons=[int(horizon) for horizon in args.horizons.split(",")])
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    sys.exit(0)
@@ -0,0 +1,73 @@
+import logging
+from datetime import datetime
+
+
+def aggregate_bars(daily_bars, period_key, date_key):
+    """일봉을 기간별로 묶어 봉 생성 (daily_bars는 날짜 오름차순)"""
+    bars = []
+    current_key = None
+
+    for day in daily_bars:
+        key = period_key(day['date'])
+        if key != current_key:
+            current_key = key
+            bars.append({
+                "date": date_key(day['date']),
+                "open": day['open'],
+                "high": day['high'],
+                "low": day['low'],
+                "close": day['close'],
+                "volume": day.get('volume', 0)
+            })
+        else:
+            bar = bars[-1]
+            bar['high'] = max(bar['high'], day['high'])
+            bar['low'] = min(bar['low'], day['low'])
+            bar['close'] = day['close']
+            bar['volume'] += day.get('volume', 0)
+
+    return bars
+
+
+def aggregate_monthly(daily_bars):
+    """일봉으로 월봉 생성 (날짜는 YYYYMM)"""
+    return aggregate_bars(daily_bars, lambda date: date[:6], lambda date: date[:6])
+
+
+def week_of(date):
+    iso = datetime.strptime(date, '%Y%m%d').isocalendar()
+    return (iso[0], iso[1])
+
+
+def aggregate_weekly(daily_bars):
+    """일봉으로 주봉 생성 (날짜는 해당 주의 첫 거래일)"""
+    return aggregate_bars(daily_bars, week_of, lambda date: date)
+
+
+def verify_monthly(code, derived, sampled, fields=("close",)):
+    """일봉으로 만든 월봉을 opt10082 응답과 비교하여 불일치 목록 반환
+
+    일봉 이력의 첫 달은 월 중간부터 시작할 수 있으므로 비교에서 제외한다.
+    """
+    derived_by_month = {bar['date']: bar for bar in derived[1:]}
+    mismatches = []
+
+    for bar in sampled:
+        month = bar['date'][:6]
+        if month not in derived_by_month:
+            continue
+        for field in fields:
+            if field in bar and bar[field] != derived_by_month[month][field]:
+                mismatches.append({
+                    "month": month,
+                    "field": field,
+                    "derived": derived_by_month[month][field],
+                    "sampled": bar[field]
+                })
+
+    if mismatches:
+        logging.warning(f"{code} 월봉 검증 불일치 {len(mismatches)}건: {mismatches[:3]}")
+    else:
+        logging.info(f"{code} 월봉 검증 일치")
+
+    return mismatches
@@ -0,0 +1,108 @@
+from array import array
+
+PRICE_FIELDS = ("open", "high", "low", "close", "volume")
+
+
+class BarSeries:
+    """컬럼형 봉 데이터 (필드별 정수 array, 날짜는 정수 yyyymmdd / yyyymm)
+
+    생성할 때 한 번만 날짜 오름차순으로 정렬하므로 판정할 때마다 다시 정렬/날짜 파싱할
+    필요가 없다. 봉 dict 하나가 수백 바이트인 데 비해 봉당 8바이트 x 필드 수만 쓰고,
+    tail(n)은 memoryview 슬라이스라 최근 n개를 복사 없이 본다.
+    """
+
+    __slots__ = ("fields", "dates", "open", "high", "low", "close", "volume")
+
+    def __init__(self, dates, columns):
+        self.fields = tuple(field for field in PRICE_FIELDS if columns.get(field) is not None)
+        self.dates = dates
+        for field in PRICE_FIELDS:
+            setattr(self, field, columns.get(field))
+
+    @classmethod
+    def from_bars(cls, bars):
+        """봉 dict 목록으로 생성 (날짜 순이 아니면 한 번 정렬, 같은 날짜는 입력 순서 유지)"""
+        bars = list(bars)
+        dates = [int(bar['date']) for bar in bars]
+        if any(dates[i] > dates[i + 1] for i in range(len(dates) - 1)):
+            order = sorted(range(len(bars)), key=dates.__getitem__)
+            bars = [bars[i] for i in order]
+            dates = [dates[i] for i in order]
+
+        fields = [field for field in PRICE_FIELDS if bars and field in bars[0]]
+        columns = {field: array('q', [int(bar.get(field, 0)) for bar in bars]) for field in fields}
+        return cls(array('q', dates), columns)
+
+    @classmethod
+    def empty(cls):
+        return cls(array('q'), {field: array('q') for field in PRICE_FIELDS})
+
+    def __len__(self):
+        return len(self.dates)
+
+    def __getitem__(self, index):
+        """봉 하나를 dict로 (날짜는 저장 형식과 같은 문자열)"""
+        bar = {"date": str(self.dates[index])}
+        for field in self.fields:
+            bar[field] = getattr(self, field)[index]
+        return bar
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def column(self, field):
+        return self.dates if field == "date" else getattr(self, field)
+
+    def tail(self, count):
+        """최근 count개 봉 (memoryview 슬라이스, 복사 없음)"""
+        start = max(len(self.dates) - max(count, 0), 0)
+        return BarSeries(memoryview(self.dates)[start:],
+                         {field: memoryview(getattr(self, field))[start:] for field in self.fields})
+
+    def before(self, date):
+        """date 이전 봉만 (날짜 오름차순이므로 앞쪽 구간 슬라이스)"""
+        date = int(date)
+        end = len(self.dates)
+        while end and self.dates[end - 1] >= date:
+            end -= 1
+        return BarSeries(memoryview(self.dates)[:end],
+                         {field: memoryview(getattr(self, field))[:end] for field in self.fields})
+
+    def to_bars(self):
+        """봉 dict 목록으로 변환 (저장/응답용)"""
+        return list(self)
+
+    def monthly(self):
+        """일봉으로 월봉 생성 (aggregate_monthly와 같은 결과, 날짜는 yyyymm)"""
+        dates = array('q')
+        columns = {field: array('q') for field in self.fields}
+        highs, lows, closes, volumes = (columns.get(field) for field in ("high", "low", "close", "volume"))
+        current = None
+
+        for i, date in enumerate(self.dates):
+            month = date // 100
+            if month != current:
+                current = month
+                dates.append(month)
+                for field, values in columns.items():
+                    values.append(getattr(self, field)[i])
+                continue
+            if highs is not None:
+                highs[-1] = max(highs[-1], self.high[i])
+            if lows is not None:
+                lows[-1] = min(lows[-1], self.low[i])
+            if closes is not None:
+                closes[-1] = self.close[i]
+            if volumes is not None:
+                volumes[-1] += self.volume[i]
+
+        return BarSeries(dates, columns)
+
+    @property
+    def nbytes(self):
+        return sum(memoryview(self.column(field)).nbytes for field in ("date",) + self.fields)
+
+
+def as_series(bars):
+    """BarSeries는 그대로, 봉 dict 목록은 BarSeries로 변환"""
+    return bars if isinstance(bars, BarSeries) else BarSeries.from_bars(bars)
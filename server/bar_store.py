@@ -0,0 +1,146 @@
+import os
+import json
+import logging
+from datetime import datetime, timedelta, time as dtime
+
+from bar_series import BarSeries
+
+DEFAULT_ROOT = os.getenv('BAR_STORE_DIR',
+                         os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bar_store'))
+
+# 정규장 종료 시각 (이후 동기화된 데이터는 다음 거래일까지 최신으로 간주)
+MARKET_CLOSE = dtime(15, 30)
+
+PRICE_FIELDS = ("open", "high", "low", "close")
+
+
+def last_market_close(now=None):
+    """가장 최근 장 마감 시각 (주말 제외, 공휴일은 고려하지 않음)"""
+    now = now or datetime.now()
+    close = datetime.combine(now.date(), MARKET_CLOSE)
+    if now < close:
+        close -= timedelta(days=1)
+    while close.weekday() >= 5:
+        close -= timedelta(days=1)
+    return close
+
+
+class BarStore:
+    """종목코드/주기별 OHLCV 로컬 저장소 (종목별 마지막 동기화 시각 기록)
+
+    파일은 봉 dict 목록(JSON)으로 두고, 메모리에는 읽을 때 한 번 정렬한 BarSeries로 캐시한다.
+    """
+
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+        self.cache = {}
+
+    def path(self, code, timeframe):
+        return os.path.join(self.root, timeframe, f"{code}.json")
+
+    def read(self, code, timeframe):
+        """저장된 파일 읽기 (없으면 빈 레코드, 봉은 BarSeries)"""
+        key = (code, timeframe)
+        if key in self.cache:
+            return self.cache[key]
+
+        record = {"code": code, "timeframe": timeframe, "last_synced": None, "bars": []}
+        path = self.path(code, timeframe)
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    record = json.load(f)
+            except Exception as e:
+                logging.error(f"{code} {timeframe} 저장 데이터 읽기 실패: {e}")
+
+        record['bars'] = BarSeries.from_bars(record['bars'])
+        self.cache[key] = record
+        return record
+
+    def write(self, record):
+        """임시 파일에 쓴 뒤 교체 (중간에 종료되어도 기존 파일 보존)"""
+        path = self.path(record['code'], record['timeframe'])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(dict(record, bars=record['bars'].to_bars()), f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    def series(self, code, timeframe, count=None):
+        """저장된 봉 BarSeries (날짜 오름차순, count 지정 시 최근 count개를 복사 없이)"""
+        series = self.read(code, timeframe)['bars']
+        if count is not None:
+            return series.tail(count)
+        return series
+
+    def load(self, code, timeframe, count=None):
+        """저장된 봉 데이터 dict 목록 (날짜 오름차순, count 지정 시 최근 count개)"""
+        return self.series(code, timeframe, count).to_bars()
+
+    def last_date(self, code, timeframe):
+        """저장된 마지막 봉 날짜"""
+        series = self.read(code, timeframe)['bars']
+        return str(series.dates[-1]) if len(series) else None
+
+    def last_synced(self, code, timeframe):
+        """마지막 동기화 시각"""
+        synced = self.read(code, timeframe)['last_synced']
+        return datetime.fromisoformat(synced) if synced else None
+
+    def is_fresh(self, code, timeframe, now=None):
+        """마지막 장 마감 이후 동기화되었는지 여부 (TR 요청 생략 가능)"""
+        synced = self.last_synced(code, timeframe)
+        return synced is not None and synced >= last_market_close(now)
+
+    def merge(self, code, timeframe, bars, now=None):
+        """새로 받은 봉을 날짜 기준으로 병합 후 저장
+
+        반환값은 받은 봉이 기존 저장 구간까지 닿았는지 여부로,
+        True이면 더 이전 구간을 추가로 요청할 필요가 없다.
+        """
+        record = self.read(code, timeframe)
+        stored = self.adjust_stored(code, record['bars'].to_bars(), bars)
+        last_stored = stored[-1]['date'] if stored else None
+
+        merged = {bar['date']: bar for bar in stored}
+        for bar in bars:
+            merged[bar['date']] = bar
+        record['bars'] = BarSeries.from_bars([merged[date] for date in sorted(merged)])
+        record['last_synced'] = (now or datetime.now()).isoformat(timespec='seconds')
+        self.write(record)
+
+        if last_stored is None or not bars:
+            return False
+        return min(bar['date'] for bar in bars) <= last_stored
+
+    def adjust_stored(self, code, stored, bars):
+        """수정주가 반영: 겹치는 날의 종가가 달라졌으면 그 이전 저장분을 같은 비율로 보정"""
+        if not stored or not bars:
+            return stored
+
+        oldest = min(bars, key=lambda bar: bar['date'])
+        old_bar = next((bar for bar in stored if bar['date'] == oldest['date']), None)
+        if old_bar is None or not old_bar.get('close') or old_bar['close'] == oldest['close']:
+            return stored
+
+        ratio = oldest['close'] / old_bar['close']
+        logging.info(f"{code} 수정주가 변경 감지 (비율 {ratio:.4f}), 이전 이력 보정")
+
+        adjusted = []
+        for bar in stored:
+            if bar['date'] < oldest['date']:
+                bar = dict(bar)
+                for field in PRICE_FIELDS:
+                    if field in bar:
+                        bar[field] = round(bar[field] * ratio)
+                if bar.get('volume'):
+                    bar['volume'] = round(bar['volume'] / ratio)
+            adjusted.append(bar)
+        return adjusted
+
+    def codes(self, timeframe):
+        """저장된 종목코드 목록"""
+        directory = os.path.join(self.root, timeframe)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-5] for name in os.listdir(directory) if name.endswith('.json'))
@@ -0,0 +1,89 @@
+import os
+import json
+import logging
+import weakref
+from datetime import datetime
+
+DEFAULT_PATH = os.getenv('CONDITION_CACHE_PATH',
+                         os.path.join(os.path.dirname(os.path.abspath(__file__)), 'condition_cache.json'))
+
+
+class ConditionCache:
+    """조건식 목록 (인덱스, 조건명) 캐시 - OnReceiveConditionVer로 무효화, 파일로 보존
+
+    키움은 로그인 세션마다 GetConditionLoad를 한 번 호출해야 SendCondition이 동작하므로
+    세션별 로드 여부는 메모리에만 두고, 목록은 파일에 저장해 재시작 직후에도 바로 돌려준다.
+    목록 내용이 바뀌거나 무효화될 때마다 version이 1씩 증가한다.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.sessions = weakref.WeakSet()
+        self.data = self.read()
+
+    def read(self):
+        """저장된 캐시 읽기 (없거나 손상되면 빈 캐시)"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            data["conditions"] = [tuple(item) for item in data.get("conditions", [])]
+            return data
+        except (OSError, ValueError):
+            return {"version": 0, "updated_at": None, "conditions": []}
+
+    def write(self):
+        """임시 파일에 쓴 뒤 교체"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.warning(f"조건식 캐시 저장 실패: {e}")
+
+    @property
+    def version(self):
+        return self.data["version"]
+
+    def get(self):
+        """캐시된 조건식 목록 (없으면 None)"""
+        return list(self.data["conditions"]) or None
+
+    def is_loaded(self, session):
+        """해당 세션에서 GetConditionLoad를 이미 호출했는지"""
+        return session in self.sessions
+
+    def put(self, conditions, session=None):
+        """조건식 로드 결과 저장 (내용이 바뀐 경우에만 버전 증가)"""
+        conditions = [tuple(item) for item in conditions]
+        if conditions != self.data["conditions"]:
+            self.data["version"] += 1
+            self.data["conditions"] = conditions
+        self.data["updated_at"] = datetime.now().isoformat(timespec='seconds')
+        self.write()
+        if session is not None:
+            self.sessions.add(session)
+
+    def invalidate(self):
+        """조건식 변경 통지: 목록을 비우고 모든 세션에서 다시 로드하게 함"""
+        self.data["version"] += 1
+        self.data["conditions"] = []
+        self.data["updated_at"] = datetime.now().isoformat(timespec='seconds')
+        self.sessions.clear()
+        self.write()
+        logging.info(f"조건식 캐시 무효화 (버전 {self.version})")
+
+
+# 전역 캐시 (같은 프로세스의 모든 객체가 공유)
+condition_cache = None
+
+
+def get_condition_cache():
+    """조건식 캐시 인스턴스 반환"""
+    global condition_cache
+    if condition_cache is None:
+        condition_cache = ConditionCache()
+    return condition_cache
@@ -0,0 +1,325 @@
+import re
+from collections import OrderedDict
+
+import numpy as np
+
+from condition_engine import (PricePanel, align, tail_upward, bottom_twice, downtrend,
+                              TAIL_WINDOW, TAIL_RATIO, TAIL_MIN_DAYS, TAIL_MIN_BARS,
+                              BOTTOM_WINDOW, BOTTOM_BAND, BOTTOM_MIN_COUNT, BOTTOM_MIN_BARS,
+                              TREND_SHORT, TREND_LONG, DECLINE_CUTOFF)
+
+# 이름으로 부르는 스크린 (조건검색 필터 / 고급 필터와 같은 판정)
+SCREENS = {
+    "condition_filter": "tail_upward & bottom_twice & !downtrend",
+    "advanced_filter": "tail_upward(min_bars=20) & bottom_twice(min_bars=20)"
+}
+DEFAULT_SCREEN = "condition_filter"
+
+# 스크린 식 최대 길이
+MAX_SCREEN_LENGTH = 1000
+
+# 캐시하는 컴파일 계획 수 (요청마다 다른 식이 들어와도 메모리가 늘지 않도록)
+MAX_CACHED_PLANS = 128
+
+TOKEN_PATTERN = re.compile(r"\s*(?:(\d+(?:\.\d*)?|\.\d+)|([A-Za-z_]\w*)|(.))")
+
+
+class ScreenError(ValueError):
+    """스크린 식 문법/인자 오류"""
+
+
+class Predicate:
+    """스크린에서 쓸 수 있는 조건 (엔진 함수, 인자 기본값, 필요한 봉 종류)"""
+
+    def __init__(self, name, func, timeframe, defaults, score, window, check=None, optional=()):
+        self.name = name
+        self.func = func
+        self.timeframe = timeframe
+        self.defaults = defaults    # (인자명, 기본값) 순서대로
+        self.score = score          # 결과 컬럼에 넣을 점수 이름
+        self.window = window        # 인자 -> 필요한 최근 봉 수
+        self.check = check          # 인자 dict -> 오류 메시지 (문제가 없으면 None)
+        self.optional = optional    # none(판정 안 함)을 허용하는 인자
+
+    def bind(self, args, kwargs):
+        """위치/키워드 인자를 기본값과 합쳐 (인자명, 값) 튜플로 정리"""
+        names = [name for name, _ in self.defaults]
+        if len(args) > len(names):
+            raise ScreenError(f"{self.name}: 인자는 최대 {len(names)}개입니다")
+
+        values = dict(self.defaults)
+        values.update(zip(names, args))
+        for name, value in kwargs.items():
+            if name not in values:
+                raise ScreenError(f"{self.name}: 알 수 없는 인자 '{name}'")
+            if name in names[:len(args)]:
+                raise ScreenError(f"{self.name}: 인자 '{name}'가 중복되었습니다")
+            values[name] = value
+
+        for name, default in self.defaults:
+            value = values[name]
+            if value is None and name not in self.optional:
+                raise ScreenError(f"{self.name}: 인자 '{name}'에는 none을 쓸 수 없습니다")
+            if isinstance(default, int) and not (isinstance(value, int) and value >= 0):
+                raise ScreenError(f"{self.name}: 인자 '{name}'는 0 이상의 정수여야 합니다")
+        error = self.check(values) if self.check else None
+        if error:
+            raise ScreenError(f"{self.name}: {error}")
+        return tuple((name, values[name]) for name in names)
+
+    def run(self, panel, params, cache):
+        return self.func(panel, cache=cache, **dict(params))
+
+
+def check_window(values):
+    """창 길이는 1 이상, 최소 일수/횟수는 창 길이 이하"""
+    if values["window"] < 1:
+        return "window는 1 이상이어야 합니다"
+    for name in ("min_days", "min_count"):
+        if values.get(name, 0) > values["window"]:
+            return f"{name}는 window({values['window']}) 이하여야 합니다"
+    return None
+
+
+def check_band(values):
+    """band는 최저가 대비 배수 (1.02 = +2%)"""
+    error = check_window(values)
+    if error is None and values["band"] < 1:
+        error = f"band는 최저가 대비 배수(1.02 = +2%)로 1 이상이어야 합니다: {values['band']}"
+    return error
+
+
+def check_trend(values):
+    """단기/장기 개월 수는 1 이상이고 단기 < 장기"""
+    if values["short"] < 1 or values["long"] < 1:
+        return "short와 long은 1 이상이어야 합니다"
+    if values["short"] >= values["long"]:
+        return f"short({values['short']})는 long({values['long']})보다 작아야 합니다"
+    return None
+
+
+PREDICATES = {
+    predicate.name: predicate for predicate in [
+        Predicate("tail_upward", tail_upward, "daily",
+                  (("window", TAIL_WINDOW), ("ratio", TAIL_RATIO), ("min_days", TAIL_MIN_DAYS),
+                   ("min_bars", TAIL_MIN_BARS)),
+                  "tail_count", lambda params: params["window"], check_window),
+        # band는 condition_params, 파라미터 탐색, 백테스트와 같이 최저가 대비 배수 (1.02 = +2%)
+        Predicate("bottom_twice", bottom_twice, "daily",
+                  (("window", BOTTOM_WINDOW), ("band", BOTTOM_BAND), ("min_count", BOTTOM_MIN_COUNT),
+                   ("min_bars", BOTTOM_MIN_BARS)),
+                  "bottom_count", lambda params: params["window"], check_band),
+        Predicate("downtrend", downtrend, "monthly",
+                  (("short", TREND_SHORT), ("long", TREND_LONG), ("cutoff", DECLINE_CUTOFF)),
+                  "decline_rate", lambda params: params["long"], check_trend, optional=("cutoff",))
+    ]
+}
+
+
+def tokenize(text):
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(text):
+        number, name, symbol = match.groups()
+        if number is not None:
+            tokens.append(("number", float(number) if "." in number else int(number)))
+        elif name is not None:
+            tokens.append(("name", name))
+        elif symbol is not None and not symbol.isspace():
+            tokens.append(("symbol", symbol))
+    return tokens
+
+
+class Parser:
+    """재귀 하강 파서 (우선순위: ! > & > |)
+
+    screen := term ('|' term)*
+    term   := factor ('&' factor)*
+    factor := '!' factor | '(' screen ')' | name ['(' args ')']
+    args   := arg (',' arg)*,  arg := number | name '=' (number | none)
+    """
+
+    def __init__(self, text):
+        self.tokens = tokenize(text)
+        self.pos = 0
+        self.calls = []     # 중복 없는 조건 호출 (이름, 인자)
+        self.index = {}
+
+    def peek(self, kind=None, value=None):
+        if self.pos >= len(self.tokens):
+            return None
+        token = self.tokens[self.pos]
+        if (kind is None or token[0] == kind) and (value is None or token[1] == value):
+            return token
+        return None
+
+    def take(self, kind=None, value=None):
+        token = self.peek(kind, value)
+        if token is None:
+            found = self.tokens[self.pos][1] if self.pos < len(self.tokens) else "끝"
+            raise ScreenError(f"'{value or kind}'가 필요한 위치에 '{found}'가 있습니다")
+        self.pos += 1
+        return token
+
+    def parse(self):
+        node = self.screen()
+        if self.pos != len(self.tokens):
+            raise ScreenError(f"해석할 수 없는 토큰 '{self.tokens[self.pos][1]}'")
+        return node
+
+    def screen(self):
+        nodes = [self.term()]
+        while self.peek("symbol", "|"):
+            self.take()
+            nodes.append(self.term())
+        return nodes[0] if len(nodes) == 1 else ("or", tuple(nodes))
+
+    def term(self):
+        nodes = [self.factor()]
+        while self.peek("symbol", "&"):
+            self.take()
+            nodes.append(self.factor())
+        return nodes[0] if len(nodes) == 1 else ("and", tuple(nodes))
+
+    def factor(self):
+        if self.peek("symbol", "!"):
+            self.take()
+            return ("not", self.factor())
+        if self.peek("symbol", "("):
+            self.take()
+            node = self.screen()
+            self.take("symbol", ")")
+            return node
+        return self.call()
+
+    def call(self):
+        name = self.take("name")[1]
+        predicate = PREDICATES.get(name)
+        if predicate is None:
+            raise ScreenError(f"알 수 없는 조건 '{name}' (사용 가능: {', '.join(PREDICATES)})")
+
+        args, kwargs = [], {}
+        if self.peek("symbol", "("):
+            self.take()
+            while not self.peek("symbol", ")"):
+                if args or kwargs:
+                    self.take("symbol", ",")
+                if self.peek("name") and self.tokens[self.pos + 1:self.pos + 2] == [("symbol", "=")]:
+                    key = self.take("name")[1]
+                    self.take("symbol", "=")
+                    kwargs[key] = self.value()
+                elif kwargs:
+                    raise ScreenError(f"{name}: 키워드 인자 뒤에 위치 인자를 쓸 수 없습니다")
+                else:
+                    args.append(self.value())
+            self.take("symbol", ")")
+
+        # 같은 조건/인자는 한 번만 계산
+        key = (name, predicate.bind(args, kwargs))
+        if key not in self.index:
+            self.index[key] = len(self.calls)
+            self.calls.append(key)
+        return ("call", self.index[key])
+
+    def value(self):
+        if self.peek("name", "none"):
+            self.take()
+            return None
+        return self.take("number")[1]
+
+
+class ScreenPlan:
+    """컴파일된 스크린 실행 계획
+
+    조건 호출은 인자까지 같으면 하나로 합치고, 평가할 때 엔진 중간 배열(최근 N봉 슬라이스,
+    꼬리 일수, 창별 최저가 등)을 캐시 dict로 공유해 같은 창을 쓰는 조건끼리 다시 계산하지 않는다.
+    """
+
+    def __init__(self, text, tree, calls):
+        self.text = text
+        self.tree = tree
+        self.calls = calls
+        self.timeframes = sorted({PREDICATES[name].timeframe for name, _ in calls})
+        # 봉 종류별로 필요한 최근 봉 수
+        self.windows = {}
+        for name, params in calls:
+            predicate = PREDICATES[name]
+            window = predicate.window(dict(params))
+            self.windows[predicate.timeframe] = max(self.windows.get(predicate.timeframe, 0), window)
+
+    def label(self, index):
+        name, params = self.calls[index]
+        return f"{name}({', '.join(f'{key}={value}' for key, value in params)})"
+
+    def evaluate(self, daily, monthly=None):
+        """패널로 판정 (evaluate_universe와 같은 컬럼 + 조건별 결과)
+
+        monthly가 없거나 종목이 빠진 경우 월봉 조건은 불만족(False)으로 둔다.
+        """
+        codes = daily.codes
+        panels = {"daily": daily, "monthly": monthly}
+        cache = {}
+        results = []
+        for name, params in self.calls:
+            predicate = PREDICATES[name]
+            panel = panels.get(predicate.timeframe)
+            if panel is None or not panel.codes:
+                ok, score = np.zeros(len(codes), dtype=bool), np.zeros(len(codes))
+            else:
+                ok, score = predicate.run(panel, params, cache)
+                if panel is not daily:
+                    ok, score = align(panel.codes, codes, ok, score)
+            results.append((ok, score))
+
+        columns = {"code": codes}
+        # 조건 이름별 첫 호출 결과는 evaluate_universe와 같은 이름으로도 둠
+        for (name, _), (ok, score) in zip(self.calls, results):
+            if name not in columns:
+                columns[name] = ok
+                columns[PREDICATES[name].score] = score
+        columns["predicates"] = {self.label(i): result for i, result in enumerate(results)}
+        columns["passed"] = self.run(self.tree, results)
+        return columns
+
+    def run(self, node, results):
+        kind = node[0]
+        if kind == "call":
+            return results[node[1]][0]
+        if kind == "not":
+            return ~self.run(node[1], results)
+        values = [self.run(child, results) for child in node[1]]
+        combine = np.logical_and if kind == "and" else np.logical_or
+        return combine.reduce(values)
+
+    def scan(self, store, codes=None):
+        """로컬 저장소 일봉으로 판정 (월봉은 조건검색과 같이 일봉에서 생성)"""
+        codes = store.codes("daily") if codes is None else codes
+        daily_series = {code: store.series(code, "daily") for code in codes}
+
+        daily = PricePanel.from_bars(daily_series, self.windows.get("daily", 1))
+        monthly = None
+        if "monthly" in self.windows:
+            monthly = PricePanel.from_bars({code: series.monthly() for code, series in daily_series.items()},
+                                           self.windows["monthly"])
+        return self.evaluate(daily, monthly)
+
+
+# 컴파일된 계획 LRU 캐시 (식 문자열 -> ScreenPlan)
+plan_cache = OrderedDict()
+
+
+def compile_screen(screen=DEFAULT_SCREEN):
+    """스크린 이름 또는 식을 실행 계획으로 컴파일 (같은 식은 캐시된 계획 재사용)"""
+    text = SCREENS.get(screen, screen)
+    plan = plan_cache.get(text)
+    if plan is not None:
+        plan_cache.move_to_end(text)
+    else:
+        if not text or len(text) > MAX_SCREEN_LENGTH:
+            raise ScreenError("스크린 식이 비어 있거나 너무 깁니다")
+        parser = Parser(text)
+        tree = parser.parse()
+        plan = ScreenPlan(text, tree, parser.calls)
+        plan_cache[text] = plan
+        while len(plan_cache) > MAX_CACHED_PLANS:
+            plan_cache.popitem(last=False)
+    return plan
@@ -0,0 +1,304 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from bar_series import as_series
+from condition_params import (TAIL_WINDOW, TAIL_RATIO, TAIL_MIN_DAYS, TAIL_MIN_BARS,
+                              BOTTOM_WINDOW, BOTTOM_BAND, BOTTOM_MIN_COUNT, BOTTOM_MIN_BARS,
+                              TREND_SHORT, TREND_LONG, DECLINE_CUTOFF)
+
+FIELDS = ("open", "high", "low", "close", "volume")
+
+
+def memo(cache, key, compute):
+    """중간 배열 재사용 (같은 평가 안에서 여러 조건이 같은 창/비율을 쓰면 한 번만 계산)"""
+    if cache is None:
+        return compute()
+    if key not in cache:
+        cache[key] = compute()
+    return cache[key]
+
+
+class PricePanel:
+    """종목 x 일자 2차원 가격 배열
+
+    종목마다 길이가 다르므로 최신 봉을 마지막 열에 맞춰 오른쪽 정렬하고,
+    데이터가 없는 앞쪽 칸은 valid=False(가격 0)로 둔다. 가격은 float64로 두는데
+    키움 가격/거래량은 2^53보다 작은 정수라 정수 연산과 결과가 같다.
+    """
+
+    def __init__(self, codes, columns, valid, dates):
+        self.codes = list(codes)
+        self.columns = columns
+        self.valid = valid
+        self.dates = dates
+
+    def __getitem__(self, field):
+        return self.columns[field]
+
+    @property
+    def lengths(self):
+        return self.valid.sum(axis=1)
+
+    @classmethod
+    def from_bars(cls, bars_by_code, window=None):
+        """{종목코드: BarSeries 또는 봉 목록}으로 생성 (window: 최근 window개만 사용)"""
+        codes = list(bars_by_code)
+        series_by_code = [as_series(bars_by_code[code]) for code in codes]
+        width = max((len(series) for series in series_by_code), default=0)
+        if window is not None:
+            width = min(width, window)
+
+        columns = {field: np.zeros((len(codes), width)) for field in FIELDS}
+        valid = np.zeros((len(codes), width), dtype=bool)
+        dates = np.zeros((len(codes), width), dtype=np.int64)
+
+        for row, series in enumerate(series_by_code):
+            # 컬럼 배열을 버퍼 그대로 복사 (봉 dict를 거치지 않음)
+            recent = series.tail(width)
+            start = width - len(recent)
+            for field in recent.fields:
+                columns[field][row, start:] = recent.column(field)
+            valid[row, start:] = True
+            dates[row, start:] = recent.dates
+
+        return cls(codes, columns, valid, dates)
+
+    @classmethod
+    def from_store(cls, store, codes, timeframe, window=None):
+        """로컬 봉 저장소에서 생성"""
+        return cls.from_bars({code: store.series(code, timeframe, window) for code in codes}, window)
+
+    def tail(self, window):
+        """최근 window개 열만 남긴 배열 묶음 (열, valid)"""
+        width = min(window, self.valid.shape[1])
+        columns = {field: values[:, -width:] if width else values[:, :0]
+                   for field, values in self.columns.items()}
+        return columns, (self.valid[:, -width:] if width else self.valid[:, :0])
+
+
+def tail_flags(open_, high, low, close, valid, ratio=TAIL_RATIO):
+    """날짜별 꼬리 우상향 여부 (양봉, 봉 길이 > 0, 아래꼬리 >= 봉 길이 x ratio)"""
+    total = high - low
+    tail = open_ - low
+    return valid & (open_ < close) & (total != 0) & (tail >= total * ratio)
+
+
+def recent(panel, window, cache=None):
+    """최근 window개 열 (열, valid, 종목별 봉 수)"""
+    def compute():
+        columns, valid = panel.tail(window)
+        return columns, valid, valid.sum(axis=1)
+    return memo(cache, ("recent", id(panel), window), compute)
+
+
+def tail_upward(panel, window=TAIL_WINDOW, ratio=TAIL_RATIO, min_days=TAIL_MIN_DAYS,
+                min_bars=TAIL_MIN_BARS, cache=None):
+    """조건 1 (만족 여부, 꼬리 우상향 일수)
+
+    min_bars=3이면 check_condition_1, min_bars=20이면 check_tail_upward와 같은 결과.
+    """
+    columns, valid, bars = recent(panel, window, cache)
+
+    def compute():
+        flags = tail_flags(columns["open"], columns["high"], columns["low"], columns["close"], valid, ratio)
+        return flags.sum(axis=1)
+
+    count = memo(cache, ("tail_count", id(panel), window, ratio), compute)
+    return (bars >= min_bars) & (count >= min_days), count
+
+
+def bottom_twice(panel, window=BOTTOM_WINDOW, band=BOTTOM_BAND, min_count=BOTTOM_MIN_COUNT,
+                 min_bars=BOTTOM_MIN_BARS, cache=None):
+    """조건 2 (만족 여부, 바닥권 저가 횟수)
+
+    min_bars=2이면 check_condition_2, min_bars=20이면 check_bottom_twice와 같은 결과.
+    """
+    columns, valid, bars = recent(panel, window, cache)
+
+    def lowest():
+        lows = np.where(valid, columns["low"], np.inf)
+        return lows, lows.min(axis=1, initial=np.inf)
+
+    def compute():
+        lows, min_low = memo(cache, ("lowest", id(panel), window), lowest)
+        return (valid & (lows <= (min_low * band)[:, None])).sum(axis=1)
+
+    count = memo(cache, ("bottom_count", id(panel), window, band), compute)
+    return (bars >= min_bars) & (count >= min_count), count
+
+
+def downtrend(panel, short=TREND_SHORT, long=TREND_LONG, cutoff=DECLINE_CUTOFF, cache=None):
+    """조건 3 하락장 여부 (하락장 여부, 고점 대비 하락률)
+
+    cutoff=0.5이면 check_condition_3, cutoff=None이면 is_downtrend와 같은 결과.
+    평균 비교는 나눗셈 대신 합계를 교차 곱해 정수 연산과 같게 비교한다.
+    """
+    columns, valid, bars = recent(panel, long, cache)
+    closes = columns["close"]
+    enough = bars >= long
+
+    if closes.shape[1] < long:
+        return np.zeros(len(panel.codes), dtype=bool), np.zeros(len(panel.codes))
+
+    max_price = closes.max(axis=1)
+    current = closes[:, -1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        decline = np.where(max_price > 0, (max_price - current) / max_price, 0.0)
+
+    below = closes[:, -short:].sum(axis=1) * long < closes.sum(axis=1) * short
+    result = enough & below
+    if cutoff is not None:
+        result &= ~(decline >= cutoff)
+    return result, decline
+
+
+def align(source_codes, target_codes, ok, score):
+    """다른 패널의 판정 결과를 대상 종목 순서로 맞춤 (없는 종목은 False / 0)"""
+    order = {code: row for row, code in enumerate(source_codes)}
+    rows = np.array([order.get(code, -1) for code in target_codes], dtype=np.int64)
+    found = rows >= 0
+    aligned_ok = np.zeros(len(target_codes), dtype=bool)
+    aligned_score = np.zeros(len(target_codes), dtype=score.dtype)
+    aligned_ok[found] = ok[rows[found]]
+    aligned_score[found] = score[rows[found]]
+    return aligned_ok, aligned_score
+
+
+def evaluate_universe(daily, monthly=None):
+    """전 종목 조건 1~3 일괄 판정 (종목별 판정/점수 컬럼)
+
+    monthly가 없으면 조건 3은 판정하지 않고 하락장이 아닌 것으로 둔다.
+    """
+    tail_ok, tail_count = tail_upward(daily)
+    bottom_ok, bottom_count = bottom_twice(daily)
+
+    is_downtrend = np.zeros(len(daily.codes), dtype=bool)
+    decline_rate = np.zeros(len(daily.codes))
+    if monthly is not None and monthly.codes:
+        # 월봉 패널 종목 순서를 일봉 패널에 맞춤
+        is_downtrend, decline_rate = align(monthly.codes, daily.codes, *downtrend(monthly))
+
+    return {
+        "code": daily.codes,
+        "tail_upward": tail_ok,
+        "tail_count": tail_count,
+        "bottom_twice": bottom_ok,
+        "bottom_count": bottom_count,
+        "downtrend": is_downtrend,
+        "decline_rate": decline_rate,
+        "passed": tail_ok & bottom_ok & ~is_downtrend
+    }
+
+
+def scan_store(store, codes=None):
+    """로컬 저장소 일봉으로 전 종목 판정 (월봉은 조건검색과 같이 일봉에서 생성)"""
+    codes = store.codes("daily") if codes is None else codes
+    daily_series = {code: store.series(code, "daily") for code in codes}
+
+    daily = PricePanel.from_bars(daily_series, max(TAIL_WINDOW, BOTTOM_WINDOW))
+    monthly = PricePanel.from_bars({code: series.monthly() for code, series in daily_series.items()},
+                                   TREND_LONG)
+    return evaluate_universe(daily, monthly)
+
+
+def rolling_tail_upward(panel, window=TAIL_WINDOW, ratio=TAIL_RATIO, min_days=TAIL_MIN_DAYS,
+                        min_bars=TAIL_MIN_BARS):
+    """모든 날짜에서 그날까지의 데이터로 본 조건 1 (종목 x 일자 bool)"""
+    flags = tail_flags(panel["open"], panel["high"], panel["low"], panel["close"], panel.valid, ratio)
+    count = rolling_sum(flags, window)
+    bars = rolling_sum(panel.valid, window)
+    return panel.valid & (bars >= min_bars) & (count >= min_days)
+
+
+def rolling_bottom_twice(panel, window=BOTTOM_WINDOW, band=BOTTOM_BAND, min_count=BOTTOM_MIN_COUNT,
+                         min_bars=BOTTOM_MIN_BARS):
+    """모든 날짜에서 그날까지의 데이터로 본 조건 2 (종목 x 일자 bool)"""
+    if panel.valid.shape[1] == 0:
+        # 봉이 하나도 없으면 창을 만들 수 없음 (모두 불만족)
+        return np.zeros(panel.valid.shape, dtype=bool)
+    lows = np.where(panel.valid, panel["low"], np.inf)
+    padded = np.concatenate([np.full((lows.shape[0], window - 1), np.inf), lows], axis=1)
+    windows = sliding_window_view(padded, window, axis=1)
+    threshold = windows.min(axis=2) * band
+    count = (windows <= threshold[:, :, None]).sum(axis=2)
+    bars = rolling_sum(panel.valid, window)
+    return panel.valid & (bars >= min_bars) & (count >= min_count)
+
+
+def rolling_downtrend(panel, short=TREND_SHORT, long=TREND_LONG, cutoff=DECLINE_CUTOFF):
+    """모든 날짜에서 그날까지의 일봉으로 만든 월봉으로 본 조건 3 (종목 x 일자 bool)
+
+    그날이 속한 달은 그날 종가를 월 종가로 보고, 이전 달들은 각 달 마지막 거래일 종가를 쓴다.
+    """
+    result, decline = rolling_trend(panel, short, long)
+    if cutoff is not None:
+        result = result & ~(decline >= cutoff)
+    return result
+
+
+def rolling_trend(panel, short=TREND_SHORT, long=TREND_LONG):
+    """rolling_downtrend의 하락률 기준 적용 전 단계 (평균 비교 결과, 고점 대비 하락률)"""
+    valid = panel.valid
+    closes = panel["close"]
+    rows, width = valid.shape
+    months = np.where(valid, panel.dates // 100, -1)
+
+    # 종목별 몇 번째 달인지 (1부터) 와 달 마지막 봉 위치
+    previous = np.concatenate([np.full((rows, 1), -1), months[:, :-1]], axis=1)
+    following = np.concatenate([months[:, 1:], np.full((rows, 1), -1)], axis=1)
+    ordinal = np.cumsum(valid & (months != previous), axis=1)
+    month_end = valid & (months != following)
+
+    # 종목별 확정 월 종가 (달 순서대로)
+    end_rows, end_cols = np.nonzero(month_end)
+    count = max(int(ordinal.max(initial=0)), 1)
+    month_closes = np.zeros((rows, count))
+    month_closes[end_rows, ordinal[end_rows, end_cols] - 1] = closes[end_rows, end_cols]
+
+    # 월 단위로 이전 short-1 / long-1개월 종가 합과 최고가를 먼저 구한 뒤 날짜별로 한 번씩 조회
+    prefix = np.concatenate([np.zeros((rows, 1)), np.cumsum(month_closes, axis=1)], axis=1)
+    current = np.arange(count)
+    short_sums = prefix[:, current] - prefix[:, np.maximum(current - (short - 1), 0)]
+    long_sums = prefix[:, current] - prefix[:, np.maximum(current - (long - 1), 0)]
+    previous_max = np.zeros((rows, count))
+    for back in range(1, long):
+        previous_max[:, back:] = np.maximum(previous_max[:, back:], month_closes[:, :-back])
+
+    index = np.maximum(ordinal - 1, 0)
+    short_sum = np.take_along_axis(short_sums, index, axis=1)
+    long_sum = np.take_along_axis(long_sums, index, axis=1)
+    max_price = np.maximum(np.take_along_axis(previous_max, index, axis=1), closes)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        decline = np.where(max_price > 0, (max_price - closes) / max_price, 0.0)
+    below = (short_sum + closes) * long < (long_sum + closes) * short
+    return valid & (ordinal >= long) & below, decline
+
+
+def rolling_smallest(panel, field, window, count, chunk_rows=256):
+    """모든 날짜에서 최근 window개 값 중 작은 순서로 count개 (count x 종목 x 일자, 없는 칸은 inf)
+
+    k번째로 작은 값을 알면 "최저가 x band 이하가 k번 이상"을 band마다 창을 다시 보지 않고
+    k번째 값 <= 최저가 x band 비교 한 번으로 판정할 수 있다. 메모리를 줄이려고 종목을 나눠 계산한다.
+    """
+    values = np.where(panel.valid, panel[field], np.inf)
+    rows, width = values.shape
+    count = min(count, window)
+    result = np.full((count, rows, width), np.inf)
+    if width == 0:
+        return result
+    padded = np.concatenate([np.full((rows, window - 1), np.inf), values], axis=1)
+    for start in range(0, rows, chunk_rows):
+        windows = sliding_window_view(padded[start:start + chunk_rows], window, axis=1)
+        smallest = np.partition(windows, list(range(count)), axis=2)[:, :, :count]
+        result[:, start:start + chunk_rows] = np.moveaxis(smallest, 2, 0)
+    return result
+
+
+def rolling_sum(values, window):
+    """각 날짜까지 최근 window개 합 (앞쪽은 있는 만큼만)"""
+    cumulative = np.cumsum(values, axis=1, dtype=np.int64)
+    shifted = np.zeros_like(cumulative)
+    if window < cumulative.shape[1]:
+        shifted[:, window:] = cumulative[:, :-window]
+    return cumulative - shifted
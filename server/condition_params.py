@@ -0,0 +1,18 @@
+# 조건 1~3 판정 기준 (numpy 없이 쓰는 모듈도 같은 값을 쓰도록 한 곳에 모음)
+
+# 조건 1: 꼬리 우상향 (최근 20일 중 양봉이면서 아래꼬리가 봉 길이의 30% 이상인 날이 3일 이상)
+TAIL_WINDOW = 20
+TAIL_RATIO = 0.3
+TAIL_MIN_DAYS = 3
+TAIL_MIN_BARS = 3
+
+# 조건 2: 바닥 2회 (최근 20일 저가 중 최저가 +2% 이내가 2회 이상)
+BOTTOM_WINDOW = 20
+BOTTOM_BAND = 1.02         # 최저가 대비 배수 (스크린 식, 파라미터 탐색, 백테스트 모두 같은 뜻)
+BOTTOM_MIN_COUNT = 2
+BOTTOM_MIN_BARS = 2
+
+# 조건 3: 하락장 (월봉 3개월 평균 < 6개월 평균, 6개월 고점 대비 50% 이상 하락 시 제외)
+TREND_SHORT = 3
+TREND_LONG = 6
+DECLINE_CUTOFF = 0.5
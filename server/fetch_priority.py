@@ -0,0 +1,161 @@
+import os
+import json
+import time
+import heapq
+import logging
+import itertools
+from datetime import timedelta
+
+from bar_store import last_market_close
+
+DEFAULT_PATH = os.getenv('SCAN_HISTORY_PATH',
+                         os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scan_history.json'))
+
+# 판정 기록이 없는 종목의 통과 근접도 사전값 (조건 절반 통과)
+PRIOR_CLOSENESS = 0.5
+
+# 만족 여부가 바뀐 종목을 우선하는 기간 (초)
+RECENT_CHANGE_SECONDS = 3 * 24 * 3600
+
+# 우선순위 = (통과 근접도(하한 MIN_RELEVANCE) + 최근 변경 가산) x (1 + 지난 장 마감 수 x STALE_WEIGHT)
+CHANGE_BONUS = 1.0
+MIN_RELEVANCE = 0.1
+STALE_WEIGHT = 0.5
+MAX_STALE_DAYS = 20
+
+
+def stale_days(store, code, timeframe, now=None):
+    """마지막 동기화 이후 지난 장 마감 수 (동기화 기록이 없으면 MAX_STALE_DAYS)"""
+    synced = store.last_synced(code, timeframe)
+    if synced is None:
+        return MAX_STALE_DAYS
+    days = 0
+    close = last_market_close(now)
+    while close > synced and days < MAX_STALE_DAYS:
+        days += 1
+        close = last_market_close(close - timedelta(seconds=1))
+    return days
+
+
+class ScanHistory:
+    """종목별 직전 판정 결과 (통과 근접도, 만족 여부, 만족 여부가 바뀐 시각)
+
+    통과 근접도는 판정 순서대로 통과한 조건 수 / 전체 조건 수 (모두 통과하면 1).
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.entries = self.read()
+        # 마지막 take_changes 이후 기록이 바뀐 종목 (워커 프로세스가 부모에게 넘겨 저장)
+        self.changed = set()
+
+    def read(self):
+        """저장된 기록 읽기 (없거나 손상되면 빈 기록)"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return {code: list(entry) for code, entry in json.load(f).items()}
+        except (OSError, ValueError):
+            return {}
+
+    def write(self):
+        """임시 파일에 쓴 뒤 교체"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.warning(f"판정 기록 저장 실패: {e}")
+
+    def record(self, code, closeness, passed, now=None):
+        """판정 결과 기록 (만족 여부가 바뀌면 변경 시각 갱신)"""
+        now = now or time.time()
+        previous = self.entries.get(code)
+        if previous is None:
+            changed_at = now if passed else None
+        else:
+            changed_at = now if bool(previous[1]) != bool(passed) else previous[2]
+        self.entries[code] = [round(closeness, 3), bool(passed), changed_at]
+        self.changed.add(code)
+
+    def mark_changed(self, code, now=None):
+        """실시간 조건검색 편입/이탈처럼 외부에서 알게 된 변경 기록"""
+        entry = self.entries.setdefault(code, [PRIOR_CLOSENESS, False, None])
+        entry[2] = now or time.time()
+        self.changed.add(code)
+
+    def take_changes(self):
+        """마지막 호출 이후 바뀐 종목별 기록을 꺼냄"""
+        changes = {code: self.entries[code] for code in self.changed}
+        self.changed = set()
+        return changes
+
+    def merge(self, changes):
+        """다른 프로세스가 바꾼 종목별 기록 반영"""
+        self.entries.update((code, list(entry)) for code, entry in changes.items())
+
+    def closeness(self, code):
+        entry = self.entries.get(code)
+        return entry[0] if entry else PRIOR_CLOSENESS
+
+    def recently_changed(self, code, now=None):
+        entry = self.entries.get(code)
+        return bool(entry and entry[2] and (now or time.time()) - entry[2] <= RECENT_CHANGE_SECONDS)
+
+
+class FetchQueue:
+    """종목 판정 순서 우선순위 큐
+
+    저장된 데이터가 최신인 종목은 TR 요청 없이 판정되므로 먼저 꺼내고, 나머지는
+    (직전 통과 근접도 + 최근 변경 가산) x 데이터 오래됨 순으로 꺼낸다. 시간당 TR 한도가
+    중간에 소진되어도 결과를 바꿀 가능성이 큰 종목부터 최신 데이터로 판정된다.
+    """
+
+    def __init__(self, codes, store, history=None, timeframe="daily", now=None):
+        self.store = store
+        self.history = history or get_scan_history()
+        self.timeframe = timeframe
+        self.now = now
+        self.heap = []
+        self.sequence = itertools.count()
+        for code in codes:
+            self.push(code)
+
+    def priority(self, code):
+        """(TR 요청 필요 여부, 우선순위 점수)"""
+        stale = not self.store.is_fresh(code, self.timeframe, self.now)
+        relevance = max(self.history.closeness(code), MIN_RELEVANCE)
+        if self.history.recently_changed(code, self.now.timestamp() if self.now else None):
+            relevance += CHANGE_BONUS
+        days = stale_days(self.store, code, self.timeframe, self.now) if stale else 0
+        return stale, relevance * (1 + days * STALE_WEIGHT)
+
+    def push(self, code):
+        stale, score = self.priority(code)
+        heapq.heappush(self.heap, (stale, -score, next(self.sequence), code))
+
+    def peek_stale(self):
+        """다음 종목이 TR 요청이 필요한 종목인지"""
+        return bool(self.heap) and self.heap[0][0]
+
+    def pop(self):
+        """다음 종목코드 (비었으면 None)"""
+        return heapq.heappop(self.heap)[3] if self.heap else None
+
+    def __len__(self):
+        return len(self.heap)
+
+
+# 전역 판정 기록 (같은 프로세스의 모든 객체가 공유)
+scan_history = None
+
+
+def get_scan_history():
+    """판정 기록 인스턴스 반환"""
+    global scan_history
+    if scan_history is None:
+        scan_history = ScanHistory()
+    return scan_history
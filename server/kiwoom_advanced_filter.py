@@ -2,10 +2,21 @@ import sys
 import json
 import time
 import locale
+from collections import deque
 from datetime import datetime, timedelta
-from PyQt5.QtWidgets import QApplication
-from PyQt5.QtCore import QEventLoop, QTimer
-from pykiwoom.kiwoom import *
+from kiwoom_backend import create_backend
+from kiwoom_client import KiwoomClient
+from stock_master import get_stock_master
+from tr_scheduler import TRScheduler, get_tr_scheduler
+from tr_registry import TRRequestRegistry, TRRequest
+from tr_parser import get_comm_data_ex, parse_chart_rows, columns_to_bars
+from result_delta import save_result
+from condition_params import (TAIL_WINDOW, TAIL_RATIO, TAIL_MIN_DAYS, BOTTOM_WINDOW, BOTTOM_BAND,
+                              BOTTOM_MIN_COUNT, TREND_SHORT, TREND_LONG)
+
+# 동시에 응답을 기다리는 종목 수
+PIPELINE_DEPTH = 3
+TR_TIMEOUT = 10
 
 # 한글 인코딩 설정
 if sys.platform.startswith('win'):
@@ -14,23 +25,35 @@ if sys.platform.startswith('win'):
     locale.setlocale(locale.LC_ALL, 'Korean_Korea.UTF-8')
 
 class KiwoomAdvancedFilter:
-    def __init__(self):
-        self.app = QApplication(sys.argv)
-        self.kiwoom = Kiwoom()
-        self.event_loop = QEventLoop()
+    def __init__(self, backend=None):
+        # 실제 세션 또는 녹화 재생 백엔드 (KIWOOM_REPLAY/KIWOOM_RECORD 환경변수)
+        self.backend = backend or create_backend()
+        self.kiwoom = self.backend.kiwoom
+        self.client = KiwoomClient(self.backend)
+        self.master = get_stock_master()
+        # 즉시 재생 모드에서는 요청 간격을 두지 않음
+        self.scheduler = get_tr_scheduler() if self.backend.rate_limited else TRScheduler(paced=False)
+        self.registry = TRRequestRegistry()
         
         # 이벤트 핸들러 연결
-        self.kiwoom.OnEventConnect = self.on_event_connect
-        self.kiwoom.OnReceiveTrData = self.on_receive_tr_data
-        self.kiwoom.OnReceiveRealCondition = self.on_receive_real_condition
+        self.bind_events()
         
         # 데이터 저장용 변수
         self.daily_data = {}
         self.monthly_data = {}
         self.login_completed = False
-        self.current_stock = None
         self.condition_result = []
         self.filtered_stocks = []
+        # 실시간 조건검색 추적기 (RealtimeConditionTracker.start에서 연결)
+        self.tracker = None
+        
+    def bind_events(self):
+        """이벤트 핸들러 연결 (같은 세션을 공유하는 객체끼리 작업 전 다시 연결)"""
+        self.kiwoom.OnEventConnect = self.on_event_connect
+        self.kiwoom.OnReceiveTrData = self.on_receive_tr_data
+        self.kiwoom.OnReceiveConditionVer = self.on_receive_condition_ver
+        self.kiwoom.OnReceiveTrCondition = self.on_receive_tr_condition
+        self.kiwoom.OnReceiveRealCondition = self.on_receive_real_condition
         
     def on_event_connect(self, err_code):
         """로그인 이벤트 처리"""
@@ -40,21 +63,46 @@ class KiwoomAdvancedFilter:
         else:
             print(f"❌ 키움증권 로그인 실패: {err_code}")
             
-        self.event_loop.quit()
+        self.client.notify("connect", err_code)
+        
+    def on_receive_condition_ver(self, ret, msg):
+        """조건식 목록 수신"""
+        self.client.condition_ver_received(ret)
+        
+    def on_receive_tr_condition(self, screen_no, codes, condition_name, index, next):
+        """조건검색 결과 수신"""
+        self.client.notify(("condition", condition_name), codes)
         
     def on_receive_tr_data(self, screen_no, rqname, trcode, record_name, prev_next, 
                           data_len, error_code, message, splm_msg):
-        """TR 데이터 수신 처리"""
+        """TR 데이터 수신 처리 (rqname으로 요청을 찾아 결과 전달)"""
+        request = self.registry.get(rqname)
+        if request is None:
+            print(f"⚠️ 요청 정보 없는 TR 응답: {rqname}")
+            return
+            
+        data = None
         if trcode == "opt10081":  # 일봉 데이터
-            self.process_daily_data(trcode, record_name)
+            data = self.process_daily_data(trcode, record_name)
+            if data is not None:
+                self.daily_data[request.code] = data
         elif trcode == "opt10082":  # 월봉 데이터
-            self.process_monthly_data(trcode, record_name)
+            data = self.process_monthly_data(trcode, record_name)
+            if data is not None:
+                self.monthly_data[request.code] = data
+                
+        if data is None:
+            self.registry.fail(rqname, "parse error")
+        else:
+            self.registry.resolve(rqname, data)
             
-        self.event_loop.quit()
+        self.backend.wake()
         
     def on_receive_real_condition(self, code, type, condition_name, condition_index):
-        """실시간 조건검색 결과 수신"""
-        print(f"실시간 조건검색: {code}, {condition_name}")
+        """실시간 조건검색 결과 수신 (편입 'I' / 이탈 'D')"""
+        print(f"실시간 조건검색: {code}, {type}, {condition_name}")
+        if self.tracker is not None:
+            self.tracker.on_receive_real_condition(code, type, condition_name, condition_index)
         
     def connect(self):
         """키움증권 API 연결"""
@@ -68,16 +116,11 @@ class KiwoomAdvancedFilter:
             return True
         
         try:
-            self.kiwoom.CommConnect(block=True)
-            
-            for i in range(10):
-                time.sleep(1)
-                current_state = self.kiwoom.GetConnectState()
-                
-                if current_state == 1:
-                    print("✅ 키움증권 연결 성공")
-                    self.login_completed = True
-                    return True
+            # 로그인 이벤트 수신 즉시 완료
+            if self.client.run(self.client.connect()):
+                print("✅ 키움증권 연결 성공")
+                self.login_completed = True
+                return True
             
             print("❌ 키움증권 연결 실패")
             return False
@@ -92,13 +135,10 @@ class KiwoomAdvancedFilter:
             return False
         
         try:
-            for i in range(15):
-                time.sleep(1)
-                login_state = self.kiwoom.GetConnectState()
-                
-                if login_state == 1:
-                    print("✅ 키움증권 로그인 완료")
-                    return True
+            # connect에서 로그인 이벤트까지 받았으므로 상태만 확인
+            if self.kiwoom.GetConnectState() == 1:
+                print("✅ 키움증권 로그인 완료")
+                return True
             
             print("❌ 키움증권 로그인 실패")
             return False
@@ -111,14 +151,13 @@ class KiwoomAdvancedFilter:
         """기존 조건검색 결과 가져오기"""
         print("📊 기존 조건검색 결과 가져오기...")
         
+        # 상주 데몬에서 객체를 재사용하므로 이전 결과 초기화
+        self.condition_result = []
+        
         # 기존 조건검색 실행
         try:
-            # 조건식 목록 가져오기
-            self.kiwoom.GetConditionLoad()
-            time.sleep(1)
-            
-            # 조건식 목록 확인
-            condition_list = self.kiwoom.GetConditionNameList()
+            # 조건식 목록 가져오기 (세션에서 로드한 적 있으면 캐시 사용)
+            condition_list = self.client.run(self.client.get_conditions())
             print(f"조건식 목록: {condition_list}")
             
             if condition_list:
@@ -126,18 +165,14 @@ class KiwoomAdvancedFilter:
                 condition_name = "새조건명"  # 기본 조건식명
                 
                 # 조건검색 실행
-                result = self.kiwoom.SendCondition("0101", condition_name, 0, 1)
+                result = self.client.run(self.client.send_condition("0101", condition_name, 0, 1))
                 print(f"조건검색 결과: {result}")
                 
                 # 결과 처리
-                if isinstance(result, list) and result:
-                    for code in result:
-                        if code.strip():
-                            stock_name = self.kiwoom.GetMasterCodeName(code)
-                            self.condition_result.append({
-                                'code': code,
-                                'name': stock_name
-                            })
+                if result:
+                    # 종목명은 하루 한 번 일괄 로드한 마스터에서 조회
+                    self.master.ensure(self.kiwoom)
+                    self.condition_result = self.master.stocks(result, self.kiwoom)
                     print(f"✅ 조건검색 완료: {len(self.condition_result)}개 종목")
                     return True
                 else:
@@ -151,126 +186,104 @@ class KiwoomAdvancedFilter:
             print(f"❌ 조건검색 오류: {e}")
             return False
             
-    def get_daily_data(self, stock_code):
-        """일봉 데이터 요청"""
-        print(f"📊 {stock_code} 일봉 데이터 요청 중...")
+    def request_tr(self, trcode, stock_code):
+        """차트 TR 요청 전송 (응답은 반환된 TRRequest로 전달됨, 등록 실패 시 실패 상태 요청 반환)"""
+        try:
+            request = self.registry.register(trcode, stock_code)
+        except RuntimeError as e:
+            # 화면번호가 모두 사용 중이면 이 종목만 실패 처리하고 검색은 계속
+            print(f"❌ {stock_code} {trcode} 요청 등록 실패: {e}")
+            request = TRRequest(None, None, trcode, stock_code)
+            request.set_error(e)
+            return request
         
         try:
-            # TR 요청 파라미터 설정
-            self.kiwoom.SetInputValue("종목코드", stock_code)
-            self.kiwoom.SetInputValue("기준일자", "")
-            self.kiwoom.SetInputValue("수정주가구분", "1")
-            
-            # TR 요청
-            result = self.kiwoom.CommRqData("일봉데이터", "opt10081", 0, "0101")
-            
-            if result == 0:
-                print(f"✅ {stock_code} 일봉 데이터 요청 성공")
-                self.event_loop.exec_()
-                return True
-            else:
-                print(f"❌ {stock_code} 일봉 데이터 요청 실패: {result}")
-                return False
+            def send():
+                # TR 요청 파라미터 설정
+                self.kiwoom.SetInputValue("종목코드", stock_code)
+                self.kiwoom.SetInputValue("기준일자", "")
+                self.kiwoom.SetInputValue("수정주가구분", "1")
+                return self.kiwoom.CommRqData(request.rqname, trcode, 0, request.screen_no)
+            
+            # TR 요청 (스케줄러가 호출 제한에 맞춰 간격 조절)
+            result = self.scheduler.submit(send)
+            
+            if result != 0:
+                print(f"❌ {stock_code} {trcode} 요청 실패: {result}")
+                self.registry.fail(request.rqname, result)
                 
         except Exception as e:
-            print(f"❌ 일봉 데이터 요청 오류: {e}")
-            return False
+            print(f"❌ {stock_code} {trcode} 요청 오류: {e}")
+            self.registry.fail(request.rqname, e)
             
-    def get_monthly_data(self, stock_code):
-        """월봉 데이터 요청"""
-        print(f"📈 {stock_code} 월봉 데이터 요청 중...")
+        return request
         
-        try:
-            # TR 요청 파라미터 설정
-            self.kiwoom.SetInputValue("종목코드", stock_code)
-            self.kiwoom.SetInputValue("기준일자", "")
-            self.kiwoom.SetInputValue("수정주가구분", "1")
+    def wait_requests(self, requests, timeout=TR_TIMEOUT):
+        """요청들이 모두 완료될 때까지 이벤트 루프 실행"""
+        deadline = time.monotonic() + timeout
+        
+        while not all(request.done for request in requests):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                for request in requests:
+                    if not request.done:
+                        print(f"❌ {request.code} {request.trcode} 응답 시간 초과")
+                        self.registry.fail(request.rqname, "timeout")
+                break
+                
+            self.backend.process_events(remaining)
             
-            # TR 요청
-            result = self.kiwoom.CommRqData("월봉데이터", "opt10082", 0, "0102")
+    def get_daily_data(self, stock_code):
+        """일봉 데이터 요청"""
+        print(f"📊 {stock_code} 일봉 데이터 요청 중...")
+        request = self.request_tr("opt10081", stock_code)
+        self.wait_requests([request])
+        return request.error is None
             
-            if result == 0:
-                print(f"✅ {stock_code} 월봉 데이터 요청 성공")
-                self.event_loop.exec_()
-                return True
-            else:
-                print(f"❌ {stock_code} 월봉 데이터 요청 실패: {result}")
-                return False
-                
-        except Exception as e:
-            print(f"❌ 월봉 데이터 요청 오류: {e}")
-            return False
+    def get_monthly_data(self, stock_code):
+        """월봉 데이터 요청"""
+        print(f"📈 {stock_code} 월봉 데이터 요청 중...")
+        request = self.request_tr("opt10082", stock_code)
+        self.wait_requests([request])
+        return request.error is None
             
     def process_daily_data(self, trcode, record_name):
-        """일봉 데이터 처리"""
+        """일봉 데이터 처리 (GetCommDataEx 1회 호출 후 컬럼 단위 변환)"""
         try:
-            data_count = self.kiwoom.GetRepeatCnt(trcode, record_name)
-            print(f"📊 수신된 일봉 데이터: {data_count}개")
-            
-            daily_data = []
-            
-            for i in range(min(data_count, 20)):  # 최근 20일만
-                # 각 필드 데이터 추출
-                date = self.kiwoom.GetCommData(trcode, record_name, i, "일자").strip()
-                open_price = int(self.kiwoom.GetCommData(trcode, record_name, i, "시가").strip())
-                high_price = int(self.kiwoom.GetCommData(trcode, record_name, i, "고가").strip())
-                low_price = int(self.kiwoom.GetCommData(trcode, record_name, i, "저가").strip())
-                close_price = int(self.kiwoom.GetCommData(trcode, record_name, i, "현재가").strip())
-                volume = int(self.kiwoom.GetCommData(trcode, record_name, i, "거래량").strip())
-                
-                daily_item = {
-                    "date": date,
-                    "open": open_price,
-                    "high": high_price,
-                    "low": low_price,
-                    "close": close_price,
-                    "volume": volume
-                }
-                
-                daily_data.append(daily_item)
-                
-            # 최근 데이터부터 정렬
-            daily_data.reverse()
-            self.daily_data[self.current_stock] = daily_data
+            started = time.perf_counter()
+            rows = get_comm_data_ex(self.kiwoom, trcode, record_name)
+            
+            # 최근 데이터부터 내려오므로 변환 시 날짜 오름차순으로 뒤집음
+            daily_data = columns_to_bars(parse_chart_rows(rows))
+            print(f"📊 수신된 일봉 데이터: {len(rows)}개 (파싱 {(time.perf_counter() - started) * 1000:.1f}ms)")
+            return daily_data
             
         except Exception as e:
             print(f"❌ 일봉 데이터 처리 오류: {e}")
+            return None
             
     def process_monthly_data(self, trcode, record_name):
-        """월봉 데이터 처리"""
+        """월봉 데이터 처리 (GetCommDataEx 1회 호출 후 컬럼 단위 변환)"""
         try:
-            data_count = self.kiwoom.GetRepeatCnt(trcode, record_name)
-            print(f"📈 수신된 월봉 데이터: {data_count}개")
+            started = time.perf_counter()
+            rows = get_comm_data_ex(self.kiwoom, trcode, record_name)
             
-            monthly_data = []
-            
-            for i in range(min(data_count, 6)):  # 최근 6개월만
-                # 각 필드 데이터 추출
-                date = self.kiwoom.GetCommData(trcode, record_name, i, "일자").strip()
-                close_price = int(self.kiwoom.GetCommData(trcode, record_name, i, "현재가").strip())
-                
-                monthly_item = {
-                    "date": date,
-                    "close": close_price
-                }
-                
-                monthly_data.append(monthly_item)
-                
-            # 최근 데이터부터 정렬
-            monthly_data.reverse()
-            self.monthly_data[self.current_stock] = monthly_data
+            monthly_data = columns_to_bars(parse_chart_rows(rows, date_length=6), fields=("close",))
+            print(f"📈 수신된 월봉 데이터: {len(rows)}개 (파싱 {(time.perf_counter() - started) * 1000:.1f}ms)")
+            return monthly_data
             
         except Exception as e:
             print(f"❌ 월봉 데이터 처리 오류: {e}")
+            return None
             
     def check_tail_upward(self, daily_data):
-        """조건 1: 꼬리 우상향 확인"""
-        if len(daily_data) < 20:
+        """조건 1: 꼬리 우상향 확인 (고급 필터는 창 길이만큼 일봉이 있어야 판정)"""
+        if len(daily_data) < TAIL_WINDOW:
             return False
             
         tail_upward_count = 0
         
-        for day in daily_data[:20]:  # 최근 20일
+        for day in daily_data[-TAIL_WINDOW:]:  # 최근 20일
             # 시가 < 종가 조건
             if day['open'] >= day['close']:
                 continue
@@ -284,75 +297,76 @@ class KiwoomAdvancedFilter:
             tail_length = day['open'] - day['low']
             
             # 꼬리가 전체 봉 길이의 30% 이상인지 확인
-            if tail_length >= total_length * 0.3:
+            if tail_length >= total_length * TAIL_RATIO:
                 tail_upward_count += 1
                 
         # 최소 3일 이상 꼬리 우상향이 있어야 함
-        return tail_upward_count >= 3
+        return tail_upward_count >= TAIL_MIN_DAYS
         
     def check_bottom_twice(self, daily_data):
-        """조건 2: 바닥 2회 확인"""
-        if len(daily_data) < 20:
+        """조건 2: 바닥 2회 확인 (고급 필터는 창 길이만큼 일봉이 있어야 판정)"""
+        if len(daily_data) < BOTTOM_WINDOW:
             return False
             
         # 최근 20일 데이터에서 저점 찾기
-        lows = [day['low'] for day in daily_data[:20]]
+        lows = [day['low'] for day in daily_data[-BOTTOM_WINDOW:]]
         min_low = min(lows)
         
         # 저점 근처(±2%)로 2번 이상 출현하는지 확인
-        bottom_threshold = min_low * 1.02  # 저점 + 2%
+        bottom_threshold = min_low * BOTTOM_BAND  # 저점 + 2%
         bottom_count = 0
         
         for low in lows:
             if low <= bottom_threshold:
                 bottom_count += 1
                 
-        return bottom_count >= 2
+        return bottom_count >= BOTTOM_MIN_COUNT
         
     def is_downtrend(self, monthly_data):
         """조건 3: 하락장 확인 (월봉 분석)"""
-        if len(monthly_data) < 6:
+        if len(monthly_data) < TREND_LONG:
             return False
             
         # 최근 3개월 평균 종가
-        recent_3m_avg = sum([month['close'] for month in monthly_data[:3]]) / 3
+        recent_3m_avg = sum([month['close'] for month in monthly_data[-TREND_SHORT:]]) / TREND_SHORT
         
         # 최근 6개월 평균 종가
-        recent_6m_avg = sum([month['close'] for month in monthly_data[:6]]) / 6
+        recent_6m_avg = sum([month['close'] for month in monthly_data[-TREND_LONG:]]) / TREND_LONG
         
         # 3개월 평균이 6개월 평균보다 낮으면 하락장
         return recent_3m_avg < recent_6m_avg
         
-    def run_advanced_filter(self):
-        """고급 필터링 실행"""
-        if not self.login_completed:
-            print("❌ 로그인이 필요합니다.")
-            return None
-            
-        print("🔍 고급 필터링 시작...")
+    def evaluate_stocks(self, stocks):
+        """종목별 꼬리우상향 + 바닥2회 판정 (만족 종목을 하나씩 반환)"""
+        # 다음 종목들의 일봉 요청을 미리 보내 응답 대기 시간을 겹침
+        total = len(stocks)
+        stocks = iter(stocks)
+        pending = deque()
         
-        # 1단계: 기존 조건검색 결과 가져오기
-        if not self.get_condition_result():
-            print("❌ 기존 조건검색 결과를 가져올 수 없습니다.")
-            return None
+        def submit_next():
+            stock = next(stocks, None)
+            if stock is None:
+                return False
+            pending.append((stock, self.request_tr("opt10081", stock['code'])))
+            return True
             
-        print(f"📊 기존 조건검색 결과: {len(self.condition_result)}개 종목")
-        
-        # 2단계: 각 종목에 대해 고급 필터링 적용
-        filtered_stocks = []
-        
-        for i, stock in enumerate(self.condition_result):
-            print(f"🔍 {i+1}/{len(self.condition_result)}: {stock['name']}({stock['code']}) 분석 중...")
+        while len(pending) < PIPELINE_DEPTH and submit_next():
+            pass
             
-            self.current_stock = stock['code']
+        i = 0
+        while pending:
+            stock, request = pending.popleft()
+            submit_next()
+            i += 1
             
-            # 일봉 데이터 요청 (실패하면 건너뛰기)
-            if not self.get_daily_data(stock['code']):
+            print(f"🔍 {i}/{total}: {stock['name']}({stock['code']}) 분석 중...")
+            
+            # 일봉 데이터 수신 대기 (실패하면 건너뛰기)
+            self.wait_requests([request])
+            if request.error is not None:
                 print(f"  ❌ 일봉 데이터 수신 실패")
                 continue
                 
-            time.sleep(0.5)  # API 호출 제한 방지
-            
             # 데이터 확인
             if stock['code'] not in self.daily_data:
                 print(f"  ❌ 데이터 수신 실패")
@@ -372,11 +386,38 @@ class KiwoomAdvancedFilter:
                 
             # 조건 1, 2 모두 만족
             print(f"  ✅ 꼬리우상향 + 바닥2회 조건 만족!")
-            filtered_stocks.append({
+            yield {
                 "name": stock['name'],
                 "code": stock['code'],
                 "price": daily_data[-1]['close']  # 최신 종가
-            })
+            }
+            
+    def run_advanced_filter(self, on_match=None):
+        """고급 필터링 실행 (on_match: 조건 만족 종목을 즉시 전달받는 콜백)"""
+        if not self.login_completed:
+            print("❌ 로그인이 필요합니다.")
+            return None
+            
+        print("🔍 고급 필터링 시작...")
+        
+        # 1단계: 기존 조건검색 결과 가져오기
+        if not self.get_condition_result():
+            print("❌ 기존 조건검색 결과를 가져올 수 없습니다.")
+            return None
+            
+        print(f"📊 기존 조건검색 결과: {len(self.condition_result)}개 종목")
+        
+        # 2단계: 각 종목에 대해 고급 필터링 적용
+        filtered_stocks = []
+        
+        for stock in self.evaluate_stocks(self.condition_result):
+            filtered_stocks.append(stock)
+            if on_match:
+                on_match(stock)
+            
+        stats = self.scheduler.stats()
+        print(f"⏱️ TR 요청 {stats['total_requests']}회, 평균 {stats['average_rate']}회/초 "
+              f"(과부하 {stats['throttled_requests']}회)")
             
         return filtered_stocks
         
@@ -387,12 +428,16 @@ class KiwoomAdvancedFilter:
             if not filtered_stocks:
                 filtered_stocks = []
                 
-            with open('data.json', 'w', encoding='utf-8') as f:
-                json.dump(filtered_stocks, f, ensure_ascii=False, indent=2)
+            # data.json에 저장된 결과와 같으면 다시 쓰지 않음
+            delta = save_result(filtered_stocks)
                 
             print(f"✅ 고급 필터링 완료!")
             print(f"📊 총 {len(filtered_stocks)}개 종목이 조건을 만족했습니다.")
-            print(f"💾 결과가 data.json 파일로 저장되었습니다.")
+            if delta["written"]:
+                print(f"💾 결과가 data.json 파일로 저장되었습니다 (버전 {delta['version']}: "
+                      f"편입 {len(delta['entered'])}, 이탈 {len(delta['exited'])}, 변경 {len(delta['changed'])}).")
+            else:
+                print(f"💾 이전 결과와 같아 data.json을 그대로 둡니다 (버전 {delta['version']}).")
             
             # 결과 출력
             if filtered_stocks:
@@ -400,9 +445,11 @@ class KiwoomAdvancedFilter:
                     print(f"  📈 {stock['name']}({stock['code']}) - {stock['price']:,}원")
             else:
                 print("  📊 조건을 만족하는 종목이 없습니다.")
+            return delta
                 
         except Exception as e:
             print(f"❌ 파일 저장 실패: {e}")
+            return None
 
 def run_advanced_filter_api():
     """고급 필터링 API 실행 함수"""
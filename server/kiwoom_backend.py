@@ -0,0 +1,539 @@
+import os
+import sys
+import gzip
+import json
+import time
+import heapq
+import atexit
+import logging
+import random
+import itertools
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+
+def encode(value):
+    """JSON 저장용 변환 (튜플은 재생 시 튜플로 복원되도록 표시)"""
+    if isinstance(value, tuple):
+        return {"__tuple__": [encode(item) for item in value]}
+    if isinstance(value, list):
+        return [encode(item) for item in value]
+    if isinstance(value, dict):
+        return {key: encode(item) for key, item in value.items()}
+    return value
+
+
+def decode(value):
+    """encode의 역변환"""
+    if isinstance(value, dict):
+        if "__tuple__" in value:
+            return tuple(decode(item) for item in value["__tuple__"])
+        return {key: decode(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [decode(item) for item in value]
+    return value
+
+
+def call_key(method, args, kwargs=None):
+    """호출 매칭 키 (키워드 인자가 없으면 이전 녹화 파일과 같은 키)"""
+    key = method + json.dumps(encode(list(args)), ensure_ascii=False)
+    if kwargs:
+        key += json.dumps(encode(dict(kwargs)), ensure_ascii=False, sort_keys=True)
+    return key
+
+
+class Cassette:
+    """키움 응답 녹화 파일 (gzip 압축 JSON Lines)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def append(self, entry):
+        if self.file is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            self.file = gzip.open(self.path, 'wt', encoding='utf-8')
+            atexit.register(self.close)
+        self.file.write(json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n')
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    @staticmethod
+    def load(path):
+        """녹화 파일 읽기"""
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+
+class LiveBackend:
+    """PyQt5 + pykiwoom 실제 세션 (Windows, 로그인 필요)"""
+
+    # TR 조회 제한 적용 여부
+    rate_limited = True
+
+    def __init__(self):
+        from PyQt5.QtWidgets import QApplication
+        from PyQt5.QtCore import QEventLoop
+        from pykiwoom.kiwoom import Kiwoom
+
+        self.app = QApplication.instance() or QApplication(sys.argv)
+        self.kiwoom = Kiwoom()
+        self.event_loop = QEventLoop()
+
+    def process_events(self, timeout):
+        """이벤트 1건 처리(wake 호출) 또는 timeout초까지 Qt 이벤트 루프 실행"""
+        from PyQt5.QtCore import QTimer
+
+        QTimer.singleShot(max(int(timeout * 1000), 0), self.event_loop.quit)
+        self.event_loop.exec_()
+
+    def wake(self):
+        """process_events 대기 종료"""
+        self.event_loop.quit()
+
+    def close(self):
+        pass
+
+
+class RecordingKiwoom:
+    """실제 키움 객체를 감싸 TR/조건검색 응답과 함수 반환값을 녹화
+
+    TR 요청은 (TR코드, 종목코드, 페이지) 단위로, 그 외 함수 호출은 인자와 반환값으로 기록하고
+    조건검색 결과 같은 이벤트는 직전 함수 호출에 연결해 재생 시점을 맞춘다.
+    """
+
+    def __init__(self, kiwoom, cassette):
+        object.__setattr__(self, "inner", kiwoom)
+        object.__setattr__(self, "cassette", cassette)
+        object.__setattr__(self, "inputs", {})
+        object.__setattr__(self, "requests", {})
+        object.__setattr__(self, "current_rows", {})
+        object.__setattr__(self, "sequence", itertools.count(1))
+        object.__setattr__(self, "last_call", (0, time.monotonic()))
+
+    def __setattr__(self, name, value):
+        # 이벤트 핸들러는 감싸서 등록 (수신 데이터 녹화 후 원래 핸들러 호출)
+        if name.startswith("On") and callable(value):
+            if name == "OnReceiveTrData":
+                value = self.wrap_tr_handler(value)
+            else:
+                value = self.wrap_event_handler(name, value)
+        setattr(self.inner, name, value)
+
+    def __getattr__(self, name):
+        attr = getattr(self.inner, name)
+        if not callable(attr) or not name[:1].isupper() or name.startswith("On"):
+            return attr
+
+        def recorded(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            seq = next(self.sequence)
+            object.__setattr__(self, "last_call", (seq, time.monotonic()))
+            entry = {
+                "type": "call", "seq": seq, "method": name,
+                "args": encode(list(args)), "result": encode(result)
+            }
+            if kwargs:
+                entry["kwargs"] = encode(kwargs)
+            self.cassette.append(entry)
+            return result
+        return recorded
+
+    def SetInputValue(self, key, value):
+        self.inputs[key] = value
+        return self.inner.SetInputValue(key, value)
+
+    def CommRqData(self, rqname, trcode, prev_next, screen_no):
+        previous = self.requests.get(rqname)
+        page = previous["page"] + 1 if previous and int(prev_next) == 2 else 0
+        request = {
+            "trcode": trcode, "code": self.inputs.get("종목코드", ""),
+            "inputs": dict(self.inputs), "page": page, "sent_at": time.monotonic()
+        }
+        self.requests[rqname] = request
+        self.inputs.clear()
+
+        result = self.inner.CommRqData(rqname, trcode, prev_next, screen_no)
+        if result != 0:
+            self.cassette.append({
+                "type": "tr", "trcode": trcode, "code": request["code"],
+                "page": page, "result": result
+            })
+        return result
+
+    def GetCommDataEx(self, trcode, record_name):
+        rows = self.current_rows.get((trcode, record_name))
+        if rows is not None:
+            return rows
+        return self.inner.GetCommDataEx(trcode, record_name)
+
+    def GetRepeatCnt(self, trcode, record_name):
+        return self.inner.GetRepeatCnt(trcode, record_name)
+
+    def GetCommData(self, trcode, record_name, index, field):
+        return self.inner.GetCommData(trcode, record_name, index, field)
+
+    def wrap_tr_handler(self, handler):
+        def on_receive_tr_data(screen_no, rqname, trcode, record_name, prev_next, *rest):
+            request = self.requests.get(rqname, {"code": "", "page": 0, "sent_at": time.monotonic()})
+            rows = self.inner.GetCommDataEx(trcode, record_name) or []
+            self.cassette.append({
+                "type": "tr", "trcode": trcode, "code": request["code"], "page": request["page"],
+                "result": 0, "record_name": record_name, "prev_next": prev_next,
+                "delay": round(time.monotonic() - request["sent_at"], 4),
+                "rows": [list(row) for row in rows]
+            })
+
+            self.current_rows[(trcode, record_name)] = rows
+            try:
+                return handler(screen_no, rqname, trcode, record_name, prev_next, *rest)
+            finally:
+                self.current_rows.pop((trcode, record_name), None)
+        return on_receive_tr_data
+
+    def wrap_event_handler(self, name, handler):
+        def on_event(*args):
+            seq, called_at = self.last_call
+            self.cassette.append({
+                "type": "event", "name": name, "args": encode(list(args)),
+                "trigger": seq, "delay": round(time.monotonic() - called_at, 4)
+            })
+            return handler(*args)
+        return on_event
+
+
+class RecordingBackend:
+    """다른 백엔드의 응답을 녹화 파일로 저장하면서 그대로 전달"""
+
+    def __init__(self, inner, path):
+        self.inner = inner
+        self.rate_limited = inner.rate_limited
+        self.cassette = Cassette(path)
+        self.kiwoom = RecordingKiwoom(inner.kiwoom, self.cassette)
+
+    def process_events(self, timeout):
+        self.inner.process_events(timeout)
+
+    def wake(self):
+        self.inner.wake()
+
+    def close(self):
+        self.cassette.close()
+        self.inner.close()
+
+
+class ReplayKiwoom:
+    """녹화 파일의 응답을 키움 객체처럼 돌려주는 재생용 객체"""
+
+    def __init__(self, entries, backend):
+        self.backend = backend
+        self.inputs = {}
+        self.pages = {}
+        self.current_rows = {}
+        self.tr_responses = defaultdict(deque)
+        self.call_results = defaultdict(deque)
+        self.events = defaultdict(list)
+
+        for entry in entries:
+            if entry["type"] == "tr":
+                self.tr_responses[(entry["trcode"], entry["code"], entry["page"])].append(entry)
+            elif entry["type"] == "call":
+                key = call_key(entry["method"], decode(entry["args"]), decode(entry.get("kwargs", {})))
+                self.call_results[key].append(entry)
+            elif entry["type"] == "event":
+                self.events[entry["trigger"]].append(entry)
+
+    @staticmethod
+    def take(queue):
+        """녹화된 응답을 순서대로 사용 (모두 사용하면 마지막 응답 반복)"""
+        if len(queue) > 1:
+            return queue.popleft()
+        return queue[0] if queue else None
+
+    def SetInputValue(self, key, value):
+        self.inputs[key] = value
+
+    def CommRqData(self, rqname, trcode, prev_next, screen_no):
+        code = self.inputs.get("종목코드", "")
+        page = self.pages.get(rqname, -1) + 1 if int(prev_next) == 2 else 0
+        self.pages[rqname] = page
+        self.inputs = {}
+
+        entry = self.take(self.tr_responses.get((trcode, code, page), deque()))
+        if entry is None:
+            logging.warning(f"녹화되지 않은 TR 요청: {trcode} {code} {page}페이지")
+            return -1
+        if "rows" not in entry:
+            return entry["result"]
+
+        def dispatch():
+            key = (trcode, entry["record_name"])
+            self.current_rows[key] = entry["rows"]
+            try:
+                self.OnReceiveTrData(screen_no, rqname, trcode, entry["record_name"],
+                                     entry["prev_next"], 0, 0, "", "")
+            finally:
+                self.current_rows.pop(key, None)
+
+        self.backend.schedule(entry.get("delay", 0), dispatch)
+        return 0
+
+    def GetCommDataEx(self, trcode, record_name):
+        return self.current_rows.get((trcode, record_name), [])
+
+    def GetRepeatCnt(self, trcode, record_name):
+        return len(self.GetCommDataEx(trcode, record_name))
+
+    def __getattr__(self, name):
+        if not name[:1].isupper() or name.startswith("On"):
+            raise AttributeError(name)
+
+        def replayed(*args, **kwargs):
+            entry = self.take(self.call_results.get(call_key(name, args, kwargs), deque()))
+            if entry is None:
+                logging.warning(f"녹화되지 않은 호출: {name}{args} {kwargs or ''}")
+                return None
+
+            # 호출 직후 수신되었던 이벤트(조건검색 결과 등)를 같은 간격으로 재생
+            for event in self.events.get(entry["seq"], []):
+                self.backend.schedule(event["delay"], self.event_dispatcher(event))
+            return decode(entry["result"])
+        return replayed
+
+    def event_dispatcher(self, event):
+        def dispatch():
+            handler = self.__dict__.get(event["name"])
+            if handler is not None:
+                handler(*decode(event["args"]))
+        return dispatch
+
+
+class QueuedBackend:
+    """응답을 큐에 넣었다가 process_events에서 전달하는 Qt 없는 백엔드 공통 부분"""
+
+    def __init__(self, realtime=False):
+        self.realtime = realtime
+        self.rate_limited = realtime
+        self.queue = []
+        self.sequence = itertools.count()
+
+    def schedule(self, delay, callback):
+        """delay초 뒤 전달할 응답 등록"""
+        due = time.monotonic() + (delay if self.realtime else 0)
+        heapq.heappush(self.queue, (due, next(self.sequence), callback))
+
+    def process_events(self, timeout):
+        """대기 중인 응답 1건 전달 (없으면 timeout초 대기 후 반환)"""
+        if not self.queue:
+            time.sleep(max(timeout, 0))
+            return
+        due, _, callback = self.queue[0]
+        wait = due - time.monotonic()
+        if wait > timeout:
+            time.sleep(max(timeout, 0))
+            return
+        if wait > 0:
+            time.sleep(wait)
+        heapq.heappop(self.queue)
+        callback()
+
+    def wake(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class ReplayBackend(QueuedBackend):
+    """녹화 파일 재생 백엔드 (realtime=True이면 원래 응답 간격 유지, 아니면 즉시 전달)"""
+
+    def __init__(self, path, realtime=False):
+        super().__init__(realtime)
+        self.kiwoom = ReplayKiwoom(Cassette.load(path), self)
+
+
+class SimulatedKiwoom:
+    """종목코드별로 고정된 가상 시세를 돌려주는 로컬 대체 객체 (테스트/벤치마크용)"""
+
+    PAGE_ROWS = 600
+
+    # GetCodeListByMarket 시장별 가상 코드 시작 번호와 기본 종목 수
+    MARKET_BASES = {"0": 900000, "10": 910000, "8": 920000, "60": 930000}
+    MARKET_SIZES = {"0": 50, "10": 50, "8": 10, "60": 5}
+
+    def __init__(self, backend, history_days=1500, latency=0.05, end_date=None, market_sizes=None):
+        self.backend = backend
+        self.market_sizes = dict(self.MARKET_SIZES, **(market_sizes or {}))
+        self.history_days = history_days
+        self.latency = latency
+        self.end_date = end_date or datetime.now().date()
+        self.inputs = {}
+        self.pages = {}
+        self.current_rows = {}
+        self.history = {}
+
+    def GetConnectState(self):
+        return 1
+
+    def CommConnect(self, block=True):
+        return 0
+
+    def GetLoginInfo(self, tag):
+        return ""
+
+    def GetMasterCodeName(self, code):
+        return f"가상{code}"
+
+    def GetCodeListByMarket(self, market):
+        codes = self.market_codes(market)
+        # 실제와 같이 ETF/ETN은 KOSPI 목록에도 포함
+        if market == "0":
+            codes += self.market_codes("8") + self.market_codes("60")
+        return ";".join(codes) + ";"
+
+    def market_codes(self, market):
+        base = self.MARKET_BASES.get(market)
+        if base is None:
+            return []
+        return [f"{base + i:06d}" for i in range(self.market_sizes.get(market, 0))]
+
+    def GetMasterConstruction(self, code):
+        return "정상"
+
+    def GetMasterListedStockDate(self, code):
+        """종목코드별로 고정된 가상 상장일 (일부는 최근 상장)"""
+        listed = self.end_date - timedelta(days=random.Random(f"listed{code}").randint(30, 7000))
+        return listed.strftime('%Y%m%d')
+
+    def SendConditionStop(self, screen_no, condition_name, index):
+        return None
+
+    def SetRealReg(self, screen_no, codes, fids, mode):
+        return 0
+
+    def SetRealRemove(self, screen_no, code):
+        return None
+
+    def GetConditionLoad(self):
+        return 1
+
+    def GetConditionNameList(self):
+        return [("000", "가상조건")]
+
+    def SendCondition(self, screen_no, condition_name, index, search):
+        return [f"{900000 + i:06d}" for i in range(20)]
+
+    def daily_rows(self, code):
+        """종목별 가상 일봉 (최신순, GetCommDataEx 컬럼 순서)"""
+        if code in self.history:
+            return self.history[code]
+
+        rng = random.Random(code)
+        day = self.end_date
+        dates = []
+        while len(dates) < self.history_days:
+            if day.weekday() < 5:
+                dates.append(day.strftime('%Y%m%d'))
+            day -= timedelta(days=1)
+
+        price = rng.randint(5000, 100000)
+        rows = []
+        for date in reversed(dates):
+            previous = price
+            open_price = max(100, round(price * (1 + rng.gauss(0, 0.01))))
+            close_price = max(100, round(open_price * (1 + rng.gauss(0, 0.02))))
+            high_price = max(open_price, close_price) + round(open_price * abs(rng.gauss(0, 0.01)))
+            low_price = min(open_price, close_price) - round(open_price * abs(rng.gauss(0, 0.015)))
+            sign = "-" if close_price < previous else ""
+            rows.append([code, f"{sign}{close_price}", str(rng.randint(10000, 5000000)), "0", date,
+                         str(open_price), str(high_price), str(max(low_price, 1))])
+            price = close_price
+
+        rows.reverse()
+        self.history[code] = rows
+        return rows
+
+    def monthly_rows(self, code):
+        """가상 일봉으로 만든 월봉 (최신순)"""
+        months = {}
+        for row in reversed(self.daily_rows(code)):
+            month = row[4][:6]
+            if month not in months:
+                months[month] = [code, row[1], row[2], "0", month + "01", row[5], row[6], row[7]]
+            else:
+                bar = months[month]
+                bar[1] = row[1]
+                bar[6] = str(max(int(bar[6]), int(row[6])))
+                bar[7] = str(min(int(bar[7]), int(row[7])))
+        return [months[month] for month in sorted(months, reverse=True)]
+
+    def SetInputValue(self, key, value):
+        self.inputs[key] = value
+
+    def CommRqData(self, rqname, trcode, prev_next, screen_no):
+        code = self.inputs.get("종목코드", "")
+        page = self.pages.get(rqname, -1) + 1 if int(prev_next) == 2 else 0
+        self.pages[rqname] = page
+        self.inputs = {}
+
+        if trcode == "opt10081":
+            rows = self.daily_rows(code)
+        elif trcode == "opt10082":
+            rows = self.monthly_rows(code)
+        else:
+            return -1
+
+        start = page * self.PAGE_ROWS
+        page_rows = rows[start:start + self.PAGE_ROWS]
+        next_flag = "2" if start + self.PAGE_ROWS < len(rows) else "0"
+
+        def dispatch():
+            self.current_rows[(trcode, rqname)] = page_rows
+            try:
+                self.OnReceiveTrData(screen_no, rqname, trcode, rqname, next_flag, 0, 0, "", "")
+            finally:
+                self.current_rows.pop((trcode, rqname), None)
+
+        self.backend.schedule(self.latency, dispatch)
+        return 0
+
+    def GetCommDataEx(self, trcode, record_name):
+        return self.current_rows.get((trcode, record_name), [])
+
+    def GetRepeatCnt(self, trcode, record_name):
+        return len(self.GetCommDataEx(trcode, record_name))
+
+
+class SimulatedBackend(QueuedBackend):
+    """가상 시세 백엔드 (키움 세션 없이 전체 파이프라인 실행)"""
+
+    def __init__(self, realtime=False, **options):
+        super().__init__(realtime)
+        self.kiwoom = SimulatedKiwoom(self, **options)
+
+
+def create_backend(kind=None, path=None):
+    """백엔드 생성 (kind 미지정 시 환경변수로 결정)
+
+    KIWOOM_REPLAY=<파일>   녹화 파일 재생 (KIWOOM_REPLAY_REALTIME=true이면 원래 간격 유지)
+    KIWOOM_RECORD=<파일>   실제 세션 응답을 녹화
+    KIWOOM_SIMULATE=true  가상 시세 백엔드 사용
+    """
+    realtime = os.getenv('KIWOOM_REPLAY_REALTIME', 'false').lower() == 'true'
+
+    if kind == "simulated" or (kind is None and os.getenv('KIWOOM_SIMULATE', 'false').lower() == 'true'):
+        return SimulatedBackend(realtime=realtime)
+
+    replay_path = path if kind == "replay" else (None if kind else os.getenv('KIWOOM_REPLAY'))
+    if replay_path:
+        return ReplayBackend(replay_path, realtime=realtime)
+
+    backend = LiveBackend()
+    record_path = path if kind == "record" else (None if kind else os.getenv('KIWOOM_RECORD'))
+    if record_path:
+        return RecordingBackend(backend, record_path)
+    return backend
@@ -0,0 +1,175 @@
+import asyncio
+
+from condition_cache import get_condition_cache
+
+# 이벤트별 최대 대기 시간 (초) - 이벤트가 오면 즉시 다음 단계 진행
+CONNECT_TIMEOUT = 30
+CONDITION_LOAD_TIMEOUT = 10
+CONDITION_SEARCH_TIMEOUT = 15
+TR_TIMEOUT = 10
+
+# Qt/백엔드 이벤트 처리 주기 (콜백이 backend.wake()를 부르면 더 일찍 반환)
+PUMP_INTERVAL = 0.02
+
+
+def parse_condition_list(condition_list):
+    """GetConditionNameList 결과를 (인덱스, 조건명) 목록으로 변환
+
+    pykiwoom은 튜플 목록을, OCX 직접 호출은 '000^조건명;001^조건명;' 문자열을 돌려준다.
+    """
+    if not condition_list:
+        return []
+    if isinstance(condition_list, str):
+        conditions = []
+        for item in condition_list.split(';'):
+            if '^' in item:
+                index, name = item.split('^', 1)
+                conditions.append((index.strip(), name.strip()))
+        return conditions
+    return [tuple(item) for item in condition_list]
+
+
+def parse_codes(codes):
+    """조건검색 결과 종목코드 목록 ('005930;000660;' 또는 목록)"""
+    if isinstance(codes, str):
+        codes = codes.split(';')
+    return [code.strip() for code in codes or [] if code.strip()]
+
+
+class KiwoomClient:
+    """키움 콜백을 asyncio future로 전달하는 이벤트 기반 클라이언트
+
+    각 단계는 고정 sleep 대신 해당 이벤트(OnEventConnect, OnReceiveConditionVer,
+    OnReceiveTrCondition, OnReceiveTrData)가 도착하는 즉시 끝난다. 기다리는 동안
+    백엔드 이벤트 루프(Qt)를 짧게 돌리고 asyncio에 제어를 넘겨 두 루프를 함께 진행한다.
+    이벤트 핸들러는 각 객체가 직접 연결하고, 받은 값을 notify()로 넘겨준다.
+    """
+
+    def __init__(self, backend, condition_cache=None):
+        self.backend = backend
+        self.kiwoom = backend.kiwoom
+        self.condition_cache = condition_cache or get_condition_cache()
+        self.waiters = {}
+
+    def notify(self, key, value=None):
+        """이벤트 도착: key를 기다리는 future 모두 완료"""
+        for future in self.waiters.pop(key, []):
+            if not future.done():
+                future.set_result(value)
+        self.backend.wake()
+
+    def condition_ver_received(self, ret):
+        """OnReceiveConditionVer: 직접 요청한 로드가 아니면 조건식이 바뀐 것으로 보고 캐시 무효화"""
+        if "condition_ver" not in self.waiters:
+            self.condition_cache.invalidate()
+        self.notify("condition_ver", ret)
+
+    def expect(self, key):
+        """key 이벤트를 기다리는 future 등록 (이벤트를 일으키는 호출 전에 등록)"""
+        future = asyncio.get_running_loop().create_future()
+        self.waiters.setdefault(key, []).append(future)
+        return future
+
+    def discard(self, key, future):
+        futures = self.waiters.get(key)
+        if futures and future in futures:
+            futures.remove(future)
+            if not futures:
+                del self.waiters[key]
+
+    async def pump_until(self, future, timeout):
+        """future가 끝날 때까지 백엔드 이벤트 처리 (timeout 초과 시 asyncio.TimeoutError)"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        while not future.done():
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            self.backend.process_events(min(PUMP_INTERVAL, remaining))
+            await asyncio.sleep(0)
+
+        return future.result()
+
+    async def wait_event(self, key, trigger, ready=None, timeout=10):
+        """trigger()로 요청을 보내고 key 이벤트 대기
+
+        ready(trigger 반환값)가 None이 아닌 값을 주면 이벤트 없이 그 값으로 끝낸다
+        (pykiwoom처럼 내부에서 이벤트를 기다린 뒤 반환하는 블로킹 호출 대응).
+        """
+        future = self.expect(key)
+        try:
+            returned = trigger()
+            if ready is not None:
+                value = ready(returned)
+                if value is not None:
+                    return value
+            return await self.pump_until(future, timeout)
+        finally:
+            self.discard(key, future)
+
+    async def connect(self, timeout=CONNECT_TIMEOUT):
+        """로그인 (OnEventConnect 수신 즉시 완료), 성공 여부 반환"""
+        if self.kiwoom.GetConnectState() == 1:
+            return True
+
+        def connected(_):
+            return 0 if self.kiwoom.GetConnectState() == 1 else None
+
+        err_code = await self.wait_event("connect", lambda: self.kiwoom.CommConnect(block=True),
+                                         connected, timeout)
+        return err_code == 0 and self.kiwoom.GetConnectState() == 1
+
+    async def load_conditions(self, timeout=CONDITION_LOAD_TIMEOUT):
+        """조건식 목록 로드 (OnReceiveConditionVer 수신 즉시 완료)"""
+        def loaded(_):
+            return parse_condition_list(self.kiwoom.GetConditionNameList()) or None
+
+        await self.wait_event("condition_ver", self.kiwoom.GetConditionLoad, loaded, timeout)
+        return parse_condition_list(self.kiwoom.GetConditionNameList())
+
+    async def get_conditions(self, timeout=CONDITION_LOAD_TIMEOUT):
+        """조건식 목록 (이 세션에서 이미 로드했으면 캐시 사용, 아니면 로드 후 캐시 갱신)"""
+        cache = self.condition_cache
+        if cache.is_loaded(self.backend):
+            conditions = cache.get()
+            if conditions:
+                return conditions
+
+        conditions = await self.load_conditions(timeout)
+        if conditions:
+            cache.put(conditions, self.backend)
+        return conditions
+
+    async def send_condition(self, screen_no, condition_name, index, search=0,
+                             timeout=CONDITION_SEARCH_TIMEOUT):
+        """조건검색 요청 후 종목코드 목록 반환 (OnReceiveTrCondition 수신 즉시 완료)"""
+        def received(result):
+            if isinstance(result, (list, tuple)):
+                return parse_codes(result)
+            if result != 1:  # 1만 요청 성공 (0은 실패)
+                raise RuntimeError(f"SendCondition 실패: {result}")
+            return None
+
+        codes = await self.wait_event(("condition", condition_name),
+                                      lambda: self.kiwoom.SendCondition(screen_no, condition_name, index, search),
+                                      received, timeout)
+        return parse_codes(codes)
+
+    async def wait_request(self, request, timeout=TR_TIMEOUT):
+        """TR 요청(TRRequest)이 OnReceiveTrData로 완료될 때까지 대기 후 결과 반환"""
+        future = asyncio.get_running_loop().create_future()
+
+        def done(request):
+            if not future.done():
+                future.set_result(request)
+
+        request.add_done_callback(done)
+        await self.pump_until(future, timeout)
+        if request.error is not None:
+            raise request.error if isinstance(request.error, Exception) else RuntimeError(request.error)
+        return request.result
+
+    def run(self, coroutine):
+        """동기 코드에서 코루틴 실행"""
+        return asyncio.run(coroutine)
@@ -1,5 +1,4 @@
 import sys
-import time
 import json
 import locale
 
@@ -10,21 +9,26 @@ if sys.platform.startswith('win'):
     sys.stderr.reconfigure(encoding='utf-8')
     locale.setlocale(locale.LC_ALL, 'Korean_Korea.UTF-8')
 
-from PyQt5.QtWidgets import QApplication
-from PyQt5.QtCore import QEventLoop, QTimer
-from pykiwoom.kiwoom import *
+from kiwoom_backend import create_backend
+from kiwoom_client import KiwoomClient
+from stock_master import get_stock_master
 
 
 class KiwoomConditionAPI:
-    def __init__(self):
-        self.app = QApplication(sys.argv)
-        self.kiwoom = Kiwoom()
+    def __init__(self, backend=None):
+        # 실제 세션 또는 녹화 재생 백엔드 (상주 데몬에서는 다른 객체와 공유)
+        self.backend = backend or create_backend()
+        self.kiwoom = self.backend.kiwoom
+        self.client = KiwoomClient(self.backend)
+        self.master = get_stock_master()
         self.connected = False
         self.logged_in = False
-        self.condition_received = False
         self.condition_result = []
         
-        # 이벤트 핸들러 설정
+        self.bind_events()
+    
+    def bind_events(self):
+        """이벤트 핸들러 설정 (같은 세션을 공유하는 객체끼리 작업 전 다시 연결)"""
         self.kiwoom.OnEventConnect = self.on_event_connect
         self.kiwoom.OnReceiveConditionVer = self.on_receive_condition_ver
         self.kiwoom.OnReceiveTrCondition = self.on_receive_tr_condition
@@ -36,94 +40,46 @@ class KiwoomConditionAPI:
             self.connected = True
         else:
             self.connected = False
+        self.client.notify("connect", err_code)
     
     def on_receive_condition_ver(self, ret, msg):
         """조건식 목록 수신 이벤트 핸들러"""
-        pass
+        self.client.condition_ver_received(ret)
     
     def on_receive_tr_condition(self, screen_no, codes, condition_name, index, next):
         """조건검색 결과 수신 이벤트 핸들러"""
-        if codes:
-            code_list = codes.split(';')
-            for code in code_list:
-                if code.strip():
-                    stock_name = self.kiwoom.GetMasterCodeName(code)
-                    self.condition_result.append({
-                        'code': code,
-                        'name': stock_name
-                    })
-        self.condition_received = True
+        self.client.notify(("condition", condition_name), codes)
     
     def on_receive_real_condition(self, code, type, condition_name, condition_index):
         """실시간 조건검색 결과 수신 이벤트 핸들러"""
         pass
     
     def connect(self):
-        """키움증권 API 연결"""
-        current_state = self.kiwoom.GetConnectState()
-        
-        if current_state == 1:
-            self.connected = True
-            return True
-        
+        """키움증권 API 연결 (로그인 이벤트 수신 즉시 완료)"""
         try:
-            self.kiwoom.CommConnect(block=True)
-            
-            for i in range(10):
-                time.sleep(1)
-                current_state = self.kiwoom.GetConnectState()
-                
-                if current_state == 1:
-                    self.connected = True
-                    return True
-            
-            return False
-            
+            self.connected = self.client.run(self.client.connect())
         except Exception as e:
-            return False
+            self.connected = False
+        return self.connected
     
     def login(self, user_id, password, cert_password=""):
-        """키움증권 로그인"""
+        """키움증권 로그인 (connect에서 로그인 이벤트까지 받으므로 상태만 확인)"""
         if not self.connected:
             return False
         
         try:
-            for i in range(15):
-                time.sleep(1)
-                login_state = self.kiwoom.GetConnectState()
-                
-                if login_state == 1:
-                    self.logged_in = True
-                    return True
-            
-            return False
-            
+            self.logged_in = self.kiwoom.GetConnectState() == 1
         except Exception as e:
-            return False
+            self.logged_in = False
+        return self.logged_in
     
     def get_condition_list(self):
-        """조건식 목록 조회"""
+        """조건식 목록 조회 [(인덱스, 조건명), ...]"""
         if not self.logged_in:
             return []
         
         try:
-            self.kiwoom.GetConditionLoad()
-            
-            for i in range(10):
-                time.sleep(1)
-            
-            condition_list = self.kiwoom.GetConditionNameList()
-            
-            if condition_list:
-                if isinstance(condition_list, list):
-                    return condition_list
-                elif isinstance(condition_list, str):
-                    conditions = condition_list.split(';')
-                    return conditions
-                else:
-                    return []
-            else:
-                return []
+            return self.client.run(self.client.get_conditions())
         except Exception as e:
             return []
     
@@ -133,34 +89,16 @@ class KiwoomConditionAPI:
             return []
         
         self.condition_result = []
-        self.condition_received = False
         
         try:
-            result = self.kiwoom.SendCondition("0101", condition_name, condition_index, 0)
-            
-            if isinstance(result, list):
-                # 즉시 결과가 반환된 경우
-                for code in result:
-                    if code.strip():
-                        stock_name = self.kiwoom.GetMasterCodeName(code)
-                        self.condition_result.append({
-                            'code': code,
-                            'name': stock_name
-                        })
-                return self.condition_result
-            elif result == 1 or result == 0:
-                # 이벤트 대기
-                for i in range(15):
-                    time.sleep(1)
-                    
-                    if self.condition_received:
-                        return self.condition_result
-                
-                return []
-            else:
-                return []
+            codes = self.client.run(self.client.send_condition("0101", condition_name, condition_index, 0))
         except Exception as e:
             return []
+        
+        # 종목명은 하루 한 번 일괄 로드한 마스터에서 조회
+        self.master.ensure(self.kiwoom)
+        self.condition_result = self.master.stocks(codes, self.kiwoom)
+        return self.condition_result
     
     def run_condition_search(self, user_id, password, cert_password="", condition_index=0):
         """조건검색 실행 메인 함수"""
@@ -179,10 +117,12 @@ class KiwoomConditionAPI:
             return {"success": False, "error": "조건식이 없습니다"}
         
         # 4. 조건검색 실행
-        condition_name = ""
-        if isinstance(condition_list, list) and len(condition_list) > 0:
-            if isinstance(condition_list[0], tuple) and len(condition_list[0]) >= 2:
-                condition_name = condition_list[0][1]
+        # 요청한 인덱스의 조건명 (없으면 첫 번째 조건식)
+        condition_name = condition_list[0][1]
+        for index, name in condition_list:
+            if int(index) == int(condition_index):
+                condition_name = name
+                break
         
         result = self.search_condition(condition_index, condition_name)
         
@@ -4,11 +4,59 @@ import time
 import locale
 import logging
 import os
+import random
 import statistics
+from collections import deque
 from datetime import datetime, timedelta
-from PyQt5.QtWidgets import QApplication
-from PyQt5.QtCore import QEventLoop, QTimer
-from pykiwoom.kiwoom import *
+from kiwoom_backend import create_backend
+from kiwoom_client import KiwoomClient
+from tr_scheduler import TRScheduler, get_tr_scheduler
+from tr_registry import TRRequestRegistry, TRRequest
+from bar_store import BarStore
+from bar_aggregate import verify_monthly
+from bar_series import as_series
+from tr_parser import get_comm_data_ex, parse_chart_rows, columns_to_bars
+from stock_master import get_stock_master
+from universe import get_universe, DEFAULT_UNIVERSE
+from predicate_planner import PredicatePlanner, Predicate, Dataset
+from fetch_priority import FetchQueue, get_scan_history
+from result_cache import get_result_cache, result_key, spec_hash
+from result_delta import save_result
+from condition_params import (TAIL_WINDOW, TAIL_RATIO, TAIL_MIN_DAYS, TAIL_MIN_BARS,
+                              BOTTOM_WINDOW, BOTTOM_BAND, BOTTOM_MIN_COUNT, BOTTOM_MIN_BARS,
+                              TREND_SHORT, TREND_LONG, DECLINE_CUTOFF)
+
+TIMEFRAMES = {
+    "opt10081": "daily",
+    "opt10082": "monthly"
+}
+
+# 월봉은 일봉으로 만들고, 실행마다 일부 종목만 opt10082로 검증
+MONTHLY_VERIFY_SAMPLES = 2
+
+# 조건 1~3 판정 기준 (판정 결과 캐시 키에 포함, check_condition_1/2/3이 쓰는 값과 같은 상수)
+CONDITION_SPEC = {
+    "condition_1": {"window": TAIL_WINDOW, "ratio": TAIL_RATIO, "min_days": TAIL_MIN_DAYS,
+                    "min_bars": TAIL_MIN_BARS},
+    "condition_2": {"window": BOTTOM_WINDOW, "band": BOTTOM_BAND, "min_count": BOTTOM_MIN_COUNT,
+                    "min_bars": BOTTOM_MIN_BARS},
+    "condition_3": {"short": TREND_SHORT, "long": TREND_LONG, "cutoff": DECLINE_CUTOFF},
+    "monthly": "daily"
+}
+
+# 로그에 쓰는 조건 이름
+CONDITION_LABELS = {
+    "condition_1": "꼬리 우상향",
+    "condition_2": "바닥 2회",
+    "condition_3": "하락장 제외"
+}
+
+# 조건검색용 일봉 수 (저장된 이력이 없을 때 첫 페이지 분량만 수신)
+SCAN_HISTORY_ROWS = 600
+
+# 동시에 응답을 기다리는 종목 수 (일봉/월봉 요청이 함께 진행됨)
+PIPELINE_DEPTH = 3
+TR_TIMEOUT = 10
 
 # 로깅 설정 (변경사항 8)
 logging.basicConfig(
@@ -27,47 +75,49 @@ if sys.platform.startswith('win'):
     locale.setlocale(locale.LC_ALL, 'Korean_Korea.UTF-8')
 
 class KiwoomConditionFilter:
-    def __init__(self):
-        self.app = QApplication(sys.argv)
-        self.kiwoom = Kiwoom()
-        self.event_loop = QEventLoop()
+    def __init__(self, backend=None):
+        # 실제 세션 또는 녹화 재생 백엔드 (KIWOOM_REPLAY/KIWOOM_RECORD 환경변수)
+        self.backend = backend or create_backend()
+        self.kiwoom = self.backend.kiwoom
+        self.client = KiwoomClient(self.backend)
+        # 즉시 재생 모드에서는 요청 간격을 두지 않음
+        self.scheduler = get_tr_scheduler() if self.backend.rate_limited else TRScheduler(paced=False)
+        self.registry = TRRequestRegistry()
+        self.store = BarStore()
+        self.master = get_stock_master()
         
         # 이벤트 핸들러 연결
-        self.kiwoom.OnEventConnect = self.on_event_connect
-        self.kiwoom.OnReceiveTrData = self.on_receive_tr_data
-        self.kiwoom.OnReceiveRealCondition = self.on_receive_real_condition
+        self.bind_events()
         
         # 데이터 저장용 변수
         self.daily_data = {}
         self.monthly_data = {}
         self.login_completed = False
-        self.current_stock = None
         self.stock_list = []
         self.filtered_stocks = []
-        
-        # KOSPI 상위 종목 목록
-        self.stock_list = [
-            {"name": "삼성전자", "code": "005930"},
-            {"name": "SK하이닉스", "code": "000660"},
-            {"name": "NAVER", "code": "035420"},
-            {"name": "카카오", "code": "035720"},
-            {"name": "LG에너지솔루션", "code": "373220"},
-            {"name": "현대차", "code": "005380"},
-            {"name": "기아", "code": "000270"},
-            {"name": "POSCO홀딩스", "code": "005490"},
-            {"name": "LG화학", "code": "051910"},
-            {"name": "삼성바이오로직스", "code": "207940"},
-            {"name": "현대모비스", "code": "012330"},
-            {"name": "KB금융", "code": "105560"},
-            {"name": "신한지주", "code": "055550"},
-            {"name": "하나금융지주", "code": "086790"},
-            {"name": "LG전자", "code": "066570"},
-            {"name": "삼성SDI", "code": "006400"},
-            {"name": "포스코퓨처엠", "code": "003670"},
-            {"name": "아모레퍼시픽", "code": "090430"},
-            {"name": "LG생활건강", "code": "051900"},
-            {"name": "셀트리온", "code": "068270"}
-        ]
+        # 실시간 체결로 오늘 봉을 만드는 객체 (LiveCandleBuilder.watch에서 연결)
+        self.live_candles = None
+        # 조건 통계 등을 실행마다 파일로 저장할지 (병렬 워커는 부모 프로세스가 모아서 저장)
+        self.persist_state = True
+        
+        # 스캔 종목군 (이름 또는 조건 dict, 로그인 전에는 저장된 종목군 목록과 종목명 사용)
+        self.universe = DEFAULT_UNIVERSE
+        self.load_universe()
+        
+    def load_universe(self, universe=None):
+        """종목군을 종목 목록으로 변환 (로그인 후에는 거래일마다 한 번 시장 전체 목록을 다시 로드)"""
+        if universe is not None:
+            self.universe = universe
+        kiwoom = self.kiwoom if self.login_completed else None
+        self.stock_list = self.master.stocks(get_universe().codes(self.universe, kiwoom), kiwoom)
+        return self.stock_list
+        
+    def bind_events(self):
+        """이벤트 핸들러 연결 (같은 세션을 공유하는 객체끼리 작업 전 다시 연결)"""
+        self.kiwoom.OnEventConnect = self.on_event_connect
+        self.kiwoom.OnReceiveTrData = self.on_receive_tr_data
+        self.kiwoom.OnReceiveRealCondition = self.on_receive_real_condition
+        self.kiwoom.OnReceiveRealData = self.on_receive_real_data
         
     def on_event_connect(self, err_code):
         """로그인 이벤트 처리"""
@@ -77,22 +127,56 @@ class KiwoomConditionFilter:
         else:
             logging.error(f"키움증권 로그인 실패: {err_code}")
             
-        self.event_loop.quit()
+        self.client.notify("connect", err_code)
         
     def on_receive_tr_data(self, screen_no, rqname, trcode, record_name, prev_next, 
                           data_len, error_code, message, splm_msg):
-        """TR 데이터 수신 처리"""
-        if trcode == "opt10081":  # 일봉 데이터
-            self.process_daily_data(trcode, record_name)
-        elif trcode == "opt10082":  # 월봉 데이터
-            self.process_monthly_data(trcode, record_name)
+        """TR 데이터 수신 처리 (rqname으로 요청을 찾아 결과 전달)"""
+        request = self.registry.get(rqname)
+        if request is None:
+            logging.warning(f"요청 정보 없는 TR 응답: {rqname}")
+            return
+            
+        try:
+            started = time.perf_counter()
+            if trcode == "opt10081":  # 일봉 데이터
+                data = self.process_daily_data(trcode, record_name)
+            elif trcode == "opt10082":  # 월봉 데이터
+                data = self.process_monthly_data(trcode, record_name)
+            else:
+                data = []
+            request.parse_time += time.perf_counter() - started
+                
+            # 연속조회가 필요하면 같은 요청으로 다음 페이지 요청
+            if request.add_page(data, prev_next):
+                logging.info(f"{request.code} {trcode} 연속조회 {request.pages + 1}페이지 요청")
+                self.send_tr(request, 2)
+                self.backend.wake()
+                return
+                
+            data = sorted(request.rows, key=lambda x: x['date'])
             
-        self.event_loop.quit()
+            # 로컬 저장소에 병합 (저장된 구간과 겹치면 추가 요청 불필요)
+            if trcode in TIMEFRAMES:
+                if self.store.merge(request.code, TIMEFRAMES[trcode], data):
+                    logging.debug(f"{request.code} {trcode} 저장 구간까지 수신 완료")
+                
+            self.registry.resolve(rqname, data)
+        except Exception as e:
+            logging.error(f"{request.code} TR 데이터 처리 오류: {e}")
+            self.registry.fail(rqname, e)
+            
+        self.backend.wake()
         
     def on_receive_real_condition(self, code, type, condition_name, condition_index):
         """실시간 조건검색 결과 수신"""
         logging.info(f"실시간 조건검색: {code}, {condition_name}")
         
+    def on_receive_real_data(self, code, real_type, real_data):
+        """실시간 시세 수신 (체결 데이터로 오늘 봉 갱신)"""
+        if self.live_candles is not None:
+            self.live_candles.on_receive_real_data(code, real_type, real_data)
+            
     def login(self):
         """키움증권 로그인"""
         logging.info("키움증권 로그인 시도 중...")
@@ -106,16 +190,11 @@ class KiwoomConditionFilter:
             return True
         
         try:
-            self.kiwoom.CommConnect(block=True)
-            
-            for i in range(10):
-                time.sleep(1)
-                current_state = self.kiwoom.GetConnectState()
-                
-                if current_state == 1:
-                    logging.info("키움증권 연결 성공")
-                    self.login_completed = True
-                    return True
+            # 로그인 이벤트 수신 즉시 완료
+            if self.client.run(self.client.connect()):
+                logging.info("키움증권 연결 성공")
+                self.login_completed = True
+                return True
             
             logging.error("키움증권 연결 실패")
             return False
@@ -124,177 +203,193 @@ class KiwoomConditionFilter:
             logging.error(f"로그인 중 오류: {e}")
             return False
             
+    def request_tr(self, trcode, stock_code, until_date=None, max_rows=SCAN_HISTORY_ROWS):
+        """차트 TR 요청 전송 (응답은 반환된 TRRequest로 전달됨, 등록 실패 시 실패 상태 요청 반환)"""
+        try:
+            request = self.registry.register(trcode, stock_code, until_date, max_rows)
+        except RuntimeError as e:
+            # 화면번호가 모두 사용 중이면 이 종목만 실패 처리하고 검색은 계속
+            logging.error(f"{stock_code} {trcode} 요청 등록 실패: {e}")
+            request = TRRequest(None, None, trcode, stock_code, until_date, max_rows)
+            request.set_error(e)
+            return request
+        self.send_tr(request, 0)
+        return request
+        
+    def send_tr(self, request, prev_next):
+        """TR 요청 1페이지 전송 (연속조회는 prev_next=2)"""
+        def send():
+            # TR 요청 파라미터 설정
+            self.kiwoom.SetInputValue("종목코드", request.code)
+            self.kiwoom.SetInputValue("기준일자", "")
+            self.kiwoom.SetInputValue("수정주가구분", "1")
+            return self.kiwoom.CommRqData(request.rqname, request.trcode, prev_next, request.screen_no)
+        
+        # TR 요청 (스케줄러가 호출 제한에 맞춰 간격 조절)
+        result = self.scheduler.submit(send)
+        
+        if result != 0:
+            logging.error(f"{request.code} {request.trcode} 요청 실패: {result}")
+            self.registry.fail(request.rqname, result)
+            
+        return result
+        
+    def wait_requests(self, requests, timeout=TR_TIMEOUT):
+        """요청들이 모두 완료될 때까지 이벤트 루프 실행 (페이지 수신마다 대기시간 연장)"""
+        deadline = time.monotonic() + timeout
+        pages = sum(request.pages for request in requests)
+        
+        while not all(request.done for request in requests):
+            received = sum(request.pages for request in requests)
+            if received != pages:
+                pages = received
+                deadline = time.monotonic() + timeout
+                
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                for request in requests:
+                    if not request.done:
+                        logging.warning(f"{request.code} {request.trcode} 응답 시간 초과")
+                        self.registry.fail(request.rqname, "timeout")
+                break
+                
+            self.backend.process_events(remaining)
+            
+    def fetch_history(self, stock_code, trcode="opt10081", until_date=None, max_rows=None):
+        """연속조회로 과거 이력 일괄 수집 (until_date 또는 max_rows 도달 시 중단)"""
+        logging.info(f"{stock_code} {trcode} 이력 수집 중 (기준: {until_date or '-'}, 최대 {max_rows or '-'}개)...")
+        request = self.request_tr(trcode, stock_code, until_date, max_rows)
+        self.wait_requests([request])
+        logging.info(f"{stock_code} {trcode} {request.pages}페이지, {len(request.rows)}개 수신")
+        return request.result
+        
+    def backfill_history(self, until_date, trcode="opt10081"):
+        """전체 종목의 until_date 이후 이력을 저장소에 채움 (백테스트용)"""
+        for i, stock in enumerate(self.stock_list):
+            timeframe = TIMEFRAMES[trcode]
+            bars = self.store.series(stock['code'], timeframe)
+            
+            # 저장된 이력이 이미 until_date까지 있으면 최신 구간만 보충
+            if bars and bars[0]['date'] <= until_date:
+                if self.store.is_fresh(stock['code'], timeframe):
+                    continue
+                until = bars[-1]['date']
+            else:
+                until = until_date
+                
+            logging.info(f"{i+1}/{len(self.stock_list)}: {stock['name']}({stock['code']}) 이력 보충 중...")
+            self.fetch_history(stock['code'], trcode, until_date=until)
+            
     def get_daily_data(self, stock_code):
         """일봉 데이터 요청"""
         logging.info(f"{stock_code} 일봉 데이터 요청 중...")
-        
-        # TR 요청 파라미터 설정
-        self.kiwoom.SetInputValue("종목코드", stock_code)
-        self.kiwoom.SetInputValue("기준일자", "")
-        self.kiwoom.SetInputValue("수정주가구분", "1")
-        
-        # TR 요청
-        result = self.kiwoom.CommRqData("일봉데이터", "opt10081", 0, "0101")
-        
-        if result == 0:
-            logging.info(f"{stock_code} 일봉 데이터 요청 성공")
-            self.event_loop.exec_()
-        else:
-            logging.error(f"{stock_code} 일봉 데이터 요청 실패: {result}")
+        request = self.request_tr("opt10081", stock_code)
+        self.wait_requests([request])
+        return request.result
             
     def get_monthly_data(self, stock_code):
         """월봉 데이터 요청"""
         logging.info(f"{stock_code} 월봉 데이터 요청 중...")
-        
-        # TR 요청 파라미터 설정
-        self.kiwoom.SetInputValue("종목코드", stock_code)
-        self.kiwoom.SetInputValue("기준일자", "")
-        self.kiwoom.SetInputValue("수정주가구분", "1")
-        
-        # TR 요청
-        result = self.kiwoom.CommRqData("월봉데이터", "opt10082", 0, "0102")
-        
-        if result == 0:
-            logging.info(f"{stock_code} 월봉 데이터 요청 성공")
-            self.event_loop.exec_()
-        else:
-            logging.error(f"{stock_code} 월봉 데이터 요청 실패: {result}")
+        request = self.request_tr("opt10082", stock_code)
+        self.wait_requests([request])
+        return request.result
             
     def process_daily_data(self, trcode, record_name):
-        """일봉 데이터 처리 (변경사항 4: 데이터 타입 변환, 3: 날짜 정렬)"""
-        data_count = self.kiwoom.GetRepeatCnt(trcode, record_name)
-        logging.info(f"수신된 일봉 데이터: {data_count}개")
-        
-        daily_data = []
-        
-        for i in range(min(data_count, 20)):  # 최근 20일만
-            # 각 필드 데이터 추출 및 타입 변환 (변경사항 4)
-            date = self.kiwoom.GetCommData(trcode, record_name, i, "일자").strip()
-            open_price = float(self.kiwoom.GetCommData(trcode, record_name, i, "시가").strip())
-            high_price = float(self.kiwoom.GetCommData(trcode, record_name, i, "고가").strip())
-            low_price = float(self.kiwoom.GetCommData(trcode, record_name, i, "저가").strip())
-            close_price = float(self.kiwoom.GetCommData(trcode, record_name, i, "현재가").strip())
-            volume = int(self.kiwoom.GetCommData(trcode, record_name, i, "거래량").strip())
-            
-            daily_item = {
-                "date": date,
-                "open": open_price,
-                "high": high_price,
-                "low": low_price,
-                "close": close_price,
-                "volume": volume
-            }
-            
-            daily_data.append(daily_item)
-            
-        # 날짜 오름차순 정렬 (변경사항 3)
-        daily_data.sort(key=lambda x: datetime.strptime(x['date'], '%Y%m%d'))
-        self.daily_data[self.current_stock] = daily_data
+        """일봉 데이터 처리 (GetCommDataEx 1회 호출 후 컬럼 단위 변환, 날짜 오름차순)"""
+        rows = get_comm_data_ex(self.kiwoom, trcode, record_name)
+        logging.info(f"수신된 일봉 데이터: {len(rows)}개")
         
-    def process_monthly_data(self, trcode, record_name):
-        """월봉 데이터 처리 (변경사항 4: 데이터 타입 변환, 3: 날짜 정렬)"""
-        data_count = self.kiwoom.GetRepeatCnt(trcode, record_name)
-        logging.info(f"수신된 월봉 데이터: {data_count}개")
+        columns = parse_chart_rows(rows)
+        return columns_to_bars(columns)
         
-        monthly_data = []
+    def process_monthly_data(self, trcode, record_name):
+        """월봉 데이터 처리 (GetCommDataEx 1회 호출 후 컬럼 단위 변환, 날짜 오름차순)"""
+        rows = get_comm_data_ex(self.kiwoom, trcode, record_name)
+        logging.info(f"수신된 월봉 데이터: {len(rows)}개")
         
-        for i in range(min(data_count, 6)):  # 최근 6개월만
-            # 각 필드 데이터 추출 및 타입 변환 (변경사항 4)
-            date = self.kiwoom.GetCommData(trcode, record_name, i, "일자").strip()
-            close_price = float(self.kiwoom.GetCommData(trcode, record_name, i, "현재가").strip())
-            
-            monthly_item = {
-                "date": date,
-                "close": close_price
-            }
-            
-            monthly_data.append(monthly_item)
-            
-        # 날짜 오름차순 정렬 (변경사항 3)
-        monthly_data.sort(key=lambda x: datetime.strptime(x['date'], '%Y%m'))
-        self.monthly_data[self.current_stock] = monthly_data
+        columns = parse_chart_rows(rows, date_length=6)  # YYYYMM
+        return columns_to_bars(columns, fields=("close",))
         
     def check_condition_1(self, daily_data):
         """조건 1: 꼬리 우상향 확인 (변경사항 3: 데이터 정렬 보장)"""
-        # 데이터 정렬 보장 (변경사항 3)
-        sorted_daily_data = sorted(daily_data, key=lambda x: datetime.strptime(x['date'], '%Y%m%d'))
+        # 데이터 정렬 보장 (변경사항 3: BarSeries는 생성할 때 한 번 정렬됨)
+        daily = as_series(daily_data)
         
         # 바닥 2회 판정 유연성 (변경사항 5)
-        n = min(len(sorted_daily_data), 20)
-        if n < 3:
+        n = min(len(daily), TAIL_WINDOW)
+        if n < TAIL_MIN_BARS:
             return False
             
         tail_upward_count = 0
+        recent = daily.tail(n)  # 최근 n일
         
-        for day in sorted_daily_data[-n:]:  # 최근 n일
+        for open_price, high, low, close in zip(recent.open, recent.high, recent.low, recent.close):
             # 시가 < 종가 조건
-            if day['open'] >= day['close']:
+            if open_price >= close:
                 continue
                 
             # 전체 봉 길이 계산
-            total_length = day['high'] - day['low']
+            total_length = high - low
             if total_length == 0:
                 continue
                 
             # 꼬리 길이 계산 (시가 - 저가)
-            tail_length = day['open'] - day['low']
+            tail_length = open_price - low
             
             # 꼬리가 전체 봉 길이의 30% 이상인지 확인
-            if tail_length >= total_length * 0.3:
+            if tail_length >= total_length * TAIL_RATIO:
                 tail_upward_count += 1
                 
         # 최소 3일 이상 꼬리 우상향이 있어야 함
-        return tail_upward_count >= 3
+        return tail_upward_count >= TAIL_MIN_DAYS
         
     def check_condition_2(self, daily_data):
         """조건 2: 바닥 2회 확인 (변경사항 3: 데이터 정렬 보장, 5: 판정 유연성)"""
-        # 데이터 정렬 보장 (변경사항 3)
-        sorted_daily_data = sorted(daily_data, key=lambda x: datetime.strptime(x['date'], '%Y%m%d'))
+        # 데이터 정렬 보장 (변경사항 3: BarSeries는 생성할 때 한 번 정렬됨)
+        daily = as_series(daily_data)
         
         # 바닥 2회 판정 유연성 (변경사항 5)
-        n = min(len(sorted_daily_data), 20)
-        if n < 2:
+        n = min(len(daily), BOTTOM_WINDOW)
+        if n < BOTTOM_MIN_BARS:
             return False
             
         # 최근 n일 데이터에서 저점 찾기
-        lows = [day['low'] for day in sorted_daily_data[-n:]]
+        lows = daily.tail(n).low
         min_low = min(lows)
         
         # 저점 근처(±2%)로 2번 이상 출현하는지 확인
-        bottom_threshold = min_low * 1.02  # 저점 + 2%
+        bottom_threshold = min_low * BOTTOM_BAND  # 저점 + 2%
         bottom_count = 0
         
         for low in lows:
             if low <= bottom_threshold:
                 bottom_count += 1
                 
-        return bottom_count >= 2
+        return bottom_count >= BOTTOM_MIN_COUNT
         
     def check_condition_3(self, monthly_data):
         """조건 3: 하락장 확인 (월봉 분석) (변경사항 3: 데이터 정렬 보장, 7: statistics.mean 사용, 9: 하락장 필터 강화)"""
-        # 데이터 정렬 보장 (변경사항 3)
-        sorted_monthly_data = sorted(monthly_data, key=lambda x: datetime.strptime(x['date'], '%Y%m'))
+        # 데이터 정렬 보장 (변경사항 3: BarSeries는 생성할 때 한 번 정렬됨)
+        monthly = as_series(monthly_data)
         
-        if len(sorted_monthly_data) < 6:
+        if len(monthly) < TREND_LONG:
             return False
             
         # 최근 6개월 고점 대비 현재 종가 하락률 계산 (변경사항 9)
-        recent_6m_data = sorted_monthly_data[-6:]
-        max_price = max([month['close'] for month in recent_6m_data])
-        current_price = recent_6m_data[-1]['close']
+        recent_6m_prices = monthly.tail(TREND_LONG).close
+        max_price = max(recent_6m_prices)
+        current_price = recent_6m_prices[-1]
         decline_rate = (max_price - current_price) / max_price
         
         # 하락률이 50% 이상이면 False 반환 (변경사항 9)
-        if decline_rate >= 0.5:
+        if decline_rate >= DECLINE_CUTOFF:
             logging.warning(f"하락률 {decline_rate:.2%} >= 50%로 인한 필터링")
             return False
             
         # 최근 3개월 평균 종가 (변경사항 7: statistics.mean 사용)
-        recent_3m_prices = [month['close'] for month in recent_6m_data[-3:]]
-        recent_3m_avg = statistics.mean(recent_3m_prices)
+        recent_3m_avg = statistics.mean(recent_6m_prices[-TREND_SHORT:])
         
         # 최근 6개월 평균 종가 (변경사항 7: statistics.mean 사용)
-        recent_6m_prices = [month['close'] for month in recent_6m_data]
         recent_6m_avg = statistics.mean(recent_6m_prices)
         
         # 3개월 평균이 6개월 평균보다 낮으면 하락장
@@ -320,72 +415,195 @@ class KiwoomConditionFilter:
         except Exception as e:
             logging.error(f"Git 자동화 실패: {e}")
         
-    def run_condition_search(self):
-        """조건검색 실행 (변경사항 2: 거래 시간 제한 제거)"""
+    def create_planner(self, verify_samples=MONTHLY_VERIFY_SAMPLES):
+        """조건 1~3 판정 계획 (일봉은 저장소가 오래된 종목만, 월봉 검증은 조건 1, 2 통과 종목 중 일부만 요청)"""
+        verified = set()
+        
+        def request_daily(code):
+            # 저장된 마지막 날짜까지만 연속조회
+            last_date = self.store.last_date(code, "daily")
+            return [self.request_tr("opt10081", code, until_date=last_date)]
+            
+        def verify_monthly_needed(code):
+            return (code in verified or len(verified) < verify_samples) and not self.store.is_fresh(code, "monthly")
+            
+        def request_monthly(code):
+            verified.add(code)
+            return [self.request_tr("opt10082", code)]
+            
+        def load_monthly(code, loaded):
+            monthly_data = loaded["daily"].monthly()
+            if code in verified:
+                verify_monthly(code, monthly_data.to_bars(), self.store.load(code, "monthly"))
+            return monthly_data
+            
+        datasets = [
+            # 마지막 장 마감 이후 동기화된 주기는 요청하지 않음
+            Dataset("daily", lambda code, loaded: self.store.series(code, "daily"),
+                    stale=lambda code: not self.store.is_fresh(code, "daily"), request=request_daily),
+            # 월봉은 일봉으로 만들고, 표본 종목만 opt10082로 검증
+            Dataset("monthly", load_monthly, stale=verify_monthly_needed, request=request_monthly,
+                    requires=("daily",))
+        ]
+        predicates = [
+            Predicate("condition_1", "daily", self.check_condition_1),
+            Predicate("condition_2", "daily", self.check_condition_2),
+            Predicate("condition_3", "monthly", lambda monthly_data: not self.check_condition_3(monthly_data))
+        ]
+        return PredicatePlanner(predicates, datasets)
+        
+    def run_condition_search(self, verify_samples=MONTHLY_VERIFY_SAMPLES, on_match=None, universe=None,
+                             tr_budget=None):
+        """조건검색 실행 (변경사항 2: 거래 시간 제한 제거, on_match: 만족 종목 즉시 전달 콜백)
+        
+        universe: 종목군 이름(kospi_top, kospi, kosdaq, market, etf, all) 또는 조건 dict (미지정 시 이전 종목군)
+        tr_budget: 이번 실행의 TR 요청 한도 (연속조회 포함, 도달하면 남은 종목 중 데이터 갱신이 필요한 종목은 건너뜀)
+        
+        종목은 목록 순서가 아니라 FetchQueue 우선순위 순으로 판정하고, 결과는 목록 순서로 돌려준다.
+        """
         if not self.login_completed:
             logging.error("로그인이 필요합니다.")
             return None
             
+        # 종목명은 마스터에서 조회 (마스터에 없는 종목만 한 번 조회 후 보관)
+        self.load_universe(universe)
+        
         logging.info("조건검색 시작...")
         logging.info(f"총 {len(self.stock_list)}개 종목 분석 시작...")
         
         filtered_stocks = []
+        planner = self.create_planner(verify_samples)
         
-        for i, stock in enumerate(self.stock_list):
-            logging.info(f"{i+1}/{len(self.stock_list)}: {stock['name']}({stock['code']}) 분석 중...")
+        history = get_scan_history()
+        stocks = {stock['code']: stock for stock in self.stock_list}
+        order = {code: index for index, code in enumerate(stocks)}
+        queue = FetchQueue(stocks, self.store, history)
+        
+        # 마지막 봉과 판정 기준이 같으면 직전 판정 결과 재사용 (새 봉이 없는 종목은 조건 판정 생략)
+        cache = get_result_cache()
+        digest = spec_hash(CONDITION_SPEC)
+        reused = 0
+        
+        def add_match(stock, price):
+            filtered_stocks.append({
+                "name": stock['name'],
+                "code": stock['code'],
+                "price": price  # 최신 종가
+            })
+            if on_match:
+                on_match(filtered_stocks[-1])
+                
+        def reuse_cached(stock):
+            nonlocal reused
+            if not self.store.is_fresh(stock['code'], "daily"):
+                return False
+            result = cache.get(result_key(stock['code'], self.store.series(stock['code'], "daily"), digest))
+            if result is None:
+                return False
+            reused += 1
+            if result["passed"]:
+                add_match(stock, result["price"])
+            return True
+        
+        # 다음 종목들의 첫 조건 데이터 요청을 미리 보내 응답 대기 시간을 겹침
+        pending = deque()
+        
+        # TR 한도는 연속조회 페이지, 월봉 검증까지 실제로 보낸 CommRqData 수로 비교
+        sent_before = self.scheduler.total_requests
+        
+        def over_budget():
+            return tr_budget is not None and self.scheduler.total_requests - sent_before >= tr_budget
+        
+        def submit_next():
+            while queue and not (queue.peek_stale() and over_budget()):
+                stock = stocks[queue.pop()]
+                if reuse_cached(stock):
+                    continue
+                pending.append((stock, *planner.prefetch(stock['code'])))
+                return True
+            return False
             
-            self.current_stock = stock['code']
+        while len(pending) < PIPELINE_DEPTH and submit_next():
+            pass
             
-            # 일봉 데이터 요청
-            self.get_daily_data(stock['code'])
-            time.sleep(0.5)  # API 호출 제한 방지
+        # 캐시 재사용(reused)은 submit_next 안에서도 늘어나므로 새로 판정한 수는 따로 셈
+        evaluated = 0
+        total_parse_time = 0.0
+        while pending:
+            stock, requested, requests = pending.popleft()
+            submit_next()
+            evaluated += 1
             
-            # 월봉 데이터 요청
-            self.get_monthly_data(stock['code'])
-            time.sleep(0.5)  # API 호출 제한 방지
+            logging.info(f"{evaluated + reused}/{len(self.stock_list)}: {stock['name']}({stock['code']}) 분석 중...")
             
-            # 데이터 확인
-            if stock['code'] not in self.daily_data or stock['code'] not in self.monthly_data:
-                logging.warning(f"데이터 수신 실패")
-                continue
+            # 뒤 조건의 데이터는 앞 조건을 통과한 경우에만 요청 (요청 즉시 응답 대기)
+            def wait(more):
+                requests.extend(more)
+                self.wait_requests(more)
                 
-            daily_data = self.daily_data[stock['code']]
-            monthly_data = self.monthly_data[stock['code']]
-            
-            # 조건 1: 꼬리 우상향 확인
-            if not self.check_condition_1(daily_data):
-                logging.debug(f"꼬리 우상향 조건 불만족")
-                continue
+            self.wait_requests(requests)
+            passed, failed, loaded = planner.evaluate(stock['code'], wait, requested)
+            
+            # 종목별 파싱 시간 (요청 간격이 줄면 파싱이 병목이 됨)
+            parse_time = sum(request.parse_time for request in requests)
+            total_parse_time += parse_time
+            if requests:
+                logging.info(f"파싱 {sum(len(request.rows) for request in requests)}행, {parse_time * 1000:.1f}ms")
                 
-            # 조건 2: 바닥 2회 확인
-            if not self.check_condition_2(daily_data):
-                logging.debug(f"바닥 2회 조건 불만족")
+            if loaded.get("daily"):
+                self.daily_data[stock['code']] = loaded["daily"]
+            if loaded.get("monthly"):
+                self.monthly_data[stock['code']] = loaded["monthly"]
+            
+            if failed in planner.datasets:
+                logging.warning(f"데이터 수신 실패")
                 continue
                 
-            # 조건 3: 하락장 제외 (월봉 분석)
-            if self.check_condition_3(monthly_data):
-                logging.debug(f"하락장 제외")
+            daily_data = loaded["daily"]
+            price = daily_data[-1]['close']
+            cache.put(result_key(stock['code'], daily_data, digest), {"passed": passed, "price": price})
+            if not passed:
+                history.record(stock['code'], planner.last_passed / len(planner.predicates), False)
+                logging.debug(f"{CONDITION_LABELS[failed]} 조건 불만족")
                 continue
+            history.record(stock['code'], 1.0, True)
                 
             # 모든 조건 만족
             logging.info(f"모든 조건 만족!")
-            filtered_stocks.append({
-                "name": stock['name'],
-                "code": stock['code'],
-                "price": daily_data[-1]['close']  # 최신 종가
-            })
-            
+            add_match(stock, price)
+            
+        if queue:
+            logging.warning(f"TR 요청 한도({tr_budget}회) 도달로 {len(queue)}개 종목 판정 생략")
+        filtered_stocks.sort(key=lambda stock: order[stock['code']])
+        
+        if self.persist_state and reused < len(stocks):
+            planner.stats.write()
+            history.write()
+            cache.write()
+        logging.info(f"판정 결과 재사용 {reused}개, 새로 판정 {evaluated}개")
+        logging.info(f"조건별 통과율/탈락: {planner.summary()}")
+        stats = self.scheduler.stats()
+        logging.info(f"TR 요청 {stats['total_requests']}회, 평균 {stats['average_rate']}회/초 "
+                     f"(과부하 {stats['throttled_requests']}회), 파싱 합계 {total_parse_time:.3f}초")
+        
+        self.filtered_stocks = filtered_stocks
         return filtered_stocks
         
     def save_filtered_stocks(self, filtered_stocks):
-        """필터링된 종목들을 data.json으로 저장 (변경사항 6: Git 자동화 추가)"""
+        """필터링된 종목들을 data.json으로 저장 (변경사항 6: Git 자동화 추가)
+        
+        data.json에 저장된 결과와 같으면 파일 쓰기와 Git 자동화를 건너뛰고, 변경분(편입/이탈/변경, 버전)을 반환한다.
+        """
         try:
-            with open('data.json', 'w', encoding='utf-8') as f:
-                json.dump(filtered_stocks, f, ensure_ascii=False, indent=2)
+            delta = save_result(filtered_stocks)
                 
             logging.info(f"조건검색 완료!")
             logging.info(f"총 {len(filtered_stocks)}개 종목이 조건을 만족했습니다.")
-            logging.info(f"결과가 data.json 파일로 저장되었습니다.")
+            if not delta["written"]:
+                logging.info(f"이전 결과와 같아 data.json을 그대로 둡니다 (버전 {delta['version']}).")
+                return delta
+            logging.info(f"결과가 data.json 파일로 저장되었습니다 (버전 {delta['version']}: "
+                         f"편입 {len(delta['entered'])}, 이탈 {len(delta['exited'])}, 변경 {len(delta['changed'])}).")
             
             # 결과 출력
             for stock in filtered_stocks:
@@ -393,9 +611,11 @@ class KiwoomConditionFilter:
                 
             # Git 자동화 실행 (변경사항 6)
             self.auto_git_commit_push()
+            return delta
                 
         except Exception as e:
             logging.error(f"파일 저장 실패: {e}")
+            return None
 
 def run_condition_search_api():
     """조건검색 API 실행 함수"""
@@ -0,0 +1,173 @@
+import time
+import bisect
+from datetime import datetime
+
+from tr_parser import to_int
+from streaming_condition import StreamingScreen, StreamStateStore
+
+# 실시간 체결 등록 화면번호 (조건검색 화면과 분리)
+LIVE_SCREEN = "0160"
+
+# 실시간 시세 종류와 FID (주식체결)
+REAL_TYPE = "주식체결"
+REAL_FIDS = {
+    "time": 20,     # 체결시간 (HHMMSS)
+    "close": 10,    # 현재가
+    "volume": 13,   # 누적거래량
+    "open": 16,     # 시가
+    "high": 17,     # 고가
+    "low": 18       # 저가
+}
+
+# 종목별 판정 상태 저장 간격 (초)
+STATE_SAVE_INTERVAL = 60
+
+# 한 화면에 등록할 수 있는 최대 종목 수 (키움 제한)
+MAX_CODES_PER_SCREEN = 100
+
+
+class LiveCandleBuilder:
+    """실시간 체결 데이터로 오늘 일봉(시가/고가/저가/종가/거래량)을 메모리에서 갱신
+
+    저장된 과거 일봉으로 만든 종목별 StreamingScreen 상태에 오늘 봉을 반영해 조건 1(꼬리우상향),
+    2(바닥2회)를 다시 판정하므로 장중 신호 확인에 TR 요청이 필요 없고 판정 비용도 이력 길이와
+    무관하다. 체결 이벤트에서는 봉만 갱신하고, 판정은 evaluate_dirty()에서 바뀐 종목만 모아서 한다.
+    """
+
+    def __init__(self, kiwoom_filter, screen_no=LIVE_SCREEN, states=None):
+        self.filter = kiwoom_filter
+        self.screen_no = screen_no
+        self.states = states or StreamStateStore()
+        self.bars = {}       # 종목코드 -> 오늘 봉
+        self.signals = {}    # 종목코드 -> 조건 1, 2 만족 여부
+        self.screens = {}    # 종목코드 -> 판정 상태 (StreamingScreen)
+        self.dirty = set()
+        self.ticks = 0
+        self.updated_at = None
+        self.saved_at = time.monotonic()
+
+    @property
+    def codes(self):
+        return list(self.bars)
+
+    def watch(self, codes, today=None):
+        """실시간 체결 등록 (이미 등록된 종목은 유지하고 추가)"""
+        today = today or datetime.now().strftime('%Y%m%d')
+        new_codes = [code for code in codes if code not in self.bars]
+        if len(self.bars) + len(new_codes) > MAX_CODES_PER_SCREEN:
+            raise ValueError(f"실시간 등록은 화면당 {MAX_CODES_PER_SCREEN}종목까지 가능합니다")
+
+        saved = self.states.read() if new_codes else {}
+        for code in new_codes:
+            self.screens[code] = self.restore(saved.get(code), self.filter.store.series(code, "daily").before(today))
+            self.bars[code] = None
+
+        if new_codes:
+            fids = ";".join(str(fid) for fid in REAL_FIDS.values())
+            # 첫 등록은 "0"(화면 교체), 이후는 "1"(추가)
+            mode = "1" if len(self.bars) > len(new_codes) else "0"
+            self.filter.kiwoom.SetRealReg(self.screen_no, ";".join(new_codes), fids, mode)
+        self.filter.live_candles = self
+        return new_codes
+
+    def restore(self, screen, history):
+        """저장된 상태에 이후 저장된 일봉만 이어서 반영 (저장 이력과 맞지 않으면 이력으로 다시 생성)"""
+        if screen is not None and screen.last_date is not None:
+            start = bisect.bisect_left(history.dates, screen.last_date)
+            # 상태의 마지막 봉이 저장 이력에 없거나 값이 다르면(수정주가, 장중 봉) 다시 생성
+            if start < len(history) and history.dates[start] == screen.last_date:
+                bar = history[start]
+                if (bar['open'], bar['high'], bar['low'], bar['close']) == screen.last[1:]:
+                    for i in range(start + 1, len(history)):
+                        screen.update(history[i])
+                    return screen
+            elif start == len(history):
+                return screen
+        return StreamingScreen.from_series(history)
+
+    def save(self):
+        """판정 상태 저장 (기존 파일의 다른 종목 상태는 유지)"""
+        screens = self.states.read()
+        screens.update(self.screens)
+        self.states.write(screens)
+        self.saved_at = time.monotonic()
+
+    def stop(self):
+        """실시간 등록 해제"""
+        if self.bars:
+            self.filter.kiwoom.SetRealRemove(self.screen_no, "ALL")
+            self.save()
+        if self.filter.live_candles is self:
+            self.filter.live_candles = None
+        self.bars.clear()
+        self.screens.clear()
+        self.signals.clear()
+        self.dirty.clear()
+
+    def on_receive_real_data(self, code, real_type, real_data):
+        """실시간 체결 수신: 해당 종목의 오늘 봉 갱신"""
+        if real_type != REAL_TYPE or code not in self.bars:
+            return
+
+        get = self.filter.kiwoom.GetCommRealData
+        values = {field: get(code, fid) for field, fid in REAL_FIDS.items()}
+        self.update(code, to_int(values["close"]), to_int(values["volume"]),
+                    to_int(values["open"]), to_int(values["high"]), to_int(values["low"]))
+
+    def update(self, code, price, volume, open_price=0, high=0, low=0, date=None):
+        """체결 1건 반영 (거래소 시가/고가/저가가 오면 그대로 쓰고, 없으면 체결가로 누적)"""
+        if price <= 0:
+            return
+        date = date or datetime.now().strftime('%Y%m%d')
+
+        bar = self.bars.get(code)
+        if bar is None or bar['date'] != date:
+            # 날짜가 바뀌면 판정 상태에서 어제 봉이 확정됨
+            bar = {"date": date, "open": open_price or price, "high": price, "low": price,
+                   "close": price, "volume": 0}
+            self.bars[code] = bar
+
+        bar['close'] = price
+        bar['high'] = max(bar['high'], high or price)
+        bar['low'] = min(bar['low'], low or price)
+        if open_price:
+            bar['open'] = open_price
+        bar['volume'] = max(bar['volume'], volume)
+
+        screen = self.screens.get(code)
+        if screen is None:
+            screen = self.screens[code] = StreamingScreen()
+        screen.update(bar)
+
+        self.ticks += 1
+        self.updated_at = time.time()
+        self.dirty.add(code)
+
+    def evaluate(self, code):
+        """조건 1, 2 판정 (확정 창 상태 + 오늘 봉, 이력 길이와 무관)"""
+        screen = self.screens.get(code)
+        return screen is not None and screen.condition_1() and screen.condition_2()
+
+    def evaluate_dirty(self):
+        """체결이 들어온 종목만 다시 판정, 결과가 바뀐 종목 {코드: 만족 여부} 반환"""
+        changed = {}
+        dirty, self.dirty = self.dirty, set()
+        for code in dirty:
+            matched = self.evaluate(code)
+            if self.signals.get(code) != matched:
+                changed[code] = matched
+            self.signals[code] = matched
+        if dirty and time.monotonic() - self.saved_at >= STATE_SAVE_INTERVAL:
+            self.save()
+        return changed
+
+    def result(self):
+        """현재 오늘 봉과 신호"""
+        return {
+            "success": True,
+            "watching": len(self.bars),
+            "ticks": self.ticks,
+            "updated_at": self.updated_at,
+            "bars": {code: bar for code, bar in self.bars.items() if bar is not None},
+            "result": sorted(code for code, matched in self.signals.items() if matched)
+        }
@@ -0,0 +1,210 @@
+import os
+import json
+import logging
+
+DEFAULT_PATH = os.getenv('PREDICATE_STATS_PATH',
+                         os.path.join(os.path.dirname(os.path.abspath(__file__)), 'predicate_stats.json'))
+
+# 판정 1회 비용 (TR 요청 1회 = 1 기준, 로컬 판정은 요청에 비하면 거의 0)
+EVAL_COST = 0.001
+
+# 관측이 없을 때의 통과율 사전값 (통과 1회 / 판정 2회)
+PRIOR_PASSED = 1
+PRIOR_EVALUATED = 2
+
+# 불만족 확률 하한 (항상 통과하는 조건도 순서를 정할 수 있게)
+MIN_REJECT_RATE = 0.01
+
+
+class Dataset:
+    """조건 판정에 쓰는 데이터 (일봉, 월봉 등)
+
+    load(code, loaded): 로컬에서 데이터 생성 (loaded: 이미 로드한 데이터셋)
+    stale(code): 판정 전에 TR 요청이 필요한지
+    request(code): TR 요청 전송 후 요청 목록 반환 (응답은 기다리지 않음)
+    requires: 먼저 로드해야 하는 데이터셋 이름
+    """
+
+    def __init__(self, name, load, stale=None, request=None, requires=()):
+        self.name = name
+        self.load = load
+        self.stale = stale or (lambda code: False)
+        self.request = request
+        self.requires = requires
+
+
+class Predicate:
+    """데이터셋 하나로 판정하는 조건 (check가 True면 통과)"""
+
+    def __init__(self, name, dataset, check, cost=EVAL_COST):
+        self.name = name
+        self.dataset = dataset
+        self.check = check
+        self.cost = cost
+
+
+class PredicateStats:
+    """조건별 판정/통과 횟수 (실행 간 파일로 보존해 통과율 추정에 사용)"""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.counts = self.read()
+        # 마지막 take_changes 이후 더한 횟수 (워커 프로세스가 부모에게 넘겨 저장)
+        self.changes = {}
+
+    def read(self):
+        """저장된 통계 읽기 (없거나 손상되면 빈 통계)"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return {name: list(counts) for name, counts in json.load(f).items()}
+        except (OSError, ValueError):
+            return {}
+
+    def write(self):
+        """임시 파일에 쓴 뒤 교체"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.counts, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.warning(f"조건 통계 저장 실패: {e}")
+
+    def record(self, name, passed):
+        for counts in (self.counts.setdefault(name, [0, 0]), self.changes.setdefault(name, [0, 0])):
+            counts[0] += 1
+            counts[1] += int(bool(passed))
+
+    def take_changes(self):
+        """마지막 호출 이후 더한 횟수를 꺼냄"""
+        changes, self.changes = self.changes, {}
+        return changes
+
+    def merge(self, changes):
+        """다른 프로세스가 더한 횟수 반영"""
+        for name, (evaluated, passed) in changes.items():
+            counts = self.counts.setdefault(name, [0, 0])
+            counts[0] += evaluated
+            counts[1] += passed
+
+    def pass_rate(self, name):
+        evaluated, passed = self.counts.get(name, (0, 0))
+        return (passed + PRIOR_PASSED) / (evaluated + PRIOR_EVALUATED)
+
+
+class PredicatePlanner:
+    """조건 판정 순서와 데이터 수신 시점을 정하는 계획기
+
+    종목마다 남은 조건 중 (아직 없는 데이터 수신 비용 + 판정 비용) / 불만족 확률이
+    가장 작은 조건부터 판정한다. 데이터는 그 데이터가 필요한 조건까지 살아남은 종목만
+    요청하므로 앞 조건에서 떨어진 종목의 TR 요청이 생기지 않는다.
+    """
+
+    def __init__(self, predicates, datasets, stats=None):
+        self.predicates = list(predicates)
+        self.datasets = {dataset.name: dataset for dataset in datasets}
+        self.stats = stats or get_predicate_stats()
+        self.requests = 0
+        self.rejected = {predicate.name: 0 for predicate in self.predicates}
+        # 마지막 evaluate에서 통과한 조건 수 (판정 기록의 통과 근접도)
+        self.last_passed = 0
+
+    def fetch_cost(self, name, code, loaded, requested=()):
+        """데이터셋을 쓸 수 있게 만드는 데 필요한 TR 요청 수 (선행 데이터셋 포함)"""
+        if name in loaded:
+            return 0
+        dataset = self.datasets[name]
+        cost = sum(self.fetch_cost(required, code, loaded, requested) for required in dataset.requires)
+        if name not in requested and dataset.request is not None and dataset.stale(code):
+            cost += 1
+        return cost
+
+    def rank(self, predicate, code, loaded, requested=()):
+        reject_rate = max(1 - self.stats.pass_rate(predicate.name), MIN_REJECT_RATE)
+        return (self.fetch_cost(predicate.dataset, code, loaded, requested) + predicate.cost) / reject_rate
+
+    def next_predicate(self, code, remaining, loaded, requested=()):
+        return min(remaining, key=lambda predicate: self.rank(predicate, code, loaded, requested))
+
+    def prefetch(self, code):
+        """첫 조건에 필요한 데이터 요청만 미리 전송 (요청한 데이터셋 이름, 요청 목록)"""
+        predicate = self.next_predicate(code, self.predicates, {})
+        names, requests = [], []
+        self.collect(predicate.dataset, code, names)
+        for name in names:
+            dataset = self.datasets[name]
+            if dataset.request is not None and dataset.stale(code):
+                requests.extend(dataset.request(code))
+        self.requests += len(requests)
+        return set(names), requests
+
+    def collect(self, name, code, names):
+        """선행 데이터셋부터 순서대로 이름 수집"""
+        for required in self.datasets[name].requires:
+            self.collect(required, code, names)
+        if name not in names:
+            names.append(name)
+
+    def load(self, name, code, loaded, requested, wait):
+        """데이터셋 로드 (필요하면 TR 요청 후 wait로 응답 대기)"""
+        if name in loaded:
+            return loaded[name]
+        dataset = self.datasets[name]
+        for required in dataset.requires:
+            if not self.load(required, code, loaded, requested, wait):
+                loaded[name] = None
+                return None
+
+        if name not in requested and dataset.request is not None and dataset.stale(code):
+            requests = dataset.request(code)
+            self.requests += len(requests)
+            wait(requests)
+        requested.add(name)
+
+        loaded[name] = dataset.load(code, loaded)
+        return loaded[name]
+
+    def evaluate(self, code, wait, requested=None):
+        """종목 하나 판정 (만족 여부, 불만족 조건 이름, 로드한 데이터)
+
+        데이터가 비어 있으면 불만족 조건 이름 대신 데이터셋 이름을 돌려준다.
+        """
+        requested = set(requested or ())
+        loaded = {}
+        remaining = list(self.predicates)
+        self.last_passed = 0
+        while remaining:
+            predicate = self.next_predicate(code, remaining, loaded, requested)
+            data = self.load(predicate.dataset, code, loaded, requested, wait)
+            if not data:
+                return False, predicate.dataset, loaded
+
+            passed = predicate.check(data)
+            self.stats.record(predicate.name, passed)
+            if not passed:
+                self.rejected[predicate.name] += 1
+                return False, predicate.name, loaded
+            remaining.remove(predicate)
+            self.last_passed += 1
+        return True, None, loaded
+
+    def summary(self):
+        """조건별 통과율 추정치와 탈락 수"""
+        return {predicate.name: {"pass_rate": round(self.stats.pass_rate(predicate.name), 3),
+                                 "rejected": self.rejected[predicate.name]}
+                for predicate in self.predicates}
+
+
+# 전역 통계 (같은 프로세스의 모든 객체가 공유)
+predicate_stats = None
+
+
+def get_predicate_stats():
+    """조건 통계 인스턴스 반환"""
+    global predicate_stats
+    if predicate_stats is None:
+        predicate_stats = PredicateStats()
+    return predicate_stats
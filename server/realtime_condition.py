@@ -0,0 +1,117 @@
+import time
+from collections import deque
+
+from fetch_priority import get_scan_history
+
+# 실시간 조건검색 등록 화면번호 (일반 조건검색 "0101"과 분리)
+REALTIME_SCREEN = "0150"
+
+
+class RealtimeConditionTracker:
+    """실시간 조건검색 편입/이탈 이벤트로 조건 만족 종목을 메모리에 유지
+
+    조건식을 실시간(search=1)으로 등록하고, 'I'(편입) 종목만 고급 필터(꼬리우상향 +
+    바닥2회)로 다시 판정한다. 'D'(이탈) 종목은 바로 제외하므로 장중 갱신 비용은
+    전체 종목 수가 아니라 변경 건수에 비례한다.
+    """
+
+    def __init__(self, kiwoom_filter, screen_no=REALTIME_SCREEN):
+        self.filter = kiwoom_filter
+        self.screen_no = screen_no
+        self.condition_name = None
+        self.condition_index = None
+        self.members = set()   # 조건식 편입 종목
+        self.matches = {}      # 고급 필터까지 만족한 종목 (코드 -> 결과)
+        self.pending = deque()
+        self.queued = set()
+        self.events = 0
+        self.started_at = None
+        self.updated_at = None
+
+    @property
+    def running(self):
+        return self.condition_name is not None
+
+    def start(self, condition_name, condition_index):
+        """조건식 실시간 등록 후 현재 편입 종목 전체를 한 번 판정"""
+        client = self.filter.client
+        codes = client.run(client.send_condition(self.screen_no, condition_name, condition_index, 1))
+
+        self.condition_name = condition_name
+        self.condition_index = condition_index
+        self.members = set(codes)
+        self.matches = {}
+        self.pending.clear()
+        self.queued.clear()
+        self.started_at = time.time()
+        self.filter.tracker = self
+
+        for code in codes:
+            self.enqueue(code)
+        self.process_pending()
+        return codes
+
+    def stop(self):
+        """실시간 등록 해제"""
+        if not self.running:
+            return
+        self.filter.kiwoom.SendConditionStop(self.screen_no, self.condition_name, self.condition_index)
+        if self.filter.tracker is self:
+            self.filter.tracker = None
+        self.condition_name = None
+        self.condition_index = None
+
+    def enqueue(self, code):
+        if code not in self.queued:
+            self.queued.add(code)
+            self.pending.append(code)
+
+    def on_receive_real_condition(self, code, type, condition_name, condition_index):
+        """편입/이탈 이벤트 반영 (판정용 TR 요청은 이벤트 밖 process_pending에서 처리)"""
+        if condition_name != self.condition_name:
+            return
+
+        self.events += 1
+        self.updated_at = time.time()
+        # 편입/이탈 종목은 다음 전체 조건검색에서 먼저 판정
+        get_scan_history().mark_changed(code, self.updated_at)
+        if type == "I":
+            self.members.add(code)
+            self.enqueue(code)
+        elif type == "D":
+            self.members.discard(code)
+            self.matches.pop(code, None)
+
+        self.filter.backend.wake()
+
+    def process_pending(self):
+        """신규 편입 종목만 고급 필터로 판정 (판정한 종목 수 반환)"""
+        codes = []
+        while self.pending:
+            code = self.pending.popleft()
+            self.queued.discard(code)
+            if code in self.members:
+                codes.append(code)
+        if not codes:
+            return 0
+
+        stocks = self.filter.master.stocks(codes, self.filter.kiwoom)
+        for stock in self.filter.evaluate_stocks(stocks):
+            # 판정하는 동안 이탈한 종목은 제외
+            if stock['code'] in self.members:
+                self.matches[stock['code']] = stock
+        self.updated_at = time.time()
+        return len(codes)
+
+    def result(self):
+        """현재 만족 종목 (메모리에서 바로 반환)"""
+        return {
+            "success": self.running,
+            "condition_name": self.condition_name or "",
+            "members": len(self.members),
+            "pending": len(self.pending),
+            "events": self.events,
+            "updated_at": self.updated_at,
+            "count": len(self.matches),
+            "result": sorted(self.matches.values(), key=lambda stock: stock['code'])
+        }
@@ -0,0 +1,116 @@
+import os
+import json
+import hashlib
+import logging
+from collections import OrderedDict
+
+DEFAULT_PATH = os.getenv('RESULT_CACHE_PATH',
+                         os.path.join(os.path.dirname(os.path.abspath(__file__)), 'result_cache.json'))
+
+# 최대 보관 결과 수 (전 종목 x 판정 기준 몇 개 분량)
+MAX_ENTRIES = int(os.getenv('RESULT_CACHE_SIZE', '10000'))
+
+
+def spec_hash(spec):
+    """판정 기준 dict의 해시 (키 순서와 무관)"""
+    text = json.dumps(spec, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+def result_key(code, series, spec_digest):
+    """(종목코드, 마지막 봉, 판정 기준 해시) 캐시 키
+
+    마지막 봉은 날짜와 가격, 봉 수를 함께 넣어 장중에 오늘 봉이 바뀌거나 과거 구간을
+    보충한 경우에도 다른 키가 되게 한다. 봉이 없으면 None.
+    """
+    if not len(series):
+        return None
+    last = series[-1]
+    bar = "/".join(str(last.get(field, "")) for field in ("open", "high", "low", "close"))
+    return f"{code}:{last['date']}:{len(series)}:{bar}:{spec_digest}"
+
+
+class ResultCache:
+    """종목별 판정 결과 LRU 캐시 (새 봉이 없는 종목은 조건을 다시 판정하지 않음)
+
+    키는 result_key, 값은 판정 결과 dict. max_entries를 넘으면 가장 오래 쓰이지 않은
+    결과부터 버리고, 실행 사이에는 파일로 보존한다 (최근 사용 순서 유지).
+    """
+
+    def __init__(self, path=DEFAULT_PATH, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # 마지막 take_changes 이후 넣은 결과의 키 (워커 프로세스가 부모에게 넘겨 저장)
+        self.added = set()
+        self.read()
+
+    def read(self):
+        """저장된 결과 읽기 (없거나 손상되면 빈 캐시)"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                items = json.load(f)
+            self.entries = OrderedDict((key, value) for key, value in items)
+        except (OSError, ValueError, TypeError):
+            self.entries = OrderedDict()
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def write(self):
+        """임시 파일에 쓴 뒤 교체 (오래 쓰이지 않은 결과부터)"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(list(self.entries.items()), f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.warning(f"판정 결과 캐시 저장 실패: {e}")
+
+    def get(self, key):
+        """캐시된 결과 (없으면 None, 있으면 최근 사용으로 이동)"""
+        if key is None or key not in self.entries:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return self.entries[key]
+
+    def put(self, key, value):
+        if key is None:
+            return
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        self.added.add(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def take_changes(self):
+        """마지막 호출 이후 넣은 결과를 [키, 결과] 목록으로 꺼냄 (이미 밀려난 결과 제외)"""
+        changes = [[key, self.entries[key]] for key in self.added if key in self.entries]
+        self.added = set()
+        return changes
+
+    def merge(self, changes):
+        """다른 프로세스가 넣은 결과 반영"""
+        for key, value in changes:
+            self.put(key, value)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+# 전역 결과 캐시 (같은 프로세스의 모든 객체가 공유)
+result_cache = None
+
+
+def get_result_cache():
+    """판정 결과 캐시 인스턴스 반환"""
+    global result_cache
+    if result_cache is None:
+        result_cache = ResultCache()
+    return result_cache
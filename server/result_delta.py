@@ -0,0 +1,132 @@
+import os
+import json
+import time
+import logging
+
+DEFAULT_PATH = os.getenv('RESULT_DELTA_PATH',
+                         os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data_delta.json'))
+
+# 보관하는 최근 변경 수 (이보다 오래된 버전에서 요청하면 전체 결과를 돌려줌)
+MAX_DELTAS = 100
+
+
+def diff_results(previous, current):
+    """이전/현재 결과 {종목코드: 종목} 비교 (편입, 이탈 코드, 가격 등 변경)"""
+    entered = [stock for code, stock in current.items() if code not in previous]
+    exited = [code for code in previous if code not in current]
+    changed = []
+    for code, stock in current.items():
+        before = previous.get(code)
+        if before is not None and before != stock:
+            changed.append(dict(stock, previous_price=before.get('price')))
+    return entered, exited, changed
+
+
+class ResultLog:
+    """조건검색 결과의 버전별 변경 기록 (data.json 전체 대신 변경분만 주고받기 위함)
+
+    결과가 바뀐 실행마다 버전을 1씩 올리고 (편입, 이탈, 변경) 목록을 남긴다.
+    결과가 같으면 버전을 올리지 않으므로 소비자는 버전만 비교해 변경 여부를 알 수 있다.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.data = self.read()
+
+    def read(self):
+        """저장된 기록 읽기 (없거나 손상되면 버전 0)"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            data["snapshot"] = dict(data["snapshot"])
+            return data
+        except (OSError, ValueError, KeyError, TypeError):
+            return {"version": 0, "updated_at": None, "snapshot": {}, "deltas": []}
+
+    def write(self):
+        """임시 파일에 쓴 뒤 교체"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.warning(f"결과 변경 기록 저장 실패: {e}")
+
+    @property
+    def version(self):
+        return self.data["version"]
+
+    def update(self, stocks):
+        """새 결과 반영 후 이번 변경분 반환 (바뀐 것이 없으면 버전 유지, updated=False)"""
+        # 다른 프로세스(데몬, 단발 실행)가 쓴 기록 위에 이어서 반영
+        self.data = self.read()
+        current = {stock['code']: stock for stock in stocks}
+        entered, exited, changed = diff_results(self.data["snapshot"], current)
+        delta = {
+            "version": self.version,
+            "previous_version": self.version,
+            "entered": entered,
+            "exited": exited,
+            "changed": changed,
+            "count": len(current)
+        }
+        if not (entered or exited or changed):
+            return dict(delta, updated=False)
+
+        delta["version"] = self.version + 1
+        delta["updated_at"] = time.time()
+        self.data["version"] = delta["version"]
+        self.data["updated_at"] = delta["updated_at"]
+        self.data["snapshot"] = current
+        self.data["deltas"] = (self.data["deltas"] + [delta])[-MAX_DELTAS:]
+        self.write()
+        return dict(delta, updated=True)
+
+    def since(self, version):
+        """version 이후 변경분 (너무 오래된 버전이면 전체 결과, full=True)"""
+        self.data = self.read()
+        version = int(version or 0)
+        deltas = [delta for delta in self.data["deltas"] if delta["version"] > version]
+        if version > self.version or (deltas and deltas[0]["previous_version"] != version) or \
+                (version < self.version and not deltas):
+            return {"version": self.version, "full": True, "result": list(self.data["snapshot"].values())}
+        return {"version": self.version, "full": False, "deltas": deltas}
+
+
+def read_result(path):
+    """저장된 결과 목록 (없거나 손상되면 None)"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_result(stocks, path='data.json', log=None):
+    """data.json 내용이 새 결과와 다를 때만 다시 쓰고, 변경분 반환 (written: 파일을 다시 썼는지)
+
+    변경 기록은 한 곳(RESULT_DELTA_PATH)에 있고 data.json은 실행 위치마다 다를 수 있으므로
+    다시 쓸지는 기록의 버전이 아니라 대상 파일 내용과 비교해 정한다.
+    """
+    delta = (log or get_result_log()).update(stocks)
+    written = read_result(path) != stocks
+    if written:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(stocks, f, ensure_ascii=False, indent=2)
+    return dict(delta, written=written)
+
+
+# 전역 변경 기록 (같은 프로세스의 모든 객체가 공유)
+result_log = None
+
+
+def get_result_log():
+    """결과 변경 기록 인스턴스 반환"""
+    global result_log
+    if result_log is None:
+        result_log = ResultLog()
+    return result_log
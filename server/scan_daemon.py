@@ -0,0 +1,463 @@
+import os
+import sys
+import json
+import time
+import queue
+import socket
+import logging
+import threading
+
+from kiwoom_backend import create_backend
+from kiwoom_config import KIWOOM_CONFIG
+from condition_cache import get_condition_cache
+from realtime_condition import RealtimeConditionTracker
+from live_candle import LiveCandleBuilder
+
+# 상주 스캔 데몬 주소 (server.js와 같은 환경 변수 사용)
+DAEMON_HOST = "127.0.0.1"
+DAEMON_PORT = int(os.getenv("SCAN_DAEMON_PORT", "8765"))
+
+# 요청 한 줄 최대 크기 (JSON 작업 명세)
+MAX_REQUEST_BYTES = 64 * 1024
+
+
+def send_event(conn, event):
+    """JSON 한 줄 이벤트 전송 (클라이언트가 끊겨도 작업은 계속 진행)"""
+    if conn is None:
+        return False
+    try:
+        conn.sendall((json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8"))
+        return True
+    except OSError:
+        return False
+
+
+def read_request(conn):
+    """개행으로 끝나는 JSON 작업 요청 한 줄 읽기"""
+    buffer = b""
+    while b"\n" not in buffer:
+        chunk = conn.recv(4096)
+        if not chunk:
+            break
+        buffer += chunk
+        if len(buffer) > MAX_REQUEST_BYTES:
+            raise ValueError("요청이 너무 큽니다")
+    line = buffer.split(b"\n", 1)[0].strip()
+    if not line:
+        raise ValueError("빈 요청")
+    return json.loads(line.decode("utf-8"))
+
+
+class ScanDaemon:
+    """키움 세션과 캐시를 유지한 채 소켓으로 스캔 작업을 받아 처리하는 상주 프로세스
+
+    키움 OCX는 생성한 스레드(메인)에서만 호출할 수 있으므로 소켓 수신은 별도
+    스레드에서 하고, 작업 실행은 메인 스레드에서 한 번에 하나씩 처리한다.
+    """
+
+    def __init__(self, host=DAEMON_HOST, port=DAEMON_PORT, backend=None):
+        self.host = host
+        self.port = port
+        self.backend = backend or create_backend()
+        self.jobs = queue.Queue()
+        self.started = time.time()
+        self.completed_jobs = 0
+        self.running = False
+        self.server = None
+
+        # 같은 세션을 공유하는 작업 객체 (지연 생성 후 재사용)
+        self.condition_api = None
+        self.advanced_filter = None
+        self.condition_filter = None
+        self.tracker = None
+        self.live_candles = None
+
+        self.handlers = {
+            "ping": self.run_ping,
+            "condition_list": self.run_condition_list,
+            "condition_search": self.run_condition_search,
+            "advanced_search": self.run_advanced_search,
+            "filter_search": self.run_filter_search,
+            "realtime_start": self.run_realtime_start,
+            "realtime_result": self.run_realtime_result,
+            "realtime_stop": self.run_realtime_stop,
+            "live_watch": self.run_live_watch,
+            "live_result": self.run_live_result,
+            "live_stop": self.run_live_stop,
+            "engine_scan": self.run_engine_scan,
+            "backtest": self.run_backtest,
+            "sweep": self.run_sweep,
+            "result_delta": self.run_result_delta
+        }
+
+    def start(self):
+        """소켓 수신 스레드 시작"""
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind((self.host, self.port))
+        self.server.listen()
+        self.port = self.server.getsockname()[1]
+        self.running = True
+
+        threading.Thread(target=self.accept_loop, daemon=True).start()
+        logging.info(f"스캔 데몬 대기 중: {self.host}:{self.port}")
+
+    def stop(self):
+        """수신 종료 (진행 중인 작업은 끝까지 처리)"""
+        self.running = False
+        if self.server is not None:
+            self.server.close()
+
+    def accept_loop(self):
+        """연결마다 작업 요청을 읽어 메인 스레드 큐에 넣음"""
+        while self.running:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                break
+            threading.Thread(target=self.receive_job, args=(conn,), daemon=True).start()
+
+    def receive_job(self, conn):
+        """작업 요청 수신 후 즉시 접수 이벤트 응답"""
+        try:
+            conn.settimeout(5)
+            job = read_request(conn)
+            conn.settimeout(None)
+        except (OSError, ValueError) as e:
+            send_event(conn, {"event": "result", "data": {"success": False, "error": f"잘못된 요청: {e}"}})
+            conn.close()
+            return
+
+        if job.get("job") not in self.handlers:
+            send_event(conn, {"event": "result", "data": {"success": False, "error": f"알 수 없는 작업: {job.get('job')}"}})
+            conn.close()
+            return
+
+        send_event(conn, {"event": "accepted", "job": job["job"], "queued": self.jobs.qsize()})
+        # Qt 이벤트 루프는 다른 스레드에서 깨우지 않음 (메인 루프가 짧은 주기로 큐 확인)
+        self.jobs.put((job, conn))
+
+    def serve_forever(self):
+        """메인 스레드: 작업이 없을 때도 이벤트를 처리해 세션 유지"""
+        self.start()
+        try:
+            while self.running:
+                try:
+                    job, conn = self.jobs.get(timeout=0.05)
+                except queue.Empty:
+                    self.backend.process_events(0.05)
+                    # 실시간 조건검색 신규 편입 종목 판정
+                    if self.tracker is not None and self.tracker.pending:
+                        try:
+                            self.tracker.process_pending()
+                        except Exception:
+                            # 판정 실패로 데몬이 멈추지 않도록 기록만 남김 (대기 종목은 이미 꺼냄)
+                            logging.exception("실시간 편입 종목 판정 실패")
+                    # 체결이 들어온 종목의 오늘 봉으로 조건 1, 2 재판정
+                    if self.live_candles is not None and self.live_candles.dirty:
+                        try:
+                            for code, matched in self.live_candles.evaluate_dirty().items():
+                                logging.info(f"실시간 봉 신호 {'발생' if matched else '해제'}: {code}")
+                        except Exception:
+                            logging.exception("실시간 봉 재판정 실패")
+                    continue
+                self.run_job(job, conn)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+            self.backend.close()
+
+    def run_job(self, job, conn):
+        """작업 실행 후 최종 결과 전송"""
+        started = time.monotonic()
+        send_event(conn, {"event": "started", "job": job["job"]})
+
+        def on_match(stock):
+            send_event(conn, {"event": "match", "stock": stock})
+
+        try:
+            result = self.handlers[job["job"]](job, on_match)
+        except Exception as e:
+            logging.exception(f"작업 실패: {job.get('job')}")
+            result = {"success": False, "error": f"스캔 데몬 작업 오류: {str(e)}"}
+
+        # 다른 작업이 이벤트 핸들러를 바꿨으면 실시간 추적 객체로 되돌림
+        if self.tracker is not None and self.tracker.running:
+            self.advanced_filter.bind_events()
+        if self.live_candles is not None:
+            self.condition_filter.kiwoom.OnReceiveRealData = self.condition_filter.on_receive_real_data
+
+        self.completed_jobs += 1
+        result["elapsed"] = round(time.monotonic() - started, 2)
+        send_event(conn, {"event": "result", "data": result})
+        if conn is not None:
+            conn.close()
+
+    def run_ping(self, job, on_match):
+        """상태 확인"""
+        return {
+            "success": True,
+            "uptime": round(time.time() - self.started, 1),
+            "completed_jobs": self.completed_jobs,
+            "connected": self.backend.kiwoom.GetConnectState() == 1
+        }
+
+    def run_condition_list(self, job, on_match):
+        """조건식 목록 (캐시가 있으면 키움 호출 없이 즉시 반환)"""
+        cache = get_condition_cache()
+        conditions = cache.get()
+
+        if conditions is None:
+            from kiwoom_condition_api import KiwoomConditionAPI
+
+            if self.condition_api is None:
+                self.condition_api = KiwoomConditionAPI(self.backend)
+            self.condition_api.bind_events()
+            if self.condition_api.connect() and self.condition_api.login(KIWOOM_CONFIG["USER_ID"], KIWOOM_CONFIG["PASSWORD"]):
+                conditions = self.condition_api.get_condition_list()
+
+        if not conditions:
+            return {"success": False, "error": "조건식이 없습니다"}
+        return {
+            "success": True,
+            "version": cache.version,
+            "data": [{"index": int(index), "name": name} for index, name in conditions]
+        }
+
+    def run_condition_search(self, job, on_match):
+        """키움 조건식 검색 (kiwoom_condition_api.py 대체)"""
+        from kiwoom_condition_api import KiwoomConditionAPI
+
+        if self.condition_api is None:
+            self.condition_api = KiwoomConditionAPI(self.backend)
+        self.condition_api.bind_events()
+
+        result = self.condition_api.run_condition_search(
+            KIWOOM_CONFIG["USER_ID"], KIWOOM_CONFIG["PASSWORD"], KIWOOM_CONFIG["CERT_PASSWORD"],
+            int(job.get("condition_index", 0))
+        )
+        for stock in result.get("result", []):
+            on_match(stock)
+        return result
+
+    def connect_advanced_filter(self):
+        """고급 필터 객체 준비 및 로그인 (실패 시 오류 메시지 반환)"""
+        from kiwoom_advanced_filter import KiwoomAdvancedFilter
+
+        if self.advanced_filter is None:
+            self.advanced_filter = KiwoomAdvancedFilter(self.backend)
+        self.advanced_filter.bind_events()
+
+        if not self.advanced_filter.connect():
+            return "키움증권 연결 실패"
+        if not self.advanced_filter.login():
+            return "키움증권 로그인 실패"
+        return None
+
+    def run_advanced_search(self, job, on_match):
+        """꼬리우상향 + 바닥2회 고급 필터 (kiwoom_advanced_filter.py 대체)"""
+        error = self.connect_advanced_filter()
+        if error:
+            return {"success": False, "error": error}
+        kiwoom_filter = self.advanced_filter
+
+        filtered_stocks = kiwoom_filter.run_advanced_filter(on_match)
+        if filtered_stocks is None:
+            return {"success": False, "error": "고급 필터링 실행 실패"}
+
+        delta = kiwoom_filter.save_filtered_stocks(filtered_stocks)
+        return {
+            "success": True,
+            "condition_name": "꼬리우상향_바닥2회",
+            "count": len(filtered_stocks),
+            "version": delta["version"] if delta else None,
+            "result": filtered_stocks
+        }
+
+    def run_realtime_start(self, job, on_match):
+        """조건식 실시간 등록 (이후 편입 종목만 고급 필터로 판정)"""
+        error = self.connect_advanced_filter()
+        if error:
+            return {"success": False, "error": error}
+        kiwoom_filter = self.advanced_filter
+
+        conditions = kiwoom_filter.client.run(kiwoom_filter.client.get_conditions())
+        condition_index = int(job.get("condition_index", 0))
+        condition_name = next((name for index, name in conditions if int(index) == condition_index), None)
+        if condition_name is None:
+            return {"success": False, "error": f"조건식 없음: {condition_index}"}
+
+        if self.tracker is not None:
+            self.tracker.stop()
+        self.tracker = RealtimeConditionTracker(kiwoom_filter)
+        self.tracker.start(condition_name, condition_index)
+
+        result = self.tracker.result()
+        for stock in result["result"]:
+            on_match(stock)
+        return result
+
+    def run_realtime_result(self, job, on_match):
+        """실시간 추적 중인 만족 종목 (키움 호출 없이 메모리에서 반환)"""
+        if self.tracker is None or not self.tracker.running:
+            return {"success": False, "error": "실시간 조건검색이 실행 중이 아닙니다"}
+        return self.tracker.result()
+
+    def run_realtime_stop(self, job, on_match):
+        """실시간 조건검색 해제"""
+        if self.tracker is not None:
+            self.tracker.stop()
+            self.tracker = None
+        return {"success": True}
+
+    def connect_condition_filter(self):
+        """KOSPI 조건검색 객체 준비 및 로그인 (실패 시 오류 메시지 반환)"""
+        from kiwoom_condition_filter import KiwoomConditionFilter
+
+        if self.condition_filter is None:
+            self.condition_filter = KiwoomConditionFilter(self.backend)
+        self.condition_filter.bind_events()
+
+        if not self.condition_filter.login_completed:
+            self.condition_filter.login()
+        if not self.condition_filter.login_completed:
+            return "키움증권 로그인 실패"
+        return None
+
+    def run_live_watch(self, job, on_match):
+        """종목 실시간 체결 등록 (codes 미지정 시 마지막 조건검색 결과 종목)"""
+        error = self.connect_condition_filter()
+        if error:
+            return {"success": False, "error": error}
+
+        codes = job.get("codes")
+        if not codes:
+            codes = [stock['code'] for stock in self.condition_filter.filtered_stocks]
+        if not codes:
+            return {"success": False, "error": "실시간 등록할 종목이 없습니다"}
+
+        if self.live_candles is None:
+            self.live_candles = LiveCandleBuilder(self.condition_filter)
+        try:
+            added = self.live_candles.watch(codes)
+        except ValueError as e:
+            return {"success": False, "error": str(e)}
+
+        result = self.live_candles.result()
+        result["added"] = added
+        return result
+
+    def run_live_result(self, job, on_match):
+        """실시간 오늘 봉과 조건 1, 2 신호 (메모리에서 반환)"""
+        if self.live_candles is None:
+            return {"success": False, "error": "실시간 체결 등록 종목이 없습니다"}
+        return self.live_candles.result()
+
+    def run_live_stop(self, job, on_match):
+        """실시간 체결 등록 해제"""
+        if self.live_candles is not None:
+            self.live_candles.stop()
+            self.live_candles = None
+        return {"success": True}
+
+    def universe_codes(self, job):
+        """작업의 codes 또는 universe(종목군 이름/조건)를 종목코드 목록으로 (둘 다 없으면 None: 저장된 전 종목)"""
+        if job.get("codes") or not job.get("universe"):
+            return job.get("codes")
+        from universe import get_universe
+
+        kiwoom = self.backend.kiwoom
+        return get_universe().codes(job["universe"], kiwoom if kiwoom.GetConnectState() == 1 else None)
+
+    def run_engine_scan(self, job, on_match):
+        """저장된 전 종목 일봉을 배열로 한 번에 판정 (TR 요청 없음, numpy 필요)
+
+        screen: 스크린 이름(condition_filter, advanced_filter) 또는 식
+        (예: "tail_upward(window=20, ratio=0.3) & bottom_twice(band=1.02) & !downtrend(3,6)")
+        """
+        from condition_dsl import compile_screen, ScreenError, DEFAULT_SCREEN
+        from bar_store import BarStore
+        from stock_master import get_stock_master
+
+        screen = job.get("screen") or DEFAULT_SCREEN
+        try:
+            plan = compile_screen(screen)
+        except ScreenError as e:
+            return {"success": False, "error": f"스크린 식 오류: {e}", "result": []}
+
+        started = time.perf_counter()
+        columns = plan.scan(BarStore(), self.universe_codes(job))
+        master = get_stock_master()
+        scores = [name for name in ("tail_count", "bottom_count", "decline_rate") if name in columns]
+
+        matched = []
+        for row, code in enumerate(columns["code"]):
+            if not columns["passed"][row]:
+                continue
+            stock = {"name": master.name(code), "code": code}
+            for name in scores:
+                value = columns[name][row]
+                stock[name] = round(float(value), 4) if name == "decline_rate" else int(value)
+            matched.append(stock)
+            on_match(stock)
+
+        return {
+            "success": True,
+            "condition_name": "꼬리우상향_바닥2회_상승장" if plan.text == compile_screen().text else screen,
+            "screen": plan.text,
+            "universe": len(columns["code"]),
+            "evaluate_ms": round((time.perf_counter() - started) * 1000, 1),
+            "count": len(matched),
+            "result": matched
+        }
+
+    def run_backtest(self, job, on_match):
+        """저장된 일봉 전체로 조건 1~3 백테스트 (numpy 필요)"""
+        from backtest import run_backtest, HORIZONS
+
+        return run_backtest(codes=self.universe_codes(job), start=job.get("start"), end=job.get("end"),
+                            horizons=job.get("horizons") or HORIZONS, params=job.get("params"))
+
+    def run_sweep(self, job, on_match):
+        """조건 1~3 파라미터 격자 탐색 (numpy 필요)"""
+        from sweep import run_sweep, HORIZONS
+
+        try:
+            return run_sweep(codes=self.universe_codes(job), grid=job.get("grid"), start=job.get("start"),
+                             end=job.get("end"), horizons=job.get("horizons") or HORIZONS)
+        except ValueError as e:
+            return {"success": False, "error": str(e)}
+
+    def run_result_delta(self, job, on_match):
+        """since 버전 이후 data.json 결과 변경분 (너무 오래된 버전이면 전체 결과)"""
+        from result_delta import get_result_log
+
+        return dict(get_result_log().since(job.get("since", 0)), success=True)
+
+    def run_filter_search(self, job, on_match):
+        """종목군 조건검색 (kiwoom_condition_filter.py 대체, universe 미지정 시 이전 종목군)"""
+        error = self.connect_condition_filter()
+        if error:
+            return {"success": False, "error": error}
+        kiwoom_filter = self.condition_filter
+
+        filtered_stocks = kiwoom_filter.run_condition_search(on_match=on_match, universe=job.get("universe"),
+                                                             tr_budget=job.get("tr_budget"))
+        if filtered_stocks is None:
+            return {"success": False, "error": "조건검색 실행 실패"}
+
+        delta = kiwoom_filter.save_filtered_stocks(filtered_stocks)
+        return {
+            "success": True,
+            "condition_name": "꼬리우상향_바닥2회_상승장",
+            "count": len(filtered_stocks),
+            "version": delta["version"] if delta else None,
+            "result": filtered_stocks
+        }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s: %(message)s')
+    ScanDaemon().serve_forever()
+    sys.exit(0)
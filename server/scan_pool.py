@@ -0,0 +1,283 @@
+import sys
+import json
+import time
+import queue
+import logging
+import argparse
+import multiprocessing
+
+from kiwoom_backend import create_backend
+
+# 한 번에 가져가는 최소 종목 수 (작을수록 작업 분배가 고르지만 조정 비용 증가)
+CHUNK_SIZE = 5
+
+# 워커당 작업 묶음 수 (종목이 많으면 묶음 크기를 키워 묶음마다 드는 준비/통계 저장 횟수를 제한)
+CHUNKS_PER_WORKER = 16
+
+# 처리 중 워커가 종료된 묶음을 다른 워커에게 다시 맡기는 횟수 (같은 묶음이 계속 워커를 죽이면 포기)
+CHUNK_RETRIES = 1
+
+# 워커가 종료된 뒤 처리 중인 묶음 없이 이 시간(초)이 지나면 꺼낸 직후 사라진 묶음으로 보고 다시 배정
+LOST_CHUNK_SECONDS = 5
+
+
+def take_chunk(worker_id, queues, remaining):
+    """자기 큐에서 작업을 꺼내고, 비어 있으면 다른 워커 큐에서 가져옴 (work stealing)
+
+    remaining은 끝나지 않은 묶음 수로 부모 프로세스가 결과를 받았을 때 줄인다.
+    큐가 비어도 다른 워커가 처리 중인 묶음이 있으면 (그 워커가 죽으면 다시 큐에 들어오므로) 계속 기다린다.
+    """
+    order = [worker_id] + [i for i in range(len(queues)) if i != worker_id]
+
+    while True:
+        with remaining.get_lock():
+            if remaining.value <= 0:
+                return None, None
+
+        for owner in order:
+            try:
+                chunk = queues[owner].get(timeout=0.05) if owner == worker_id else queues[owner].get_nowait()
+            except queue.Empty:
+                continue
+            return owner, chunk
+
+
+def take_state_changes():
+    """워커 프로세스에서 이번 묶음의 조건 통계/판정 기록/판정 결과 변경분을 꺼냄"""
+    from predicate_planner import get_predicate_stats
+    from fetch_priority import get_scan_history
+    from result_cache import get_result_cache
+
+    return {"predicate_stats": get_predicate_stats().take_changes(),
+            "scan_history": get_scan_history().take_changes(),
+            "result_cache": get_result_cache().take_changes()}
+
+
+def save_state_changes(changes):
+    """워커들이 보낸 변경분을 부모 프로세스에서 한 번에 반영 후 저장"""
+    from predicate_planner import get_predicate_stats
+    from fetch_priority import get_scan_history
+    from result_cache import get_result_cache
+
+    stats = get_predicate_stats()
+    history = get_scan_history()
+    cache = get_result_cache()
+    for change in changes:
+        stats.merge(change["predicate_stats"])
+        history.merge(change["scan_history"])
+        cache.merge(change["result_cache"])
+    stats.write()
+    history.write()
+    cache.write()
+
+
+def scan_worker(worker_id, queues, remaining, results, backend_kind, backend_path):
+    """워커 프로세스: 자체 세션/백엔드로 작업 묶음을 조건검색"""
+    from kiwoom_condition_filter import KiwoomConditionFilter, MONTHLY_VERIFY_SAMPLES
+
+    try:
+        kiwoom_filter = KiwoomConditionFilter(create_backend(backend_kind, backend_path))
+        # 워커마다 같은 파일을 덮어쓰면 서로의 기록이 사라지므로 변경분만 부모에게 전달
+        kiwoom_filter.persist_state = False
+        kiwoom_filter.login()
+        if not kiwoom_filter.login_completed:
+            results.put(("error", worker_id, "키움증권 로그인 실패"))
+            return
+    except Exception as e:
+        results.put(("error", worker_id, f"워커 초기화 실패: {e}"))
+        return
+
+    processed = 0
+    stolen = 0
+
+    while True:
+        owner, item = take_chunk(worker_id, queues, remaining)
+        if item is None:
+            break
+        chunk_id, chunk = item
+        # 처리 중 종료되면 부모가 이 묶음을 다른 워커에게 다시 맡김
+        results.put(("start", worker_id, chunk_id))
+        if owner != worker_id:
+            stolen += 1
+
+        index_by_code = {code: index for index, code in chunk}
+
+        # 월봉 검증 표본은 워커당 첫 묶음에서만 요청
+        verify_samples = MONTHLY_VERIFY_SAMPLES if processed == 0 else 0
+        matched = kiwoom_filter.run_condition_search(verify_samples,
+                                                     universe={"codes": [code for _, code in chunk]}) or []
+
+        processed += len(chunk)
+        results.put(("state", worker_id, take_state_changes()))
+        results.put(("result", worker_id, (chunk_id, [(index_by_code[stock['code']], stock) for stock in matched])))
+
+    results.put(("done", worker_id, {
+        "processed": processed,
+        "stolen_chunks": stolen,
+        "scheduler": kiwoom_filter.scheduler.stats()
+    }))
+
+
+def run_pool(codes, workers=2, backend_kind=None, backend_path=None, chunk_size=None, worker=None):
+    """종목코드를 워커 수만큼 나눠 병렬 조건검색 후 원래 순서로 병합 (종목명은 워커의 종목 마스터에서 조회)
+
+    처리 중 워커가 종료되면 그 묶음을 남은 워커에게 다시 맡기고, 끝내 처리하지 못한 종목이 있으면
+    unprocessed에 담아 success=False로 반환한다 (일부 결과로 data.json을 덮어쓰지 않도록).
+    worker: 워커 프로세스 함수 (기본 scan_worker, 테스트에서 대체)
+    """
+    context = multiprocessing.get_context("spawn")  # Qt/COM 상태를 물려받지 않도록 새 프로세스
+    started = time.monotonic()
+    chunk_size = chunk_size or max(CHUNK_SIZE, len(codes) // (workers * CHUNKS_PER_WORKER))
+
+    indexed = list(enumerate(codes))
+    chunks = [indexed[i:i + chunk_size] for i in range(0, len(indexed), chunk_size)]
+
+    # 연속된 구간을 워커별로 나눠 배정 (먼저 끝난 워커는 다른 구간을 가져감)
+    queues = [context.Queue() for _ in range(workers)]
+    shard_size = -(-len(chunks) // workers) if chunks else 0
+    for chunk_id, chunk in enumerate(chunks):
+        queues[min(chunk_id // shard_size, workers - 1)].put((chunk_id, chunk))
+
+    remaining = context.Value('i', len(chunks))
+    results = context.Queue()
+
+    processes = [
+        context.Process(target=worker or scan_worker,
+                        args=(worker_id, queues, remaining, results, backend_kind, backend_path))
+        for worker_id in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    completed = {}          # 묶음 번호 -> [(원래 순서, 종목)]
+    in_flight = {}          # 워커 번호 -> 처리 중인 묶음 번호
+    retries = [0] * len(chunks)
+    abandoned = set()
+    state_changes = []
+    worker_stats = {}
+    errors = []
+    finished = set()
+    crashed = False
+    idle_since = None
+
+    def settle():
+        with remaining.get_lock():
+            remaining.value -= 1
+
+    def requeue(chunk_id):
+        """종료된 워커의 묶음을 살아 있는 워커 큐에 다시 넣음 (재시도 한도를 넘으면 포기)"""
+        if chunk_id in completed or chunk_id in abandoned:
+            return
+        alive = [worker_id for worker_id in range(workers) if worker_id not in finished]
+        if not alive or retries[chunk_id] >= CHUNK_RETRIES:
+            abandoned.add(chunk_id)
+            settle()
+            return
+        retries[chunk_id] += 1
+        queues[alive[0]].put((chunk_id, chunks[chunk_id]))
+
+    while len(finished) < workers:
+        try:
+            kind, worker_id, payload = results.get(timeout=0.5)
+        except queue.Empty:
+            kind = None
+
+        if kind == "start":
+            in_flight[worker_id] = payload
+        elif kind == "result":
+            chunk_id, matched = payload
+            in_flight.pop(worker_id, None)
+            # 다시 맡긴 묶음은 결과가 두 번 올 수 있으므로 처음 결과만 사용
+            if chunk_id not in completed:
+                completed[chunk_id] = matched
+                if chunk_id in abandoned:
+                    abandoned.discard(chunk_id)
+                else:
+                    settle()
+        elif kind == "state":
+            state_changes.append(payload)
+        elif kind == "done":
+            worker_stats[worker_id] = payload
+            finished.add(worker_id)
+        elif kind == "error":
+            errors.append(f"워커 {worker_id}: {payload}")
+            finished.add(worker_id)
+
+        # 결과 없이 종료된 워커 (정상 종료는 done/error 메시지가 뒤따름)
+        for worker_id, process in enumerate(processes):
+            if worker_id not in finished and not process.is_alive() and process.exitcode != 0:
+                errors.append(f"워커 {worker_id} 비정상 종료 (exit {process.exitcode})")
+                finished.add(worker_id)
+                crashed = True
+                if worker_id in in_flight:
+                    requeue(in_flight.pop(worker_id))
+
+        # 큐에서 꺼낸 직후(start 전송 전) 종료된 워커의 묶음은 처리 중 목록에 없으므로 시간으로 판단
+        if crashed and remaining.value > 0 and not in_flight and len(finished) < workers:
+            idle_since = idle_since or time.monotonic()
+            if time.monotonic() - idle_since >= LOST_CHUNK_SECONDS:
+                for chunk_id in range(len(chunks)):
+                    requeue(chunk_id)
+                idle_since = None
+        else:
+            idle_since = None
+
+    for process in processes:
+        process.join(timeout=5)
+
+    if state_changes:
+        save_state_changes(state_changes)
+
+    matched = sorted((item for items in completed.values() for item in items), key=lambda item: item[0])
+    filtered_stocks = [stock for _, stock in matched]
+    unprocessed = [code for chunk_id, chunk in enumerate(chunks) if chunk_id not in completed for _, code in chunk]
+
+    for error in errors:
+        logging.error(error)
+    if unprocessed:
+        logging.warning(f"처리되지 않은 종목 {len(unprocessed)}개: {', '.join(unprocessed)}")
+
+    return {
+        "success": bool(worker_stats) and not unprocessed,
+        "condition_name": "꼬리우상향_바닥2회_상승장",
+        "count": len(filtered_stocks),
+        "result": filtered_stocks,
+        "unprocessed": unprocessed,
+        "workers": worker_stats,
+        "errors": errors,
+        "elapsed": round(time.monotonic() - started, 2)
+    }
+
+
+def save_filtered_stocks(filtered_stocks, path='data.json'):
+    """병합 결과를 단일 프로세스 실행과 같은 data.json 형식으로 저장 (바뀐 경우에만, 변경분 반환)"""
+    from result_delta import save_result
+
+    return save_result(filtered_stocks, path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="다중 프로세스 조건검색")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--backend", choices=["live", "simulated", "replay"], default=None)
+    parser.add_argument("--cassette", default=None, help="replay 백엔드 녹화 파일")
+    parser.add_argument("--chunk-size", type=int, default=None, help="묶음 크기 (미지정 시 종목 수에 맞춤)")
+    parser.add_argument("--universe", default=None, help="종목군 (kospi_top, kospi, kosdaq, market, etf, all)")
+    args = parser.parse_args()
+
+    from universe import get_universe
+
+    # 부모 프로세스는 세션이 없으므로 저장된 종목군 목록 사용
+    codes = get_universe().codes(args.universe)
+    if not codes:
+        print(json.dumps({"success": False, "error": "종목군 목록이 없습니다 (로그인한 조건검색을 한 번 실행해야 합니다)"},
+                         ensure_ascii=False, indent=2))
+        sys.exit(1)
+
+    result = run_pool(codes, args.workers, args.backend, args.cassette, args.chunk_size)
+    # 처리하지 못한 종목이 있으면 일부 결과로 data.json을 덮어쓰지 않음
+    if result["success"]:
+        save_filtered_stocks(result["result"])
+
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    sys.exit(0 if result["success"] else 1)
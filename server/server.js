@@ -2,11 +2,18 @@ const express = require('express');
 const cors = require('cors');
 const fs = require('fs');
 const path = require('path');
+const net = require('net');
 const { spawn } = require('child_process');
 
 const app = express();
 const PORT = process.env.PORT || 3001;
 
+// 상주 스캔 데몬 (scan_daemon.py) 포트 - 실행 중이 아니면 기존처럼 스크립트 실행
+const SCAN_DAEMON_PORT = process.env.SCAN_DAEMON_PORT || 8765;
+
+// 데몬 응답 대기 제한 (이 시간 동안 아무 이벤트도 오지 않으면 중단, 밀리초)
+const SCAN_DAEMON_TIMEOUT = parseInt(process.env.SCAN_DAEMON_TIMEOUT || '600000', 10);
+
 // CORS 설정
 app.use(cors());
 app.use(express.json());
@@ -29,6 +36,85 @@ let autoConditionResult = {
   isAutoRunning: false
 };
 
+// 상주 스캔 데몬에 작업 요청 (JSON 한 줄 요청, 이벤트를 한 줄씩 수신)
+// 데몬에 연결할 수 없으면 null을 반환하고 호출 측에서 Python 스크립트를 직접 실행
+function runDaemonJob(job, onEvent) {
+  return new Promise((resolve) => {
+    const socket = net.createConnection({ host: '127.0.0.1', port: SCAN_DAEMON_PORT });
+    let connected = false;
+    let buffer = '';
+    let finalResult = null;
+    let settled = false;
+
+    const finish = (result) => {
+      if (settled) return;
+      settled = true;
+      resolve(result);
+    };
+
+    socket.setEncoding('utf8');
+
+    // 연결 전에 멈추면 스크립트 실행으로 대체, 작업 중에 멈추면 오류 결과 반환
+    socket.setTimeout(SCAN_DAEMON_TIMEOUT, () => {
+      if (!connected) {
+        finish(null);
+      } else {
+        finish(finalResult || { success: false, error: '스캔 데몬 응답 시간 초과' });
+      }
+      socket.destroy();
+    });
+
+    socket.on('connect', () => {
+      connected = true;
+      socket.write(JSON.stringify(job) + '\n');
+    });
+
+    socket.on('data', (data) => {
+      buffer += data;
+      let newline;
+      while ((newline = buffer.indexOf('\n')) !== -1) {
+        const line = buffer.substring(0, newline).trim();
+        buffer = buffer.substring(newline + 1);
+        if (!line) continue;
+
+        try {
+          const event = JSON.parse(line);
+          if (event.event === 'result') {
+            finalResult = event.data;
+          }
+          if (onEvent) onEvent(event);
+        } catch (parseError) {
+          console.log('❌ 스캔 데몬 응답 파싱 오류:', parseError);
+        }
+      }
+    });
+
+    socket.on('error', (err) => {
+      if (!connected) {
+        finish(null);
+      } else {
+        finish({ success: false, error: '스캔 데몬 통신 오류: ' + err.message });
+      }
+    });
+
+    socket.on('close', () => {
+      finish(finalResult || { success: false, error: '스캔 데몬 응답 없음' });
+    });
+  });
+}
+
+// 자동 조건검색 결과 저장
+function saveAutoConditionResult(searchResult) {
+  autoConditionResult.result = searchResult;
+  autoConditionResult.lastUpdate = new Date();
+
+  // 결과를 파일에 저장
+  const resultPath = path.join(__dirname, 'auto_condition_result.json');
+  fs.writeFileSync(resultPath, JSON.stringify(searchResult, null, 2), 'utf8');
+
+  console.log('✅ 자동 조건검색 완료:', searchResult.count, '개 종목');
+}
+
 // 자동 조건검색 시작 (서버 시작 시)
 function startAutoConditionSearch() {
   if (autoConditionResult.isAutoRunning) return;
@@ -50,6 +136,17 @@ async function runAutoConditionSearch() {
   try {
     console.log('🔄 자동 조건검색 실행 중...');
     
+    // 상주 스캔 데몬 우선 사용 (세션/캐시 유지)
+    const daemonResult = await runDaemonJob({ job: 'condition_search' });
+    if (daemonResult) {
+      if (daemonResult.success) {
+        saveAutoConditionResult(daemonResult);
+      } else {
+        console.log('❌ 자동 조건검색 실패:', daemonResult.error);
+      }
+      return;
+    }
+    
     // Python 스크립트 실행 (기존 조건검색)
     const pythonScript = path.join(__dirname, 'kiwoom_condition_api.py');
     const pythonCommand = process.platform === 'win32' ? 'python' : 'python3';
@@ -79,15 +176,7 @@ async function runAutoConditionSearch() {
     pythonProcess.on('close', (code) => {
       if (result.trim()) {
         try {
-          const searchResult = JSON.parse(result.trim());
-          autoConditionResult.result = searchResult;
-          autoConditionResult.lastUpdate = new Date();
-          
-          // 결과를 파일에 저장
-          const resultPath = path.join(__dirname, 'auto_condition_result.json');
-          fs.writeFileSync(resultPath, JSON.stringify(searchResult, null, 2), 'utf8');
-          
-          console.log('✅ 자동 조건검색 완료:', searchResult.count, '개 종목');
+          saveAutoConditionResult(JSON.parse(result.trim()));
         } catch (parseError) {
           console.log('❌ 자동 조건검색 파싱 오류:', parseError);
         }
@@ -102,10 +191,17 @@ async function runAutoConditionSearch() {
 }
 
 // 고급 조건검색 실행 (꼬리우상향, 바닥2회, 상승장)
-async function runAdvancedConditionSearch() {
+// onEvent: 상주 데몬 사용 시 조건 만족 종목을 찾는 즉시 전달받는 콜백
+async function runAdvancedConditionSearch(onEvent) {
   try {
     console.log('🔍 고급 조건검색 실행 중...');
     
+    const daemonResult = await runDaemonJob({ job: 'advanced_search' }, onEvent);
+    if (daemonResult) {
+      console.log('✅ 고급 조건검색 완료 (스캔 데몬):', daemonResult.count, '개 종목');
+      return daemonResult;
+    }
+    
     // Python 스크립트 실행 (새로운 고급 조건검색)
     const pythonScript = path.join(__dirname, 'kiwoom_advanced_filter.py');
     const pythonCommand = process.platform === 'win32' ? 'python' : 'python3';
@@ -333,8 +429,28 @@ app.post('/api/login', async (req, res) => {
 });
 
 // 조건검색 목록 가져오기
-app.get('/api/condition/list', (req, res) => {
+app.get('/api/condition/list', async (req, res) => {
   try {
+    // 1) 저장된 조건식 캐시 (키움 호출 없이 즉시 응답)
+    const cachePath = path.join(__dirname, 'condition_cache.json');
+    if (fs.existsSync(cachePath)) {
+      const cache = JSON.parse(fs.readFileSync(cachePath, 'utf8'));
+      if (cache.conditions && cache.conditions.length > 0) {
+        return res.json({
+          success: true,
+          version: cache.version,
+          data: cache.conditions.map(([index, name]) => ({ index: parseInt(index, 10), name }))
+        });
+      }
+    }
+
+    // 2) 캐시가 없으면 스캔 데몬에서 로드
+    const daemonResult = await runDaemonJob({ job: 'condition_list' });
+    if (daemonResult && daemonResult.success) {
+      return res.json(daemonResult);
+    }
+
+    // 3) 시뮬레이션 목록
     res.json({
       success: true,
       data: conditionList
@@ -458,6 +574,22 @@ app.post('/api/condition/search', async (req, res) => {
 
     console.log('🔍 조건검색 실행 시작...');
 
+    // 상주 스캔 데몬이 실행 중이면 프로세스 생성 없이 처리
+    const daemonResult = await runDaemonJob({
+      job: 'condition_search',
+      condition_index: req.body.conditionIndex || 0
+    });
+    if (daemonResult) {
+      kiwoomConditionStatus.isRunning = false;
+      kiwoomConditionStatus.lastUpdate = new Date();
+      if (daemonResult.success) {
+        kiwoomConditionStatus.lastResult = daemonResult;
+      } else {
+        kiwoomConditionStatus.error = daemonResult.error;
+      }
+      return res.json(daemonResult);
+    }
+
     // Python 스크립트 실행
     const pythonScript = path.join(__dirname, 'kiwoom_condition_api.py');
     console.log('📁 Python 스크립트 경로:', pythonScript);
@@ -605,6 +737,20 @@ app.post('/api/condition/advanced/search', async (req, res) => {
   try {
     console.log('🔍 고급 조건검색 요청 받음...');
     
+    // ?stream=1 이면 데몬 이벤트(접수/종목 발견/결과)를 한 줄씩 바로 전달
+    if (req.query.stream === '1') {
+      res.setHeader('Content-Type', 'application/x-ndjson');
+      let streamed = false;
+      const result = await runAdvancedConditionSearch((event) => {
+        streamed = true;
+        res.write(JSON.stringify(event) + '\n');
+      });
+      if (!streamed) {
+        res.write(JSON.stringify({ event: 'result', data: result }) + '\n');
+      }
+      return res.end();
+    }
+    
     const result = await runAdvancedConditionSearch();
     
     res.json(result);
@@ -617,6 +763,42 @@ app.post('/api/condition/advanced/search', async (req, res) => {
   }
 });
 
+// 실시간 조건검색 시작/조회/해제 (상주 스캔 데몬 필요)
+// 편입 종목만 다시 판정하므로 조회는 데몬 메모리에서 바로 응답
+app.post('/api/condition/realtime/start', async (req, res) => {
+  const result = await runDaemonJob({
+    job: 'realtime_start',
+    condition_index: req.body.conditionIndex || 0
+  });
+  res.json(result || { success: false, error: '스캔 데몬이 실행 중이 아닙니다' });
+});
+
+app.get('/api/condition/realtime/result', async (req, res) => {
+  const result = await runDaemonJob({ job: 'realtime_result' });
+  res.json(result || { success: false, error: '스캔 데몬이 실행 중이 아닙니다' });
+});
+
+app.post('/api/condition/realtime/stop', async (req, res) => {
+  const result = await runDaemonJob({ job: 'realtime_stop' });
+  res.json(result || { success: false, error: '스캔 데몬이 실행 중이 아닙니다' });
+});
+
+// 실시간 체결로 만든 오늘 봉 기준 조건 1, 2 신호 (상주 스캔 데몬 필요)
+app.post('/api/condition/live/watch', async (req, res) => {
+  const result = await runDaemonJob({ job: 'live_watch', codes: req.body.codes || [] });
+  res.json(result || { success: false, error: '스캔 데몬이 실행 중이 아닙니다' });
+});
+
+app.get('/api/condition/live/result', async (req, res) => {
+  const result = await runDaemonJob({ job: 'live_result' });
+  res.json(result || { success: false, error: '스캔 데몬이 실행 중이 아닙니다' });
+});
+
+app.post('/api/condition/live/stop', async (req, res) => {
+  const result = await runDaemonJob({ job: 'live_stop' });
+  res.json(result || { success: false, error: '스캔 데몬이 실행 중이 아닙니다' });
+});
+
 // 고급 조건검색 결과 가져오기 (data.json에서)
 app.get('/api/condition/advanced/result', (req, res) => {
   try {
@@ -680,6 +862,32 @@ app.get('/api/samsung-daily', (req, res) => {
   }
 });
 
+// 조건검색 결과 변경분 API (since 버전 이후 편입/이탈/변경, 너무 오래된 버전이면 전체 결과)
+app.get('/api/condition/delta', (req, res) => {
+  try {
+    const deltaPath = path.join(__dirname, 'data_delta.json');
+    const since = parseInt(req.query.since || '0', 10) || 0;
+
+    if (!fs.existsSync(deltaPath)) {
+      return res.json({ success: true, version: 0, full: true, result: [] });
+    }
+
+    const log = JSON.parse(fs.readFileSync(deltaPath, 'utf8'));
+    const deltas = log.deltas.filter(delta => delta.version > since);
+    const contiguous = deltas.length ? deltas[0].previous_version === since : since === log.version;
+
+    if (since > log.version || !contiguous) {
+      return res.json({ success: true, version: log.version, full: true, result: Object.values(log.snapshot) });
+    }
+    res.json({ success: true, version: log.version, full: false, deltas });
+  } catch (error) {
+    res.status(500).json({
+      success: false,
+      error: error.message
+    });
+  }
+});
+
 // 주식 목록 API (기존 data.json)
 app.get('/api/stocks', (req, res) => {
   try {
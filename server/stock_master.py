@@ -0,0 +1,135 @@
+import os
+import json
+import logging
+from datetime import datetime
+
+DEFAULT_PATH = os.getenv('STOCK_MASTER_PATH',
+                         os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stock_master.json'))
+
+# GetCodeListByMarket 시장 구분
+MARKETS = {
+    "0": "KOSPI",
+    "10": "KOSDAQ"
+}
+
+# GetMasterConstruction 결과 중 정상 거래 상태
+NORMAL_STATE = "정상"
+
+
+def split_codes(codes):
+    """GetCodeListByMarket 결과 ('005930;000660;' 문자열 또는 목록)를 코드 목록으로 변환"""
+    if isinstance(codes, str):
+        codes = codes.split(';')
+    return [code.strip() for code in codes or [] if code and code.strip()]
+
+
+class StockMaster:
+    """전 종목 코드/종목명/시장/상태 마스터 (하루 한 번 일괄 로드, 파일로 보존)
+
+    종목별 정보는 (종목명, 시장, 상태) 튜플로 코드 dict에 두어 조회는 dict 한 번으로 끝난다.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.loaded_date = None
+        self.entries = {}
+        self.read()
+
+    def read(self):
+        """저장된 마스터 읽기 (없거나 손상되면 빈 마스터)"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        self.loaded_date = data.get("date")
+        self.entries = {code: (name, market, state) for code, name, market, state in data.get("stocks", [])}
+
+    def write(self):
+        """임시 파일에 쓴 뒤 교체"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        data = {
+            "date": self.loaded_date,
+            "stocks": [[code, name, market, state] for code, (name, market, state) in self.entries.items()]
+        }
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.warning(f"종목 마스터 저장 실패: {e}")
+
+    def is_fresh(self, now=None):
+        """오늘 로드한 마스터인지"""
+        now = now or datetime.now()
+        return bool(self.entries) and self.loaded_date == now.strftime('%Y%m%d')
+
+    def refresh(self, kiwoom, markets=MARKETS, now=None):
+        """시장별 전 종목 일괄 로드 후 저장 (로드한 종목 수 반환)"""
+        now = now or datetime.now()
+        entries = {}
+
+        for market_code, market in markets.items():
+            for code in split_codes(kiwoom.GetCodeListByMarket(market_code)):
+                if code in entries:
+                    continue
+                name = kiwoom.GetMasterCodeName(code) or ""
+                state = kiwoom.GetMasterConstruction(code) or ""
+                entries[code] = (name.strip(), market, state.strip())
+
+        if not entries:
+            logging.warning("종목 마스터 로드 실패: 종목 목록 없음")
+            return 0
+
+        self.entries = entries
+        self.loaded_date = now.strftime('%Y%m%d')
+        self.write()
+        logging.info(f"종목 마스터 로드: {len(entries)}개 종목")
+        return len(entries)
+
+    def ensure(self, kiwoom, now=None):
+        """오늘 로드하지 않았으면 다시 로드"""
+        if not self.is_fresh(now):
+            self.refresh(kiwoom, now=now)
+
+    def get(self, code):
+        """(종목명, 시장, 상태) 또는 None"""
+        return self.entries.get(code)
+
+    def name(self, code, kiwoom=None):
+        """종목명 조회 (마스터에 없는 코드는 kiwoom이 있으면 한 번 조회해 추가)"""
+        entry = self.entries.get(code)
+        if entry is not None:
+            return entry[0]
+        if kiwoom is None:
+            return ""
+
+        name = (kiwoom.GetMasterCodeName(code) or "").strip()
+        self.entries[code] = (name, "", "")
+        return name
+
+    def stocks(self, codes, kiwoom=None):
+        """코드 목록을 조건검색 결과 형식 [{'code', 'name'}]으로 변환"""
+        return [{'code': code, 'name': self.name(code, kiwoom)} for code in codes]
+
+    def codes(self, market=None, normal_only=False):
+        """시장별 종목코드 목록 (normal_only: 정상 거래 종목만)"""
+        return [code for code, (name, stock_market, state) in self.entries.items()
+                if (market is None or stock_market == market)
+                and (not normal_only or state == NORMAL_STATE)]
+
+
+# 전역 마스터 (같은 프로세스의 모든 객체가 공유)
+stock_master = None
+
+
+def get_stock_master():
+    """종목 마스터 인스턴스 반환"""
+    global stock_master
+    if stock_master is None:
+        stock_master = StockMaster()
+    return stock_master
@@ -0,0 +1,201 @@
+import os
+import json
+import bisect
+import logging
+from collections import deque
+
+from condition_params import (TAIL_WINDOW, TAIL_RATIO, TAIL_MIN_DAYS, TAIL_MIN_BARS,
+                              BOTTOM_BAND, BOTTOM_MIN_COUNT, BOTTOM_MIN_BARS,
+                              TREND_SHORT, TREND_LONG, DECLINE_CUTOFF)
+
+DEFAULT_PATH = os.getenv('STREAM_STATE_PATH',
+                         os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stream_state.json'))
+
+
+def is_tail_upward(open_price, high, low, close, ratio=TAIL_RATIO):
+    """양봉이면서 아래꼬리가 봉 길이의 ratio 이상인지"""
+    total_length = high - low
+    return open_price < close and total_length != 0 and open_price - low >= total_length * ratio
+
+
+class StreamingScreen:
+    """종목 하나의 조건 1~3 상태를 봉이 들어올 때마다 갱신
+
+    최신 봉은 장중 체결로 계속 바뀌므로 따로 두고, 그 이전 확정 봉만 창 상태에 넣는다.
+    - 조건 1: 확정 봉 window-1개의 꼬리 우상향 여부와 개수를 누적 (봉당 O(1))
+    - 조건 2: 확정 봉 저가를 정렬 목록으로 유지해 최저가와 최저가 x band 이하 개수를
+      이진 탐색으로 계산 (창 크기 20 고정이라 봉당 상수 시간)
+    - 조건 3: 확정 월 종가 합계(최근 short-1 / long-1개월)와 단조 deque 최고가를 유지
+    판정은 확정 상태에 최신 봉만 더해 계산하므로 체결마다 호출해도 된다.
+    """
+
+    def __init__(self, window=TAIL_WINDOW, short=TREND_SHORT, long=TREND_LONG):
+        self.window = window
+        self.short = short
+        self.long = long
+
+        self.last = None            # 최신 봉 (date, open, high, low, close)
+        self.flags = deque()        # 확정 봉 꼬리 우상향 여부 (최근 window-1개)
+        self.tail_count = 0
+        self.lows = deque()         # 확정 봉 저가 (들어온 순서)
+        self.sorted_lows = []       # 확정 봉 저가 (정렬)
+
+        self.month = None           # 현재 월 (yyyymm)과 최신 종가
+        self.month_close = 0
+        self.months = deque()       # 확정 월 종가 (최근 long-1개월)
+        self.month_count = 0        # 확정 월 수 (전체)
+        self.long_sum = 0           # 확정 월 최근 long-1개월 종가 합
+        self.short_sum = 0          # 확정 월 최근 short-1개월 종가 합
+        self.month_max = deque()    # (월 순번, 종가) 종가 내림차순 단조 deque
+
+    @property
+    def last_date(self):
+        return self.last[0] if self.last else None
+
+    def update(self, bar):
+        """봉 반영 (같은 날짜면 최신 봉 교체, 새 날짜면 이전 봉 확정) - 지난 날짜는 무시"""
+        date = int(bar['date'])
+        if self.last is not None:
+            if date < self.last[0]:
+                return False
+            if date > self.last[0]:
+                self.commit(self.last)
+
+        month = date // 100
+        if self.month is not None and month != self.month:
+            self.commit_month(self.month_close)
+        self.month = month
+        self.month_close = bar['close']
+        self.last = (date, bar['open'], bar['high'], bar['low'], bar['close'])
+        return True
+
+    def commit(self, last):
+        """최신 봉을 확정 창에 넣고 창을 벗어난 봉 제거"""
+        date, open_price, high, low, close = last
+        flag = is_tail_upward(open_price, high, low, close)
+        self.flags.append(flag)
+        self.tail_count += flag
+        self.lows.append(low)
+        bisect.insort(self.sorted_lows, low)
+
+        if len(self.flags) > self.window - 1:
+            self.tail_count -= self.flags.popleft()
+            old = self.lows.popleft()
+            del self.sorted_lows[bisect.bisect_left(self.sorted_lows, old)]
+
+    def commit_month(self, close):
+        """지난 달 종가 확정 (합계와 최고가 deque 갱신)"""
+        self.months.append(close)
+        self.month_count += 1
+        self.long_sum += close
+        self.short_sum += close
+        if len(self.months) >= self.short:
+            self.short_sum -= self.months[-self.short]
+        if len(self.months) > self.long - 1:
+            self.long_sum -= self.months.popleft()
+
+        while self.month_max and self.month_max[-1][1] <= close:
+            self.month_max.pop()
+        self.month_max.append((self.month_count, close))
+        while self.month_max[0][0] <= self.month_count - (self.long - 1):
+            self.month_max.popleft()
+
+    def condition_1(self, min_days=TAIL_MIN_DAYS, min_bars=TAIL_MIN_BARS):
+        """조건 1: 꼬리 우상향 (최근 window일 중 min_days일 이상)"""
+        if self.last is None or len(self.flags) + 1 < min_bars:
+            return False
+        return self.tail_count + is_tail_upward(*self.last[1:]) >= min_days
+
+    def condition_2(self, band=BOTTOM_BAND, min_count=BOTTOM_MIN_COUNT, min_bars=BOTTOM_MIN_BARS):
+        """조건 2: 바닥 2회 (최근 window일 최저가 x band 이하 저가가 min_count회 이상)"""
+        if self.last is None or len(self.lows) + 1 < min_bars:
+            return False
+        low = self.last[3]
+        threshold = min(self.sorted_lows[0], low) * band if self.sorted_lows else low * band
+        count = bisect.bisect_right(self.sorted_lows, threshold) + (low <= threshold)
+        return count >= min_count
+
+    def condition_3(self, cutoff=DECLINE_CUTOFF):
+        """조건 3: 하락장 여부 (월봉 short개월 평균 < long개월 평균, 고점 대비 cutoff 이상 하락은 False)"""
+        if self.month is None or self.month_count + 1 < self.long:
+            return False
+        current = self.month_close
+        max_price = max(self.month_max[0][1], current) if self.month_max else current
+        decline_rate = (max_price - current) / max_price if max_price > 0 else 0.0
+        if cutoff is not None and decline_rate >= cutoff:
+            return False
+        # 평균 비교는 합계를 교차 곱해 정수로 비교
+        return (self.short_sum + current) * self.long < (self.long_sum + current) * self.short
+
+    def to_dict(self):
+        """JSON으로 저장할 상태 (정렬 목록/단조 deque는 복원할 때 다시 만듦)"""
+        return {
+            "window": self.window,
+            "short": self.short,
+            "long": self.long,
+            "last": list(self.last) if self.last else None,
+            "flags": [int(flag) for flag in self.flags],
+            "lows": list(self.lows),
+            "month": self.month,
+            "month_close": self.month_close,
+            "months": list(self.months),
+            "month_count": self.month_count
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        screen = cls(data["window"], data["short"], data["long"])
+        screen.last = tuple(data["last"]) if data["last"] else None
+        screen.flags = deque(bool(flag) for flag in data["flags"])
+        screen.tail_count = sum(screen.flags)
+        screen.lows = deque(data["lows"])
+        screen.sorted_lows = sorted(screen.lows)
+
+        screen.month = data["month"]
+        screen.month_close = data["month_close"]
+        # 확정 월은 앞쪽 월 수를 맞춘 뒤 다시 넣어 합계/최고가 deque 복원
+        months = data["months"]
+        screen.month_count = data["month_count"] - len(months)
+        for close in months:
+            screen.commit_month(close)
+        return screen
+
+    @classmethod
+    def from_series(cls, series, **kwargs):
+        """저장된 일봉 전체를 한 번 흘려 넣어 상태 생성"""
+        screen = cls(**kwargs)
+        for bar in series:
+            screen.update(bar)
+        return screen
+
+
+class StreamStateStore:
+    """종목별 StreamingScreen 상태 파일 (재시작 후 이력 재계산 없이 이어서 갱신)"""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+
+    def read(self):
+        """저장된 상태 {종목코드: StreamingScreen} (없거나 손상되면 빈 dict)"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return {code: StreamingScreen.from_dict(state) for code, state in data.items()}
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            if not isinstance(e, FileNotFoundError):
+                logging.warning(f"실시간 판정 상태 읽기 실패: {e}")
+            return {}
+
+    def write(self, screens):
+        """임시 파일에 쓴 뒤 교체"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        data = {code: screen.to_dict() for code, screen in screens.items()}
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.warning(f"실시간 판정 상태 저장 실패: {e}")
@@ -0,0 +1,222 @@
+import sys
+import json
+import time
+import argparse
+import itertools
+
+import numpy as np
+
+from bar_store import BarStore
+from condition_engine import (PricePanel, rolling_sum, rolling_trend, rolling_smallest,
+                              TAIL_MIN_BARS, BOTTOM_MIN_BARS)
+from backtest import DEFAULT_PARAMS, HORIZONS, forward_returns, in_period
+
+# 기본 탐색 격자 (window는 tail_window와 bottom_window를 함께 바꿈, bottom_band는 최저가 대비 배수)
+DEFAULT_GRID = {
+    "window": [15, 20, 30],
+    "tail_ratio": [0.2, 0.3, 0.4],
+    "tail_min_days": [2, 3, 4],
+    "bottom_band": [1.01, 1.02, 1.03],
+    "decline_cutoff": [0.4, 0.5, None]
+}
+
+# 격자 최대 점 수 (요청 한 번의 실행 시간 제한)
+MAX_GRID_POINTS = 5000
+
+# 그룹 번호에 조건 결과를 한 비트씩 붙이다가 이 수만큼 붙이면 번호를 다시 압축 (int64 범위 유지)
+GROUP_BITS = 40
+
+
+def check_params(params):
+    """격자 점 하나의 파라미터 검사 (창/개수는 1 이상의 정수, 최소 개수는 창 길이 이하)"""
+    for name in ("tail_window", "tail_min_days", "bottom_window", "bottom_min_count", "trend_short", "trend_long"):
+        value = params[name]
+        if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+            raise ValueError(f"{name}는 1 이상의 정수여야 합니다: {value!r}")
+    if params["tail_min_days"] > params["tail_window"]:
+        raise ValueError(f"tail_min_days({params['tail_min_days']})는 "
+                         f"tail_window({params['tail_window']}) 이하여야 합니다")
+    if params["bottom_min_count"] > params["bottom_window"]:
+        raise ValueError(f"bottom_min_count({params['bottom_min_count']})는 "
+                         f"bottom_window({params['bottom_window']}) 이하여야 합니다")
+    if params["trend_short"] >= params["trend_long"]:
+        raise ValueError(f"trend_short({params['trend_short']})는 trend_long({params['trend_long']})보다 작아야 합니다")
+    if params["bottom_band"] < 1:
+        raise ValueError(f"bottom_band는 최저가 대비 배수(1.02 = +2%)로 1 이상이어야 합니다: {params['bottom_band']}")
+
+
+def expand_grid(grid):
+    """격자 dict를 파라미터 조합 목록으로 (기본값 위에 덮어씀, 잘못된 값은 ValueError)"""
+    names = list(grid)
+    for name in names:
+        if name != "window" and name not in DEFAULT_PARAMS:
+            raise ValueError(f"알 수 없는 파라미터: {name}")
+        if not isinstance(grid[name], (list, tuple)) or not grid[name]:
+            raise ValueError(f"{name}: 값 목록이 필요합니다")
+
+    points = []
+    for values in itertools.product(*(grid[name] for name in names)):
+        params = dict(DEFAULT_PARAMS)
+        for name, value in zip(names, values):
+            if name == "window":
+                params["tail_window"] = params["bottom_window"] = value
+            else:
+                params[name] = value
+        check_params(params)
+        points.append(params)
+    if len(points) > MAX_GRID_POINTS:
+        raise ValueError(f"격자 점이 너무 많습니다 ({len(points)} > {MAX_GRID_POINTS})")
+    return points
+
+
+class SweepCache:
+    """격자 점 사이에서 공유하는 중간 배열
+
+    - 양봉/봉 길이/아래꼬리 길이: 한 번
+    - 꼬리 우상향 누적 개수: tail_ratio마다 한 번 (창 길이별 개수는 누적합 차이)
+    - 창 안의 작은 저가 k개: 창 길이마다 한 번 (band와 최소 횟수는 비교만)
+    - 월봉 평균 비교/하락률: (short, long)마다 한 번 (cutoff는 비교만)
+    - 조건별 판정 결과: 그 조건에 쓰이는 파라미터 조합마다 한 번
+    """
+
+    def __init__(self, panel):
+        self.panel = panel
+        self.memo = {}
+        valid = panel.valid
+        self.total = panel["high"] - panel["low"]
+        self.tail = panel["open"] - panel["low"]
+        self.candle = valid & (panel["open"] < panel["close"]) & (self.total != 0)
+
+    def get(self, key, compute):
+        if key not in self.memo:
+            self.memo[key] = compute()
+        return self.memo[key]
+
+    def bars(self, window):
+        return self.get(("bars", window), lambda: rolling_sum(self.panel.valid, window))
+
+    def tail_count(self, window, ratio):
+        # 판정식은 check_condition_1과 같은 곱셈 비교 (나눗셈 비율 비교는 경계에서 달라질 수 있음)
+        flags = self.get(("tail_flags", ratio), lambda: self.candle & (self.tail >= self.total * ratio))
+        return self.get(("tail_count", window, ratio), lambda: rolling_sum(flags, window))
+
+    def enough(self, window, min_bars):
+        return self.get(("enough", window, min_bars),
+                        lambda: self.panel.valid & (self.bars(window) >= min_bars))
+
+    def tail_upward(self, params):
+        window, ratio, min_days = params["tail_window"], params["tail_ratio"], params["tail_min_days"]
+
+        def compute():
+            count = self.tail_count(window, ratio)
+            return self.enough(window, TAIL_MIN_BARS) & (count >= min_days)
+
+        return self.get(("tail_upward", window, ratio, min_days), compute)
+
+    def bottom_twice(self, params, max_count):
+        window, band, count = params["bottom_window"], params["bottom_band"], params["bottom_min_count"]
+
+        def compute():
+            smallest = self.get(("smallest", window),
+                                lambda: rolling_smallest(self.panel, "low", window, max_count))
+            if count > len(smallest):
+                return np.zeros_like(self.panel.valid)
+            enough = self.enough(window, BOTTOM_MIN_BARS)
+            return enough & (smallest[count - 1] <= smallest[0] * band) if count > 0 else enough
+
+        return self.get(("bottom_twice", window, band, count), compute)
+
+    def not_downtrend(self, params):
+        short, long, cutoff = params["trend_short"], params["trend_long"], params["decline_cutoff"]
+
+        def compute():
+            result, decline = self.get(("trend", short, long), lambda: rolling_trend(self.panel, short, long))
+            return ~(result if cutoff is None else result & ~(decline >= cutoff))
+
+        return self.get(("not_downtrend", short, long, cutoff), compute)
+
+
+def run_sweep(store=None, codes=None, grid=None, start=None, end=None, horizons=HORIZONS):
+    """저장된 일봉으로 파라미터 격자 전체를 한 번에 평가 (점마다 신호 수, 보유 기간별 수익률)"""
+    started = time.perf_counter()
+    store = store or BarStore()
+    codes = store.codes("daily") if codes is None else codes
+    points = expand_grid(grid or DEFAULT_GRID)
+    panel = PricePanel.from_store(store, codes, "daily")
+    loaded = time.perf_counter()
+
+    cache = SweepCache(panel)
+    period = in_period(panel, start, end)
+    max_count = max(params["bottom_min_count"] for params in points)
+
+    # 점마다 쓰는 조건 판정 배열 (같은 파라미터 조합은 하나로)
+    options = {}
+    selections = []
+    for params in points:
+        selection = []
+        for key, mask in (("tail_upward", cache.tail_upward(params)),
+                          ("bottom_twice", cache.bottom_twice(params, max_count)),
+                          ("not_downtrend", cache.not_downtrend(params))):
+            selection.append(options.setdefault(id(mask), (len(options), mask))[0])
+        selections.append(selection)
+
+    # 평가 구간 칸을 조건 판정 결과 조합별 그룹으로 묶고, 그룹별 수익 통계를 한 번만 집계
+    cells = np.flatnonzero(period)
+    group = np.zeros(len(cells), dtype=np.int64)
+    for step, (_, mask) in enumerate(options.values(), 1):
+        group = group * 2 + mask.ravel()[cells]
+        if step % GROUP_BITS == 0:
+            group = np.unique(group, return_inverse=True)[1].astype(np.int64)
+    groups, first, inverse = np.unique(group, return_index=True, return_inverse=True)
+    bits = np.array([mask.ravel()[cells[first]] for _, mask in options.values()]).reshape(len(options), -1)
+    sizes = np.bincount(inverse, minlength=len(groups))
+
+    stats = {}
+    for horizon in horizons:
+        returns = forward_returns(panel, horizon).ravel()[cells]
+        known = ~np.isnan(returns)
+        stats[horizon] = (np.bincount(inverse, weights=known, minlength=len(groups)),
+                          np.bincount(inverse, weights=np.where(known, returns, 0.0), minlength=len(groups)),
+                          np.bincount(inverse, weights=known & (returns > 0), minlength=len(groups)))
+
+    results = []
+    for params, selection in zip(points, selections):
+        matched = np.logical_and.reduce(bits[selection]) if len(groups) else np.zeros(0, dtype=bool)
+        point = {"params": params, "hits": int(sizes[matched].sum()), "returns": {}}
+        for horizon, (counts, sums, wins) in stats.items():
+            count = int(round(counts[matched].sum()))
+            point["returns"][str(horizon)] = {
+                "count": count,
+                "mean": round(float(sums[matched].sum() / count), 5) if count else None,
+                "win_rate": round(float(wins[matched].sum()) / count, 4) if count else None
+            }
+        results.append(point)
+    finished = time.perf_counter()
+
+    return {
+        "success": True,
+        "universe": len(codes),
+        "bars": int(panel.valid.sum()),
+        "evaluated": int(period.sum()),
+        "points": len(points),
+        "start": start,
+        "end": end,
+        "load_ms": round((loaded - started) * 1000, 1),
+        "evaluate_ms": round((finished - loaded) * 1000, 1),
+        "result": results
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="조건 1~3 파라미터 격자 탐색")
+    parser.add_argument("--grid", default=None, help='격자 JSON (예: {"tail_ratio": [0.2, 0.3]})')
+    parser.add_argument("--start", default=None, help="평가 시작일 (YYYYMMDD)")
+    parser.add_argument("--end", default=None, help="평가 종료일 (YYYYMMDD)")
+    parser.add_argument("--horizons", default=",".join(str(horizon) for horizon in HORIZONS),
+                        help="보유 기간 (거래일, 쉼표 구분)")
+    args = parser.parse_args()
+
+    result = run_sweep(grid=json.loads(args.grid) if args.grid else None, start=args.start, end=args.end,
+                       horizons=[int(horizon) for horizon in args.horizons.split(",")])
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    sys.exit(0)
@@ -0,0 +1,27 @@
+import os
+import sys
+import logging
+import tempfile
+
+# 서버 모듈은 server/ 에서 바로 import하는 구조
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+# 상태 파일(봉 저장소, 통계, 캐시 등)은 저장소 대신 임시 디렉터리에 (모듈 import 전에 설정)
+STATE_DIR = tempfile.mkdtemp(prefix="kiwoom_test_")
+for name, filename in [
+    ("BAR_STORE_DIR", "bar_store"),
+    ("STOCK_MASTER_PATH", "stock_master.json"),
+    ("UNIVERSE_PATH", "universe.json"),
+    ("CONDITION_CACHE_PATH", "condition_cache.json"),
+    ("PREDICATE_STATS_PATH", "predicate_stats.json"),
+    ("SCAN_HISTORY_PATH", "scan_history.json"),
+    ("RESULT_CACHE_PATH", "result_cache.json"),
+    ("RESULT_DELTA_PATH", "data_delta.json"),
+    ("STREAM_STATE_PATH", "stream_state.json"),
+]:
+    os.environ.setdefault(name, os.path.join(STATE_DIR, filename))
+
+# 조건검색 필터가 작업 디렉터리에 로그 파일을 만들지 않도록 먼저 로깅 설정
+logging.basicConfig(level=logging.WARNING)
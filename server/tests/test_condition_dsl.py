@@ -0,0 +1,36 @@
+import pytest
+
+from condition_dsl import ScreenError, compile_screen
+
+
+@pytest.mark.parametrize("screen", [
+    "tail_upward(window=0)",
+    "tail_upward(window=2)",            # min_days(3) > window
+    "bottom_twice(window=0)",
+    "bottom_twice(window=1)",           # min_count(2) > window
+    "downtrend(0, 6)",
+    "downtrend(3, 0)",
+    "!downtrend(3,0)",
+    "downtrend(6, 6)",
+    "downtrend(6, 3)",
+])
+def test_rejects_degenerate_windows(screen):
+    with pytest.raises(ScreenError):
+        compile_screen(screen)
+
+
+@pytest.mark.parametrize("screen", [
+    "condition_filter",
+    "advanced_filter",
+    "tail_upward(window=5, min_days=5)",
+    "downtrend(1, 2, cutoff=none)",
+])
+def test_accepts_valid_screens(screen):
+    assert compile_screen(screen).calls
+
+
+def test_band_is_a_multiplier():
+    default = compile_screen("bottom_twice").calls[0][1]
+    assert compile_screen("bottom_twice(band=1.02)").calls[0][1] == default
+    with pytest.raises(ScreenError):
+        compile_screen("bottom_twice(band=0.02)")
@@ -0,0 +1,132 @@
+import random
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from backtest import rolling_conditions
+from bar_series import BarSeries
+from bar_store import BarStore
+from condition_engine import PricePanel, evaluate_universe, scan_store
+from kiwoom_backend import SimulatedBackend
+from kiwoom_condition_filter import KiwoomConditionFilter
+from streaming_condition import StreamingScreen
+
+# 창보다 짧은 이력, 창 경계 길이, 여러 달에 걸친 이력을 모두 포함
+LENGTHS = [1, 2, 3, 5, 19, 20, 21, 45, 130, 260]
+
+
+def trading_days(count, start=date(2023, 1, 2)):
+    days = []
+    day = start
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(int(day.strftime("%Y%m%d")))
+        day += timedelta(days=1)
+    return days
+
+
+def random_bars(rng, count, crash=False):
+    """가격을 10원 단위로 맞춰 같은 저가/보합/봉 길이 0인 봉이 자주 나오는 일봉"""
+    bars = []
+    price = rng.randrange(1000, 50000, 10)
+    for i, day in enumerate(trading_days(count)):
+        if crash and i > count // 2:
+            price = max(price * 9 // 10 // 10 * 10, 10)
+        else:
+            price = max(price + rng.randrange(-60, 61, 10) * (price // 1000 or 1), 10)
+        open_price = max(price + rng.randrange(-30, 31, 10), 10)
+        close = price if rng.random() > 0.1 else open_price
+        low = min(open_price, close) - rng.choice([0, 0, 10, 30, 60])
+        high = max(open_price, close) + rng.choice([0, 10, 20])
+        bars.append({"date": str(day), "open": open_price, "high": high, "low": max(low, 1),
+                     "close": close, "volume": rng.randrange(1000, 100000)})
+    return bars
+
+
+@pytest.fixture(scope="module")
+def kiwoom_filter():
+    return KiwoomConditionFilter(SimulatedBackend())
+
+
+@pytest.fixture(scope="module")
+def series_by_code():
+    rng = random.Random(7)
+    series = {}
+    for variant in range(6):
+        for length in LENGTHS:
+            code = f"{len(series):06d}"
+            series[code] = BarSeries.from_bars(random_bars(rng, length, crash=variant == 0))
+    return series
+
+
+def expected_checks(kiwoom_filter, series):
+    return (kiwoom_filter.check_condition_1(series),
+            kiwoom_filter.check_condition_2(series),
+            kiwoom_filter.check_condition_3(series.monthly()))
+
+
+def test_engine_matches_check_conditions(kiwoom_filter, series_by_code):
+    daily = PricePanel.from_bars(series_by_code, 20)
+    monthly = PricePanel.from_bars({code: series.monthly() for code, series in series_by_code.items()}, 6)
+    result = evaluate_universe(daily, monthly)
+
+    outcomes = set()
+    for row, code in enumerate(result["code"]):
+        c1, c2, c3 = expected_checks(kiwoom_filter, series_by_code[code])
+        assert (result["tail_upward"][row], result["bottom_twice"][row], result["downtrend"][row]) == \
+            (c1, c2, c3), code
+        assert result["passed"][row] == (c1 and c2 and not c3), code
+        outcomes.add((c1, c2, c3))
+    # 각 조건이 참/거짓 모두 나오는 데이터여야 비교에 의미가 있음
+    for index in range(3):
+        assert {outcome[index] for outcome in outcomes} == {True, False}
+
+
+def test_backtest_matches_check_conditions_on_every_date(kiwoom_filter, series_by_code):
+    panel = PricePanel.from_bars(series_by_code)
+    conditions = rolling_conditions(panel)
+    width = panel.valid.shape[1]
+
+    for row, code in enumerate(panel.codes):
+        bars = list(series_by_code[code])
+        start = width - len(bars)
+        for end in range(1, len(bars) + 1):
+            column = start + end - 1
+            assert (conditions["tail_upward"][row, column], conditions["bottom_twice"][row, column],
+                    conditions["downtrend"][row, column]) == \
+                expected_checks(kiwoom_filter, BarSeries.from_bars(bars[:end])), (code, bars[end - 1]["date"])
+
+
+def test_streaming_matches_check_conditions_after_every_bar(kiwoom_filter, series_by_code):
+    for code, series in series_by_code.items():
+        screen = StreamingScreen()
+        bars = list(series)
+        for end, bar in enumerate(bars, 1):
+            screen.update(bar)
+            prefix = BarSeries.from_bars(bars[:end])
+            assert (screen.condition_1(), screen.condition_2(), screen.condition_3()) == \
+                expected_checks(kiwoom_filter, prefix), (code, bar["date"])
+
+        # 저장 후 복원한 상태도 같은 판정
+        restored = StreamingScreen.from_dict(screen.to_dict())
+        assert (restored.condition_1(), restored.condition_2(), restored.condition_3()) == \
+            expected_checks(kiwoom_filter, series), code
+
+
+def test_store_scan_matches_condition_search(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    codes = [f"{900000 + i:06d}" for i in range(40)]
+    store = BarStore(str(tmp_path / "bar_store"))
+
+    kiwoom_filter = KiwoomConditionFilter(SimulatedBackend())
+    kiwoom_filter.store = store
+    kiwoom_filter.persist_state = False
+    kiwoom_filter.login()
+    matched = kiwoom_filter.run_condition_search(0, universe={"codes": codes})
+
+    # 조건검색이 저장한 일봉만으로 다시 판정해도 같은 종목이 통과
+    result = scan_store(store, codes)
+    passed = [code for code, ok in zip(result["code"], result["passed"]) if ok]
+    assert matched and np.any(~result["passed"])
+    assert passed == [stock["code"] for stock in matched]
@@ -0,0 +1,54 @@
+import pytest
+
+from bar_store import BarStore
+from kiwoom_backend import Cassette, RecordingBackend, ReplayBackend, SimulatedBackend
+from kiwoom_condition_filter import KiwoomConditionFilter
+
+CODES = [f"{900000 + i:06d}" for i in range(12)]
+
+
+@pytest.fixture(autouse=True)
+def in_tmp_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+
+def search(backend, store_dir):
+    """빈 봉 저장소에서 조건검색 실행 (모든 종목을 TR로 조회)"""
+    kiwoom_filter = KiwoomConditionFilter(backend)
+    kiwoom_filter.store = BarStore(str(store_dir))
+    kiwoom_filter.persist_state = False
+    kiwoom_filter.login()
+    return kiwoom_filter.run_condition_search(2, universe={"codes": CODES})
+
+
+def test_replay_reproduces_recorded_search(tmp_path):
+    path = str(tmp_path / "session.jsonl.gz")
+    backend = RecordingBackend(SimulatedBackend(), path)
+    recorded = search(backend, tmp_path / "recorded")
+    backend.kiwoom.CommConnect(block=True)
+    backend.close()
+
+    entries = Cassette.load(path)
+    assert {entry["code"] for entry in entries if entry["type"] == "tr"} == set(CODES)
+
+    replay = ReplayBackend(path)
+    replayed = search(replay, tmp_path / "replayed")
+
+    assert recorded
+    assert [(stock["code"], stock["price"]) for stock in replayed] == \
+        [(stock["code"], stock["price"]) for stock in recorded]
+    # 키워드 인자로 녹화된 호출도 같은 인자로 재생
+    assert replay.kiwoom.CommConnect(block=True) == 0
+
+
+def test_unrecorded_request_fails_instead_of_inventing_data(tmp_path):
+    path = str(tmp_path / "login.jsonl.gz")
+    backend = RecordingBackend(SimulatedBackend(), path)
+    backend.kiwoom.GetConnectState()
+    backend.close()
+
+    replay = ReplayBackend(path)
+    replay.kiwoom.SetInputValue("종목코드", CODES[0])
+    assert replay.kiwoom.CommRqData("rq", "opt10081", 0, "0101") == -1
+    assert replay.kiwoom.GetConnectState() == 1
+    assert replay.kiwoom.GetLoginInfo("ACCNO") is None
@@ -0,0 +1,96 @@
+import os
+import time
+
+import pytest
+
+import scan_pool
+from scan_pool import run_pool, scan_worker
+
+CODES = [f"{900000 + i:06d}" for i in range(24)]
+
+
+def single_process_result(codes):
+    from kiwoom_backend import SimulatedBackend
+    from kiwoom_condition_filter import KiwoomConditionFilter
+
+    kiwoom_filter = KiwoomConditionFilter(SimulatedBackend())
+    kiwoom_filter.persist_state = False
+    kiwoom_filter.login()
+    return kiwoom_filter.run_condition_search(0, universe={"codes": codes})
+
+
+def slow_first_worker(worker_id, *args):
+    """워커 0만 묶음마다 느리게 처리 (다른 워커가 워커 0의 묶음을 가져가야 함)"""
+    if worker_id == 0:
+        from kiwoom_condition_filter import KiwoomConditionFilter
+
+        search = KiwoomConditionFilter.run_condition_search
+
+        def slow_search(self, *search_args, **kwargs):
+            time.sleep(0.5)
+            return search(self, *search_args, **kwargs)
+        KiwoomConditionFilter.run_condition_search = slow_search
+    scan_worker(worker_id, *args)
+
+
+def dying_first_worker(worker_id, *args):
+    """워커 0은 첫 묶음을 처리하다가 종료"""
+    if worker_id == 0:
+        from kiwoom_condition_filter import KiwoomConditionFilter
+
+        def die(self, *search_args, **kwargs):
+            os._exit(3)
+        KiwoomConditionFilter.run_condition_search = die
+    scan_worker(worker_id, *args)
+
+
+def dying_worker(worker_id, *args):
+    """모든 워커가 첫 묶음을 처리하다가 종료"""
+    from kiwoom_condition_filter import KiwoomConditionFilter
+
+    def die(self, *search_args, **kwargs):
+        os._exit(3)
+    KiwoomConditionFilter.run_condition_search = die
+    scan_worker(worker_id, *args)
+
+
+@pytest.fixture(autouse=True)
+def in_tmp_dir(tmp_path, monkeypatch):
+    # 워커 프로세스의 로그 파일이 저장소에 생기지 않도록 임시 디렉터리에서 실행
+    monkeypatch.chdir(tmp_path)
+
+
+def test_pool_matches_single_process_in_original_order():
+    expected = single_process_result(CODES)
+    result = run_pool(CODES, workers=3, backend_kind="simulated", chunk_size=2)
+
+    assert result["success"]
+    assert result["unprocessed"] == []
+    assert [stock["code"] for stock in result["result"]] == [stock["code"] for stock in expected]
+    assert sum(stats["processed"] for stats in result["workers"].values()) == len(CODES)
+
+
+def test_idle_workers_steal_chunks():
+    result = run_pool(CODES, workers=2, backend_kind="simulated", chunk_size=2, worker=slow_first_worker)
+
+    assert result["success"]
+    assert result["workers"][1]["stolen_chunks"] > 0
+    assert result["workers"][1]["processed"] > result["workers"][0]["processed"]
+
+
+def test_chunk_of_dead_worker_is_requeued():
+    expected = single_process_result(CODES)
+    result = run_pool(CODES, workers=2, backend_kind="simulated", chunk_size=4, worker=dying_first_worker)
+
+    assert result["success"]
+    assert any("비정상 종료" in error for error in result["errors"])
+    assert [stock["code"] for stock in result["result"]] == [stock["code"] for stock in expected]
+    assert result["workers"][1]["processed"] == len(CODES)
+
+
+def test_unprocessed_chunks_fail_the_run(monkeypatch):
+    monkeypatch.setattr(scan_pool, "LOST_CHUNK_SECONDS", 1)
+    result = run_pool(CODES, workers=2, backend_kind="simulated", chunk_size=4, worker=dying_worker)
+
+    assert not result["success"]
+    assert sorted(result["unprocessed"]) == CODES
@@ -0,0 +1,25 @@
+import pytest
+
+from sweep import DEFAULT_GRID, expand_grid
+
+
+def test_default_grid_expands():
+    assert len(expand_grid(DEFAULT_GRID)) == 3 ** len(DEFAULT_GRID)
+
+
+@pytest.mark.parametrize("grid", [
+    {"window": [0]},
+    {"window": [-5]},
+    {"window": [2]},                    # tail_min_days(3) > window
+    {"tail_min_days": [0]},
+    {"bottom_min_count": [0]},
+    {"bottom_window": [1]},             # bottom_min_count(2) > window
+    {"trend_short": [0]},
+    {"trend_long": [3]},                # short(3) >= long
+    {"bottom_band": [0.02]},            # band는 배수
+    {"window": 20},
+    {"unknown": [1]},
+])
+def test_rejects_invalid_grid(grid):
+    with pytest.raises(ValueError):
+        expand_grid(grid)
@@ -0,0 +1,65 @@
+from array import array
+
+# opt10081(일봉)/opt10082(월봉) 멀티데이터의 GetCommDataEx 컬럼 순서
+# 종목코드, 현재가, 거래량, 거래대금, 일자, 시가, 고가, 저가, 수정주가구분, 수정비율, ...
+CHART_COLUMNS = {
+    "close": 1,
+    "volume": 2,
+    "date": 4,
+    "open": 5,
+    "high": 6,
+    "low": 7
+}
+
+PRICE_FIELDS = ("open", "high", "low", "close", "volume")
+
+
+def get_comm_data_ex(kiwoom, trcode, record_name):
+    """GetCommDataEx 한 번으로 반복 레코드 전체 조회 (행 x 컬럼 문자열 목록)"""
+    if hasattr(kiwoom, "GetCommDataEx"):
+        return kiwoom.GetCommDataEx(trcode, record_name) or []
+    return kiwoom.ocx.dynamicCall("GetCommDataEx(QString, QString)", trcode, record_name) or []
+
+
+def to_int(value):
+    """키움 부호 포함 숫자 문자열 변환 ('-12,345' -> 12345, 빈 값 -> 0)"""
+    value = value.strip()
+    if not value:
+        return 0
+    try:
+        return abs(int(value))
+    except ValueError:
+        return abs(int(float(value.replace(',', ''))))
+
+
+def parse_chart_rows(rows, date_length=8):
+    """차트 TR 행 목록을 컬럼 배열로 변환 (날짜 오름차순)
+
+    키움은 최신 데이터부터 내려주므로 변환 후 한 번 뒤집는다.
+    가격은 등락 부호가 붙어 오므로 절대값으로 저장한다.
+    """
+    date_index = CHART_COLUMNS["date"]
+    indexes = [(field, CHART_COLUMNS[field]) for field in PRICE_FIELDS]
+
+    columns = {"date": []}
+    for field in PRICE_FIELDS:
+        columns[field] = array('q')
+
+    dates = columns["date"]
+    appends = [(columns[field].append, index) for field, index in indexes]
+
+    for row in rows:
+        dates.append(row[date_index].strip()[:date_length])
+        for append, index in appends:
+            append(to_int(row[index]))
+
+    for values in columns.values():
+        values.reverse()
+
+    return columns
+
+
+def columns_to_bars(columns, fields=PRICE_FIELDS):
+    """컬럼 배열을 봉 dict 목록으로 변환 (저장소/조건 판정용)"""
+    names = ("date",) + tuple(fields)
+    return [dict(zip(names, values)) for values in zip(*(columns[name] for name in names))]
@@ -0,0 +1,124 @@
+import itertools
+import logging
+
+# 키움 OpenAPI 화면번호는 최대 200개까지 사용 가능
+SCREEN_BASE = 5000
+SCREEN_COUNT = 100
+
+
+class TRRequest:
+    """진행 중인 TR 요청 1건 (응답 수신 시 결과가 채워지는 future)
+
+    연속조회(prev_next == "2")는 같은 rqname/화면번호로 이어서 요청하며,
+    until_date 이전 날짜에 닿거나 max_rows개 이상 받으면 중단한다.
+    """
+
+    def __init__(self, rqname, screen_no, trcode, code, until_date=None, max_rows=None):
+        self.rqname = rqname
+        self.screen_no = screen_no
+        self.trcode = trcode
+        self.code = code
+        self.until_date = until_date
+        self.max_rows = max_rows
+        self.rows = []
+        self.pages = 0
+        self.prev_next = "0"
+        self.parse_time = 0.0
+        self.done = False
+        self.result = None
+        self.error = None
+        self.callbacks = []
+
+    def add_page(self, rows, prev_next):
+        """수신한 페이지 누적 후 다음 페이지가 필요한지 반환"""
+        self.rows.extend(rows)
+        self.pages += 1
+        self.prev_next = str(prev_next).strip()
+
+        if self.prev_next != "2" or not rows:
+            return False
+        if self.max_rows is not None and len(self.rows) >= self.max_rows:
+            return False
+        if self.until_date is not None and min(row['date'] for row in rows) <= self.until_date:
+            return False
+        return True
+
+    def set_result(self, result):
+        """응답 결과 설정"""
+        self.result = result
+        self.done = True
+        self.run_callbacks()
+
+    def set_error(self, error):
+        """요청 실패 처리"""
+        self.error = error
+        self.done = True
+        self.run_callbacks()
+
+    def add_done_callback(self, callback):
+        """완료 시 호출할 콜백 등록"""
+        if self.done:
+            callback(self)
+        else:
+            self.callbacks.append(callback)
+
+    def run_callbacks(self):
+        for callback in self.callbacks:
+            try:
+                callback(self)
+            except Exception as e:
+                logging.error(f"TR 콜백 오류 ({self.rqname}): {e}")
+        self.callbacks = []
+
+    def __repr__(self):
+        return f"TRRequest({self.rqname}, screen={self.screen_no}, pages={self.pages}, done={self.done})"
+
+
+class TRRequestRegistry:
+    """rqname/화면번호로 TR 응답을 요청에 연결하는 레지스트리"""
+
+    def __init__(self, screen_base=SCREEN_BASE, screen_count=SCREEN_COUNT):
+        self.sequence = itertools.count(1)
+        self.free_screens = [str(screen_base + i).zfill(4) for i in range(screen_count)]
+        self.pending = {}
+
+    def register(self, trcode, code, until_date=None, max_rows=None):
+        """새 요청 등록 (고유 rqname과 사용 중이 아닌 화면번호 할당)"""
+        if not self.free_screens:
+            raise RuntimeError("사용 가능한 화면번호가 없습니다")
+        screen_no = self.free_screens.pop(0)
+        rqname = f"{trcode}_{code}_{next(self.sequence)}"
+        request = TRRequest(rqname, screen_no, trcode, code, until_date, max_rows)
+        self.pending[rqname] = request
+        return request
+
+    def get(self, rqname):
+        """진행 중인 요청 조회"""
+        return self.pending.get(rqname)
+
+    def release(self, rqname):
+        """요청을 목록에서 제거하고 화면번호 반환"""
+        request = self.pending.pop(rqname, None)
+        if request is not None:
+            self.free_screens.append(request.screen_no)
+        return request
+
+    def resolve(self, rqname, result):
+        """응답 결과를 해당 요청에 전달"""
+        request = self.release(rqname)
+        if request is None:
+            logging.warning(f"알 수 없는 TR 응답: {rqname}")
+            return None
+        request.set_result(result)
+        return request
+
+    def fail(self, rqname, error):
+        """요청 실패를 해당 요청에 전달"""
+        request = self.release(rqname)
+        if request is not None:
+            request.set_error(error)
+        return request
+
+    def in_flight(self):
+        """응답 대기 중인 요청 수"""
+        return len(self.pending)
@@ -0,0 +1,166 @@
+import time
+import logging
+import threading
+from collections import deque
+
+# 키움 OpenAPI TR 조회 제한 (1초 5회, 1시간 1000회)
+MAX_REQUESTS_PER_SECOND = 5
+MAX_REQUESTS_PER_HOUR = 1000
+
+# 최근 달성 속도를 계산하는 구간 (초, 이보다 오래된 요청 시각은 버림)
+RATE_WINDOW = 10.0
+
+# 조회 과부하/조회 제한 에러코드 (OP_ERR_SISE_OVERFLOW, 시세조회제한)
+THROTTLE_ERROR_CODES = (-200, -209)
+
+
+class TokenBucket:
+    """토큰 버킷 (capacity개까지 적립, 초당 refill_rate개 충전)"""
+
+    def __init__(self, capacity, refill_rate, clock=time.monotonic):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.clock = clock
+        self.tokens = float(capacity)
+        self.last_refill = clock()
+
+    def refill(self):
+        """경과 시간만큼 토큰 충전"""
+        now = self.clock()
+        elapsed = now - self.last_refill
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate)
+        self.last_refill = now
+
+    def wait_time(self):
+        """토큰 1개를 얻기까지 남은 시간(초)"""
+        self.refill()
+        if self.tokens >= 1 - 1e-9:
+            return 0.0
+        return (1 - self.tokens) / self.refill_rate
+
+    def take(self):
+        """토큰 1개 차감"""
+        self.refill()
+        self.tokens -= 1
+
+    def drain(self):
+        """남은 토큰 모두 제거 (과부하 응답 시)"""
+        self.refill()
+        self.tokens = min(self.tokens, 0.0)
+
+
+class TRScheduler:
+    """초당/시간당 제한을 토큰 버킷으로 모델링한 TR 요청 스케줄러 (AIMD 속도 조절)"""
+
+    def __init__(self, max_rate=MAX_REQUESTS_PER_SECOND, hourly_limit=MAX_REQUESTS_PER_HOUR,
+                 min_rate=0.5, increase_step=0.1, decrease_factor=0.5,
+                 clock=time.monotonic, sleep=time.sleep, paced=True):
+        self.max_rate = float(max_rate)
+        self.min_rate = float(min_rate)
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.clock = clock
+        self.sleep = sleep
+        self.paced = paced
+        self.lock = threading.Lock()
+
+        # 초당 버킷은 버스트 1회 분량만 허용하고, 충전 속도를 AIMD로 조절
+        self.rate = self.max_rate
+        self.second_bucket = TokenBucket(1, self.rate, clock)
+        self.hour_bucket = TokenBucket(hourly_limit, hourly_limit / 3600.0, clock)
+
+        # 통계
+        self.total_requests = 0
+        self.throttled_requests = 0
+        self.started_at = None
+        self.recent = deque()
+
+    def acquire(self):
+        """요청 가능 시점까지 대기 후 토큰 차감"""
+        with self.lock:
+            while self.paced:
+                wait = max(self.second_bucket.wait_time(), self.hour_bucket.wait_time())
+                if wait <= 0:
+                    break
+                if wait > 60:
+                    logging.warning(f"시간당 TR 한도 소진, {wait:.0f}초 대기")
+                self.sleep(wait)
+
+            self.second_bucket.take()
+            self.hour_bucket.take()
+
+            now = self.clock()
+            if self.started_at is None:
+                self.started_at = now
+            self.total_requests += 1
+            self.recent.append(now)
+            # 상주 프로세스에서 무한히 쌓이지 않도록 구간 밖 시각 제거
+            while now - self.recent[0] > RATE_WINDOW:
+                self.recent.popleft()
+
+    def record_result(self, result):
+        """CommRqData 결과코드로 속도 조절 (성공 시 가산 증가, 과부하 시 승산 감소)"""
+        with self.lock:
+            if result in THROTTLE_ERROR_CODES:
+                self.throttled_requests += 1
+                self.set_rate(self.rate * self.decrease_factor)
+                self.second_bucket.drain()
+                logging.warning(f"TR 과부하 응답({result}) -> 요청 속도 {self.rate:.2f}회/초로 감소")
+            elif result == 0:
+                self.set_rate(self.rate + self.increase_step)
+
+    def set_rate(self, rate):
+        """초당 요청 속도 변경"""
+        self.rate = max(self.min_rate, min(self.max_rate, rate))
+        self.second_bucket.refill()
+        self.second_bucket.refill_rate = self.rate
+
+    def submit(self, send, retries=3):
+        """TR 요청 실행 (send는 SetInputValue + CommRqData 수행 후 결과코드 반환)"""
+        result = None
+        for attempt in range(retries + 1):
+            self.acquire()
+            result = send()
+            self.record_result(result)
+            if result not in THROTTLE_ERROR_CODES:
+                break
+        return result
+
+    def achieved_rate(self, window=RATE_WINDOW):
+        """최근 window초(최대 RATE_WINDOW) 동안 실제 달성한 초당 요청 수"""
+        window = min(window, RATE_WINDOW)
+        with self.lock:
+            now = self.clock()
+            while self.recent and now - self.recent[0] > window:
+                self.recent.popleft()
+            if not self.recent:
+                return 0.0
+            span = max(now - self.recent[0], 1.0 / self.max_rate)
+            return len(self.recent) / span
+
+    def stats(self):
+        """스케줄러 통계"""
+        elapsed = 0.0
+        if self.started_at is not None:
+            elapsed = self.clock() - self.started_at
+        return {
+            "total_requests": self.total_requests,
+            "throttled_requests": self.throttled_requests,
+            "current_rate": round(self.rate, 2),
+            "achieved_rate": round(self.achieved_rate(), 2),
+            "average_rate": round(self.total_requests / elapsed, 2) if elapsed > 0 else 0.0,
+            "hourly_tokens_left": int(self.hour_bucket.tokens)
+        }
+
+
+# 프로세스 내 모든 TR 요청이 같은 한도를 공유하도록 전역 인스턴스 사용
+tr_scheduler = None
+
+
+def get_tr_scheduler():
+    """TR 스케줄러 인스턴스 반환"""
+    global tr_scheduler
+    if tr_scheduler is None:
+        tr_scheduler = TRScheduler()
+    return tr_scheduler
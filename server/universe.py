@@ -0,0 +1,237 @@
+import os
+import json
+import logging
+from datetime import datetime, timedelta
+
+from stock_master import get_stock_master, split_codes, NORMAL_STATE
+
+DEFAULT_PATH = os.getenv('UNIVERSE_PATH',
+                         os.path.join(os.path.dirname(os.path.abspath(__file__)), 'universe.json'))
+
+# 스캔 기본 종목군 (이전과 같은 KOSPI 상위 종목)
+DEFAULT_UNIVERSE = os.getenv('SCAN_UNIVERSE', 'kospi_top')
+
+# GetCodeListByMarket 시장 구분 (ETF/ETN은 KOSPI 목록에도 들어 있어 종류 판별에만 사용)
+MARKET_CODES = {
+    "KOSPI": "0",
+    "KOSDAQ": "10",
+    "ETF": "8",
+    "ETN": "60"
+}
+LISTED_MARKETS = ("KOSPI", "KOSDAQ")
+
+# 종목 종류
+SECURITY_TYPES = ("stock", "preferred", "spac", "etf", "etn")
+
+# KOSPI 상위 종목 코드 (종목명은 종목 마스터에서 조회)
+KOSPI_TOP_CODES = [
+    "005930",  # 삼성전자
+    "000660",  # SK하이닉스
+    "035420",  # NAVER
+    "035720",  # 카카오
+    "373220",  # LG에너지솔루션
+    "005380",  # 현대차
+    "000270",  # 기아
+    "005490",  # POSCO홀딩스
+    "051910",  # LG화학
+    "207940",  # 삼성바이오로직스
+    "012330",  # 현대모비스
+    "105560",  # KB금융
+    "055550",  # 신한지주
+    "086790",  # 하나금융지주
+    "066570",  # LG전자
+    "006400",  # 삼성SDI
+    "003670",  # 포스코퓨처엠
+    "090430",  # 아모레퍼시픽
+    "051900",  # LG생활건강
+    "068270"  # 셀트리온
+]
+
+# 이름으로 고르는 종목군 (markets/types/min_listed_days/normal_only 조건, codes는 고정 목록)
+# 월봉 6개월 조건을 판정할 수 없는 신규 상장 종목은 주식 종목군에서 기본 제외
+UNIVERSES = {
+    "kospi_top": {"codes": KOSPI_TOP_CODES},
+    "kospi": {"markets": ["KOSPI"], "types": ["stock"], "min_listed_days": 180},
+    "kosdaq": {"markets": ["KOSDAQ"], "types": ["stock"], "min_listed_days": 180},
+    "market": {"markets": ["KOSPI", "KOSDAQ"], "types": ["stock"], "min_listed_days": 180},
+    "etf": {"types": ["etf"]},
+    "all": {"normal_only": False}
+}
+
+
+class UniverseError(ValueError):
+    """알 수 없는 종목군 이름이나 잘못된 조건"""
+
+
+def trading_day(now=None):
+    """now가 속한 거래일 (주말은 직전 금요일, 공휴일은 고려하지 않음)"""
+    day = (now or datetime.now()).date()
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day.strftime('%Y%m%d')
+
+
+def security_type(code, name, etf_codes, etn_codes):
+    """종목 종류 (ETF/ETN 목록, 종목명, 코드 끝자리로 판별)"""
+    if code in etf_codes:
+        return "etf"
+    if code in etn_codes:
+        return "etn"
+    if "스팩" in name:
+        return "spac"
+    # 보통주 코드는 0으로 끝나고, 우선주는 5/7/9/K 등으로 끝남
+    if not code.endswith("0"):
+        return "preferred"
+    return "stock"
+
+
+def resolve_spec(universe):
+    """종목군 이름 또는 조건 dict를 조건 dict로 (이름에 조건을 덮어쓰려면 {"name": ..., ...})"""
+    if universe is None:
+        universe = DEFAULT_UNIVERSE
+    if isinstance(universe, str):
+        if universe not in UNIVERSES:
+            raise UniverseError(f"알 수 없는 종목군: {universe} (가능: {', '.join(UNIVERSES)})")
+        return dict(UNIVERSES[universe])
+    if not isinstance(universe, dict):
+        raise UniverseError(f"종목군은 이름 또는 dict여야 합니다: {universe!r}")
+
+    spec = resolve_spec(universe["name"]) if "name" in universe else {}
+    spec.update((key, value) for key, value in universe.items() if key != "name")
+    for market in spec.get("markets") or ():
+        if market not in LISTED_MARKETS:
+            raise UniverseError(f"알 수 없는 시장: {market}")
+    for kind in spec.get("types") or ():
+        if kind not in SECURITY_TYPES:
+            raise UniverseError(f"알 수 없는 종목 종류: {kind}")
+    return spec
+
+
+class Universe:
+    """시장 전체 종목 목록 (시장/종류/상장일/상태, 거래일마다 한 번 일괄 로드 후 파일로 보존)
+
+    종목별 정보는 (시장, 종류, 상장일, 상태) 튜플로 두고, 종목군별 코드 목록은
+    같은 거래일 안에서는 한 번만 걸러 재사용한다.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.loaded_date = None
+        self.entries = {}
+        self.selections = {}
+        self.read()
+
+    def read(self):
+        """저장된 목록 읽기 (없거나 손상되면 빈 목록)"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            entries = {code: (market, kind, listed, state)
+                       for code, market, kind, listed, state in data.get("stocks", [])}
+        except (OSError, ValueError, TypeError) as e:
+            if not isinstance(e, FileNotFoundError):
+                logging.warning(f"종목군 목록 읽기 실패: {e}")
+            return
+
+        self.loaded_date = data.get("date")
+        self.entries = entries
+        self.selections = {}
+
+    def write(self):
+        """임시 파일에 쓴 뒤 교체"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        data = {
+            "date": self.loaded_date,
+            "stocks": [[code, *entry] for code, entry in self.entries.items()]
+        }
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.warning(f"종목군 목록 저장 실패: {e}")
+
+    def is_fresh(self, now=None):
+        """이번 거래일에 로드한 목록인지"""
+        return bool(self.entries) and self.loaded_date == trading_day(now)
+
+    def refresh(self, kiwoom, now=None):
+        """시장별 코드 목록을 한 번씩 받아 전 종목 분류 후 저장 (로드한 종목 수 반환)
+
+        종목명/상태는 종목 마스터를 그대로 쓰고 상장일만 종목마다 조회한다 (TR 요청 없음).
+        """
+        master = get_stock_master()
+        master.ensure(kiwoom, now)
+        listed = {market: split_codes(kiwoom.GetCodeListByMarket(MARKET_CODES[market])) for market in MARKET_CODES}
+        etf_codes, etn_codes = set(listed["ETF"]), set(listed["ETN"])
+
+        entries = {}
+        for market in LISTED_MARKETS:
+            for code in listed[market]:
+                if code in entries:
+                    continue
+                name = master.name(code, kiwoom)
+                entry = master.get(code)
+                state = entry[2] if entry and entry[2] else (kiwoom.GetMasterConstruction(code) or "").strip()
+                listed_date = (kiwoom.GetMasterListedStockDate(code) or "").strip()
+                entries[code] = (market, security_type(code, name, etf_codes, etn_codes), listed_date, state)
+
+        if not entries:
+            logging.warning("종목군 목록 로드 실패: 종목 목록 없음")
+            return 0
+
+        self.entries = entries
+        self.loaded_date = trading_day(now)
+        self.selections = {}
+        self.write()
+        logging.info(f"종목군 목록 로드: {len(entries)}개 종목")
+        return len(entries)
+
+    def ensure(self, kiwoom, now=None):
+        """이번 거래일에 로드하지 않았으면 다시 로드"""
+        if not self.is_fresh(now):
+            self.refresh(kiwoom, now)
+
+    def select(self, spec, now=None):
+        """조건에 맞는 종목코드 목록 (코드 순)"""
+        markets = set(spec.get("markets") or LISTED_MARKETS)
+        types = set(spec.get("types") or SECURITY_TYPES)
+        normal_only = spec.get("normal_only", True)
+        min_listed_days = int(spec.get("min_listed_days") or 0)
+        cutoff = ((now or datetime.now()) - timedelta(days=min_listed_days)).strftime('%Y%m%d')
+
+        return sorted(code for code, (market, kind, listed_date, state) in self.entries.items()
+                      if market in markets and kind in types
+                      and (not normal_only or state == NORMAL_STATE)
+                      and (not min_listed_days or not listed_date or listed_date <= cutoff))
+
+    def codes(self, universe=None, kiwoom=None, now=None):
+        """종목군 코드 목록 (kiwoom이 있으면 필요할 때 목록을 다시 로드, 없으면 저장된 목록 사용)"""
+        spec = resolve_spec(universe)
+        if "codes" in spec:
+            return list(spec["codes"])
+
+        if kiwoom is not None:
+            self.ensure(kiwoom, now)
+        elif not self.is_fresh(now):
+            logging.warning(f"종목군 목록이 최신이 아닙니다 (저장일: {self.loaded_date or '-'})")
+
+        key = (trading_day(now), json.dumps(spec, sort_keys=True))
+        if key not in self.selections:
+            self.selections[key] = self.select(spec, now)
+        return list(self.selections[key])
+
+
+# 전역 종목군 목록 (같은 프로세스의 모든 객체가 공유)
+universe = None
+
+
+def get_universe():
+    """종목군 목록 인스턴스 반환"""
+    global universe
+    if universe is None:
+        universe = Universe()
+    return universe
@@ -1,3 +1,4 @@
+import os
 import sys
 import json
 import time
@@ -8,6 +9,27 @@ from PyQt5.QtCore import QTimer, QThread, pyqtSignal
 from PyQt5.QAxContainer import QAxWidget
 from PyQt5.QtCore import QEventLoop
 
+# 조건 판정 기준은 server/condition_params.py 하나만 사용
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server'))
+from condition_params import (TAIL_WINDOW, TAIL_RATIO, TAIL_MIN_DAYS, BOTTOM_WINDOW, BOTTOM_BAND,
+                              BOTTOM_MIN_COUNT, TREND_SHORT, TREND_LONG)
+from stock_master import get_stock_master
+from universe import get_universe
+
+
+class OcxKiwoom:
+    """QAxWidget을 종목 마스터/종목군이 쓰는 키움 객체처럼 호출 (인자는 모두 문자열인 함수만 사용)"""
+    
+    def __init__(self, ocx):
+        self.ocx = ocx
+        
+    def __getattr__(self, name):
+        def call(*args):
+            signature = ", ".join(["QString"] * len(args))
+            return self.ocx.dynamicCall(f"{name}({signature})", *args)
+        return call
+
+
 class KiwoomStockData:
     def __init__(self):
         self.app = QApplication(sys.argv)
@@ -31,29 +53,14 @@ class KiwoomStockData:
         # 이벤트 루프
         self.event_loop = QEventLoop()
         
-        # 종목 목록 (KOSPI 상위 종목들)
-        self.stock_list = [
-            {"name": "삼성전자", "code": "005930"},
-            {"name": "SK하이닉스", "code": "000660"},
-            {"name": "NAVER", "code": "035420"},
-            {"name": "카카오", "code": "035720"},
-            {"name": "LG에너지솔루션", "code": "373220"},
-            {"name": "현대차", "code": "005380"},
-            {"name": "기아", "code": "000270"},
-            {"name": "POSCO홀딩스", "code": "005490"},
-            {"name": "LG화학", "code": "051910"},
-            {"name": "삼성바이오로직스", "code": "207940"},
-            {"name": "현대모비스", "code": "012330"},
-            {"name": "KB금융", "code": "105560"},
-            {"name": "신한지주", "code": "055550"},
-            {"name": "하나금융지주", "code": "086790"},
-            {"name": "LG전자", "code": "066570"},
-            {"name": "삼성SDI", "code": "006400"},
-            {"name": "포스코퓨처엠", "code": "003670"},
-            {"name": "아모레퍼시픽", "code": "090430"},
-            {"name": "LG생활건강", "code": "051900"},
-            {"name": "셀트리온", "code": "068270"}
-        ]
+        # 종목 목록 (서버 조건검색과 같은 종목군/종목 마스터 사용)
+        self.load_universe()
+        
+    def load_universe(self):
+        """종목군을 종목 목록으로 변환 (로그인 후에는 키움 API로 종목군/종목명을 다시 로드)"""
+        kiwoom = OcxKiwoom(self.ocx) if self.login_completed else None
+        self.stock_list = get_stock_master().stocks(get_universe().codes(kiwoom=kiwoom), kiwoom)
+        return self.stock_list
         
     def setup_kiwoom_control(self):
         """키움 API 컨트롤 설정"""
@@ -154,6 +161,7 @@ class KiwoomStockData:
             self.log_message("로그인 성공!")
             self.status_label.setText("로그인 성공")
             self.login_completed = True
+            self.load_universe()
             self.request_button.setEnabled(True)
         else:
             self.log_message(f"로그인 실패: {err_code}")
@@ -222,7 +230,7 @@ class KiwoomStockData:
         daily_data = []
         base_price = 50000 + hash(stock_code) % 50000  # 종목별 다른 기준가
         
-        for i in range(20):  # 최근 20일
+        for i in range(max(TAIL_WINDOW, BOTTOM_WINDOW)):  # 최근 20일
             # 랜덤한 가격 변동 생성
             price_change = (hash(f"{stock_code}_{i}") % 2000) - 1000  # -1000 ~ +1000
             open_price = base_price + price_change
@@ -247,7 +255,7 @@ class KiwoomStockData:
         monthly_data = []
         base_price = 50000 + hash(stock_code) % 50000
         
-        for i in range(6):  # 최근 6개월
+        for i in range(TREND_LONG):  # 최근 6개월
             price_change = (hash(f"{stock_code}_month_{i}") % 10000) - 5000
             close_price = base_price + price_change
             
@@ -261,11 +269,10 @@ class KiwoomStockData:
         
     def check_tail_upward(self, daily_data):
         """조건 1: 꼬리 우상향 확인"""
-        # 최근 20일 데이터에서 꼬리 우상향 패턴 찾기
+        # 최근 20일 데이터에서 꼬리 우상향 패턴 찾기 (시뮬레이션 데이터는 최신순)
         tail_upward_count = 0
         
-        for i in range(len(daily_data)):
-            day = daily_data[i]
+        for day in daily_data[:TAIL_WINDOW]:
             
             # 시가 < 종가 조건
             if day['open'] >= day['close']:
@@ -280,38 +287,38 @@ class KiwoomStockData:
             tail_length = day['open'] - day['low']
             
             # 꼬리가 전체 봉 길이의 30% 이상인지 확인
-            if tail_length >= total_length * 0.3:
+            if tail_length >= total_length * TAIL_RATIO:
                 tail_upward_count += 1
                 
         # 최소 3일 이상 꼬리 우상향이 있어야 함
-        return tail_upward_count >= 3
+        return tail_upward_count >= TAIL_MIN_DAYS
         
     def check_bottom_twice(self, daily_data):
         """조건 2: 바닥 2회 확인"""
         # 최근 20일 데이터에서 저점 찾기
-        lows = [day['low'] for day in daily_data]
+        lows = [day['low'] for day in daily_data[:BOTTOM_WINDOW]]
         min_low = min(lows)
         
         # 저점 근처(±2%)로 2번 이상 출현하는지 확인
-        bottom_threshold = min_low * 1.02  # 저점 + 2%
+        bottom_threshold = min_low * BOTTOM_BAND  # 저점 + 2%
         bottom_count = 0
         
         for low in lows:
             if low <= bottom_threshold:
                 bottom_count += 1
                 
-        return bottom_count >= 2
+        return bottom_count >= BOTTOM_MIN_COUNT
         
     def is_downtrend(self, monthly_data):
         """조건 3: 하락장 확인 (월봉 분석)"""
-        if len(monthly_data) < 6:
+        if len(monthly_data) < TREND_LONG:
             return False
             
         # 최근 3개월 평균 종가
-        recent_3m_avg = sum([month['close'] for month in monthly_data[:3]]) / 3
+        recent_3m_avg = sum([month['close'] for month in monthly_data[:TREND_SHORT]]) / TREND_SHORT
         
         # 최근 6개월 평균 종가
-        recent_6m_avg = sum([month['close'] for month in monthly_data[:6]]) / 6
+        recent_6m_avg = sum([month['close'] for month in monthly_data[:TREND_LONG]]) / TREND_LONG
         
         # 3개월 평균이 6개월 평균보다 낮으면 하락장
         return recent_3m_avg < recent_6m_avg
@@ -1,7 +1,14 @@
+import os
+import sys
 import json
 import random
 from datetime import datetime
 
+# 조건 판정 기준은 server/condition_params.py 하나만 사용
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server'))
+from condition_params import (TAIL_WINDOW, TAIL_RATIO, TAIL_MIN_DAYS, BOTTOM_WINDOW, BOTTOM_BAND,
+                              BOTTOM_MIN_COUNT, TREND_SHORT, TREND_LONG)
+
 def generate_test_data():
     """테스트용 일봉 및 월봉 데이터 생성"""
     # KOSPI 상위 종목들
@@ -116,7 +123,7 @@ def check_tail_upward(daily_data):
     """조건 1: 꼬리 우상향 확인"""
     tail_upward_count = 0
     
-    for day in daily_data:
+    for day in daily_data[:TAIL_WINDOW]:
         # 시가 < 종가 조건
         if day['open'] >= day['close']:
             continue
@@ -130,38 +137,38 @@ def check_tail_upward(daily_data):
         tail_length = day['open'] - day['low']
         
         # 꼬리가 전체 봉 길이의 30% 이상인지 확인
-        if tail_length >= total_length * 0.3:
+        if tail_length >= total_length * TAIL_RATIO:
             tail_upward_count += 1
             
     # 최소 3일 이상 꼬리 우상향이 있어야 함
-    return tail_upward_count >= 3
+    return tail_upward_count >= TAIL_MIN_DAYS
 
 def check_bottom_twice(daily_data):
     """조건 2: 바닥 2회 확인"""
     # 최근 20일 데이터에서 저점 찾기
-    lows = [day['low'] for day in daily_data]
+    lows = [day['low'] for day in daily_data[:BOTTOM_WINDOW]]
     min_low = min(lows)
     
     # 저점 근처(±2%)로 2번 이상 출현하는지 확인
-    bottom_threshold = min_low * 1.02  # 저점 + 2%
+    bottom_threshold = min_low * BOTTOM_BAND  # 저점 + 2%
     bottom_count = 0
     
     for low in lows:
         if low <= bottom_threshold:
             bottom_count += 1
             
-    return bottom_count >= 2
+    return bottom_count >= BOTTOM_MIN_COUNT
 
 def is_downtrend(monthly_data):
     """조건 3: 하락장 확인 (월봉 분석)"""
-    if len(monthly_data) < 6:
+    if len(monthly_data) < TREND_LONG:
         return False
         
     # 최근 3개월 평균 종가
-    recent_3m_avg = sum([month['close'] for month in monthly_data[:3]]) / 3
+    recent_3m_avg = sum([month['close'] for month in monthly_data[:TREND_SHORT]]) / TREND_SHORT
     
     # 최근 6개월 평균 종가
-    recent_6m_avg = sum([month['close'] for month in monthly_data[:6]]) / 6
+    recent_6m_avg = sum([month['close'] for month in monthly_data[:TREND_LONG]]) / TREND_LONG
     
     # 3개월 평균이 6개월 평균보다 낮으면 하락장
     return recent_3m_avg < recent_6m_avg